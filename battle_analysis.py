@@ -0,0 +1,207 @@
+"""
+Borders of Aeon: Battle Analysis
+===============================
+
+Closed-form estimates of a battle, without simulating it.
+
+From the combat profiles alone (HP, regeneration, damage taken after
+defense, damage range, attack cooldown and the type advantages) this
+module computes each side's effective damage per second, effective HP and
+expected time to defeat the other side, and predicts the winner in a few
+microseconds. The estimates use expected values only, so close matchups
+can go either way in the simulation; they are meant for instant previews
+and for pruning searches before simulating.
+
+Model
+----
+- A hit deals max(1, base × damage taken × bonus) with the base uniform
+  between min and max damage; its mean is computed exactly.
+- Smart attackers miss Dexterous targets 20% of the time and deal +50%
+  to Tough targets 20% of the time.
+- Regeneration heals between attacks once a warrior has been hurt.
+- Stuns of Tough attackers on Dexterous targets delay the target; the
+  durations halve with every stun, so they add up to at most 2 seconds.
+- In team battles damage is spread evenly over the enemy team, which is
+  worn down as one pool of HP.
+"""
+
+import math
+from collections import namedtuple
+
+import battle_engine
+
+# Chance that a type advantage triggers on an attack
+ADVANTAGE_CHANCE = 0.2
+
+# Battle time limit in seconds
+TIME_LIMIT = battle_engine.MAX_BATTLE_TICKS / battle_engine.TICKS_PER_SECOND
+
+# Advantage reported when only one side can ever win
+MAX_ADVANTAGE = 100.0
+
+# Estimated battle of two teams; the kill times are in seconds, inf if never
+Prediction = namedtuple("Prediction", [
+    "winner", "team1_dps", "team2_dps", "team1_ehp", "team2_ehp",
+    "team1_kill_time", "team2_kill_time"
+])
+
+
+def mean_hit(low, high):
+    # Mean of max(1, x) for x uniform between low and high, in either order
+    low, high = min(low, high), max(low, high)
+    if high <= 1:
+        return 1.0
+    if low >= 1 or high == low:
+        return (low + high) / 2
+    return ((1 - low) + (high * high - 1) / 2) / (high - low)
+
+
+def expected_hit(attacker, target):
+    """
+    Mean damage of one attack, misses and weak spots included.
+
+    Args:
+    attacker (CombatProfile): Attacking warrior
+    target (CombatProfile): Defending warrior
+
+    Returns:
+    float: Expected HP taken from the target per attack
+    """
+    low = attacker.min_dmg * target.damage_taken
+    high = attacker.max_dmg * target.damage_taken
+    hit = mean_hit(low, high)
+    if attacker.type == 'Smart' and target.type == 'Dexterous':
+        return (1 - ADVANTAGE_CHANCE) * hit
+    if attacker.type == 'Smart' and target.type == 'Tough':
+        return (1 - ADVANTAGE_CHANCE) * hit + ADVANTAGE_CHANCE * mean_hit(1.5 * low, 1.5 * high)
+    return hit
+
+
+def attack_interval(profile):
+    # Seconds between two attacks
+    return profile.cooldown_ticks / battle_engine.TICKS_PER_SECOND
+
+
+def effective_dps(attacker, target):
+    # Expected damage per second of attacker on target
+    return expected_hit(attacker, target) / attack_interval(attacker)
+
+
+def effective_hp(profile):
+    # Raw damage needed to defeat the warrior, before regeneration
+    return profile.hp / profile.damage_taken
+
+
+def strength(profile):
+    # Matchup-free strength: damage per second times effective HP
+    hit = mean_hit(profile.min_dmg, profile.max_dmg)
+    return hit / attack_interval(profile) * effective_hp(profile)
+
+
+def stun_delay(attacker, target, seconds):
+    # Expected seconds target loses to stuns by attacker within a battle
+    if not (attacker.type == 'Tough' and target.type == 'Dexterous'):
+        return 0.0
+    stuns = ADVANTAGE_CHANCE * seconds / attack_interval(attacker)
+    return 2 * (1 - 0.5 ** stuns)
+
+
+def kill_time(attacker, target):
+    """
+    Expected seconds for one warrior to defeat another.
+
+    Args:
+    attacker (CombatProfile): Attacking warrior
+    target (CombatProfile): Defending warrior
+
+    Returns:
+    float: Seconds until the target falls, inf if regeneration outpaces
+    the damage
+    """
+    hit = expected_hit(attacker, target)
+    interval = attack_interval(attacker)
+    if hit >= target.hp:
+        return interval
+    healed = target.hp_regen * interval  # Healed between two attacks
+    if hit <= healed:
+        return math.inf
+    attacks = math.ceil((target.hp - healed) / (hit - healed))
+    return attacks * interval
+
+
+def team_kill_time(attackers, targets):
+    # Expected seconds for a team to defeat another, damage spread evenly
+    dps = sum(effective_dps(attacker, target) for attacker in attackers for target in targets) / len(targets)
+    healing = sum(target.hp_regen for target in targets)
+    if dps <= healing:
+        return math.inf
+    return sum(target.hp for target in targets) / (dps - healing)
+
+
+def predict(team1, team2):
+    """
+    Predict a battle without simulating it.
+
+    Args:
+    team1 (list): CombatProfile or {'warrior': ..., 'item': ...} entries for Team 1
+    team2 (list): CombatProfile or {'warrior': ..., 'item': ...} entries for Team 2
+
+    Returns:
+    Prediction: Expected winner (1, 2 or 0 for a draw) and the estimates
+    behind it
+    """
+    team1 = [battle_engine.as_profile(entry) for entry in team1]
+    team2 = [battle_engine.as_profile(entry) for entry in team2]
+
+    if len(team1) == 1 and len(team2) == 1:
+        first, second = team1[0], team2[0]
+        time1 = kill_time(first, second)
+        time2 = kill_time(second, first)
+        # Stuns on a warrior delay its own kill
+        duration = min(time1, time2, TIME_LIMIT)
+        time1 += stun_delay(second, first, duration)
+        time2 += stun_delay(first, second, duration)
+    else:
+        time1 = team_kill_time(team1, team2)
+        time2 = team_kill_time(team2, team1)
+
+    if min(time1, time2) > TIME_LIMIT:
+        winner = 0
+    else:
+        winner = 1 if time1 <= time2 else 2  # Team 1 strikes first within a tick
+
+    return Prediction(
+        winner,
+        sum(effective_dps(a, t) for a in team1 for t in team2) / len(team2),
+        sum(effective_dps(a, t) for a in team2 for t in team1) / len(team1),
+        sum(effective_hp(profile) for profile in team1),
+        sum(effective_hp(profile) for profile in team2),
+        time1, time2
+    )
+
+
+def advantage(team1, team2):
+    """
+    How much faster Team 1 is expected to win than to lose.
+
+    Returns:
+    float: Team 2's kill time over Team 1's, above 1 when Team 1 is
+    favored, between 0 and MAX_ADVANTAGE
+    """
+    prediction = predict(team1, team2)
+    time1 = min(prediction.team1_kill_time, TIME_LIMIT * MAX_ADVANTAGE)
+    time2 = min(prediction.team2_kill_time, TIME_LIMIT * MAX_ADVANTAGE)
+    return min(MAX_ADVANTAGE, time2 / time1)
+
+
+def describe(prediction):
+    # One paragraph preview of a prediction for the simulation tab
+    def seconds(value):
+        return "never" if value == math.inf else f"{value:.1f}s"
+
+    winner = {1: "Team 1", 2: "Team 2", 0: "Draw"}[prediction.winner]
+    return (f"Predicted: {winner} | "
+            f"Team 1: {prediction.team1_dps:.1f} DPS, {prediction.team1_ehp:.0f} EHP, "
+            f"kills in {seconds(prediction.team1_kill_time)} | "
+            f"Team 2: {prediction.team2_dps:.1f} DPS, {prediction.team2_ehp:.0f} EHP, "
+            f"kills in {seconds(prediction.team2_kill_time)}")
@@ -0,0 +1,200 @@
+"""
+Borders of Aeon: Batch Battles
+=============================
+
+Monte Carlo estimates of a matchup's win rates.
+
+One battle is one random outcome. estimate_win_rates fights the same
+matchup many times over a process pool and reports the win and draw
+probabilities with confidence intervals, plus the spread of battle
+durations.
+
+Reproducibility
+--------------
+Every battle draws from its own random stream, seeded by battle_seed
+from the base seed and the battle's number, so no two battles share
+random state whichever worker fights them. The same seed gives the same
+results whatever the number of workers, and any single battle of a batch
+can be fought again on its own from its seed (see battle_replay).
+"""
+
+import math
+import os
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import battle_engine
+
+# Battles handed to a worker at a time
+CHUNK_SIZE = 250
+
+# Bits of a battle seed that hold the battle's number within its batch
+BATTLE_INDEX_BITS = 32
+
+
+def chunk_rng(seed, chunk_index):
+    # Independent, reproducible random stream for one chunk of battles
+    return random.Random(f"{seed}-{chunk_index}")
+
+
+def battle_seed(seed, battle_index):
+    # Seed of one battle of a batch, unique for every (base seed, battle number)
+    return (seed << BATTLE_INDEX_BITS) | battle_index
+
+
+def wilson_interval(successes, trials, confidence=0.95):
+    """
+    Confidence interval of a probability estimated from trials.
+
+    Args:
+    successes (int): Number of trials with the outcome
+    trials (int): Total number of trials
+    confidence (float): Confidence level of the interval
+
+    Returns:
+    tuple: (low, high) bounds of the probability
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_chunk(team1, team2, battles, seed, chunk_index, targeting=None):
+    """
+    Fight one chunk of battles in the current process.
+
+    Returns:
+    list: (winner, ticks) of every battle
+    """
+    team1 = [battle_engine.as_profile(entry) for entry in team1]
+    team2 = [battle_engine.as_profile(entry) for entry in team2]
+    outcomes = []
+    first = chunk_index * CHUNK_SIZE
+    for battle_index in range(first, first + battles):
+        result = battle_engine.simulate_battle(team1, team2, seed=battle_seed(seed, battle_index),
+                                               log_level=battle_engine.LOG_OFF, targeting=targeting)
+        outcomes.append((result.winner, result.ticks))
+    return outcomes
+
+
+class WinRateEstimate:
+    """
+    Aggregated outcome of many battles of one matchup.
+
+    Args:
+    outcomes (list): (winner, ticks) of every battle
+    seed (int): Base seed the battles were drawn from
+    confidence (float): Confidence level of the intervals
+    """
+
+    def __init__(self, outcomes, seed, confidence=0.95):
+        self.battles = len(outcomes)
+        self.seed = seed
+        self.confidence = confidence
+        self.team1_wins = sum(1 for winner, _ in outcomes if winner == 1)
+        self.team2_wins = sum(1 for winner, _ in outcomes if winner == 2)
+        self.draws = self.battles - self.team1_wins - self.team2_wins
+        self.durations = sorted(ticks / battle_engine.TICKS_PER_SECOND for _, ticks in outcomes)
+
+    def probability(self, count):
+        # Point estimate and confidence interval of an outcome
+        rate = count / self.battles if self.battles else 0.0
+        return rate, wilson_interval(count, self.battles, self.confidence)
+
+    @property
+    def mean_duration(self):
+        return statistics.fmean(self.durations) if self.durations else 0.0
+
+    def duration_percentile(self, fraction):
+        return percentile(self.durations, fraction)
+
+    def summary(self):
+        text = "=== Win Rate Estimate ===\n\n"
+        text += f"Battles: {self.battles} (seed {self.seed})\n\n"
+        level = f"{self.confidence:.0%}"
+        for label, count in [("Team 1 wins", self.team1_wins),
+                             ("Team 2 wins", self.team2_wins),
+                             ("Draws", self.draws)]:
+            rate, (low, high) = self.probability(count)
+            text += f"{label}: {rate:.1%} ({level} CI {low:.1%}-{high:.1%})\n"
+        text += (
+            f"\nBattle Duration:\n"
+            f"  Mean: {self.mean_duration:.1f}s\n"
+            f"  Median: {self.duration_percentile(0.5):.1f}s\n"
+            f"  90th percentile: {self.duration_percentile(0.9):.1f}s\n"
+            f"  99th percentile: {self.duration_percentile(0.99):.1f}s\n"
+        )
+        return text
+
+
+def estimate_win_rates(team1, team2, battles=1000, seed=None, workers=None, confidence=0.95,
+                       targeting=None, progress=None, cancel=None):
+    """
+    Fight a matchup many times and estimate its win rates.
+
+    Args:
+    team1 (list): CombatProfile or {'warrior': ..., 'item': ...} entries for Team 1
+    team2 (list): CombatProfile or {'warrior': ..., 'item': ...} entries for Team 2
+    battles (int): Number of battles to fight
+    seed (int): Base seed, a random one is picked when omitted
+    workers (int): Worker processes, defaults to one per core
+    confidence (float): Confidence level of the intervals
+    targeting: Targeting policies of the teams, see battle_engine.simulate_battle
+    progress (callable): Called with (battles done, battles) after each chunk
+    cancel (threading.Event): Stops the run early when set
+
+    Returns:
+    WinRateEstimate: Win/draw probabilities and battle durations, or None
+    when the run was cancelled
+    """
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # Fixed-size chunks keep results independent of the worker count
+    sizes = [min(CHUNK_SIZE, battles - start) for start in range(0, battles, CHUNK_SIZE)]
+    chunks = len(sizes)
+    results = [None] * chunks
+    done = 0
+
+    if workers == 1 or chunks == 1:
+        for chunk_index, size in enumerate(sizes):
+            if cancel is not None and cancel.is_set():
+                return None
+            results[chunk_index] = run_chunk(team1, team2, size, seed, chunk_index, targeting)
+            done += size
+            if progress is not None:
+                progress(done, battles)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, chunks)) as pool:
+            futures = {
+                pool.submit(run_chunk, team1, team2, size, seed, chunk_index, targeting): chunk_index
+                for chunk_index, size in enumerate(sizes)
+            }
+            for future in as_completed(futures):
+                if cancel is not None and cancel.is_set():
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    return None
+                chunk_index = futures[future]
+                results[chunk_index] = future.result()
+                done += sizes[chunk_index]
+                if progress is not None:
+                    progress(done, battles)
+
+    outcomes = [outcome for chunk in results for outcome in chunk]
+    return WinRateEstimate(outcomes, seed, confidence)
@@ -0,0 +1,883 @@
+"""
+Borders of Aeon: Battle Engine
+=============================
+
+The battle rules of the Battle Arena without any user interface.
+
+This module only uses the standard library so battles can be run from
+batch jobs, worker processes and servers with no display. The tkinter
+application in battlearena.py is a thin front end over these functions.
+
+Battle Clock
+-----------
+Time is counted in whole ticks of 0.1 seconds. Attacks, stuns and the
+once-per-second HP regeneration are events in a priority queue, and the
+simulation jumps straight from one event to the next.
+
+Teams can be of any size. Each team keeps the slots of its living
+warriors in roster order and drops the fallen as they fall, whether to a
+hit or to their own draining regeneration, so a target is picked in
+constant time and a 1000v1000 battle costs about as much per attack as a
+1v1.
+
+Targets are picked at random unless a team follows one of the targeting
+policies of battle_targeting.
+
+Warriors fight at a level from 1 to MAX_LEVEL; every level above 1 adds
+their inctough, incdex and incsmart. A LevelTable keeps each warrior's
+stats at the levels it has fought at in one flat array, so returning to a
+level is a lookup and unused levels are never compiled.
+
+Every battle draws from its own random stream. A battle fought from a
+seed always plays out the same way, and the result keeps the seed so any
+battle can be fought again (see battle_replay).
+
+Early Endings
+------------
+Unless every event is logged, the outcome is checked after each
+regeneration against worst-case bounds. A warrior is proven to survive
+when its regeneration heals at least the most damage the enemy team can
+deal before the next regeneration, or when its HP exceeds the most damage
+that fits in the time left. When both teams have such a warrior the
+battle is a draw and ends at once. Callers that only need the winner can
+also ask for battles to end when one team is proven to survive and the
+other cannot absorb the damage it is guaranteed to take.
+
+The bounds only hold while damage taken is positive and regeneration
+never hurts; a battle with any warrior outside that range, such as one
+with very negative Dexterity, is always fought to the end.
+"""
+
+import bisect
+import functools
+import heapq
+import math
+import random
+from array import array
+from collections import namedtuple
+
+import battle_targeting
+
+# Battle clock: time is counted in whole ticks of 0.1 seconds
+TICKS_PER_SECOND = 10
+
+# 5 minute time limit
+MAX_BATTLE_TICKS = 300 * TICKS_PER_SECOND
+
+# Queue order of the once-per-second regeneration event
+REGEN_EVENT = -1
+
+# Size of the seeds drawn for battles fought without one
+SEED_BITS = 64
+
+# Warriors start at level 1 and gain their per-level increments up to here
+MAX_LEVEL = 20
+
+# Battle log levels: nothing, initial stats and result, or every event
+LOG_OFF = 0
+LOG_SUMMARY = 1
+LOG_FULL = 2
+
+# Kinds of battle log events
+EVENT_REGEN = 0
+EVENT_MISS = 1
+EVENT_WEAK_SPOT = 2
+EVENT_STUN = 3
+EVENT_HIT = 4
+EVENT_DEFEAT = 5
+
+
+def seconds_to_ticks(seconds):
+    # Round up so an action is never taken before its time is due
+    return max(0, math.ceil(round(seconds * TICKS_PER_SECOND, 9)))
+
+
+# Longest delay that all the stuns of a battle can add to one warrior
+MAX_STUN_TICKS = sum(seconds_to_ticks(0.5 ** stuns) for stuns in range(64))
+
+
+class BattleResult:
+    """
+    Outcome of one battle.
+    
+    The battle log is kept as compact event tuples and only turned into
+    text when the report is read.
+    
+    Args:
+    winner (int): 1 or 2 for the winning team, 0 for a draw
+    ticks (int): Battle duration in ticks
+    fighters (list): Initial stats of every fighter, Team 1 first
+    team1_size (int): Number of fighters in Team 1
+    events (list): (tick, kind, attacker, target, value) event tuples
+    log_level (int): LOG_OFF, LOG_SUMMARY or LOG_FULL
+    seed (int): Seed of the battle's random stream, None if the caller
+    passed its own stream
+    targeting (tuple): Targeting policy classes of Team 1 and Team 2, None
+    for random targets
+    """
+    
+    def __init__(self, winner, ticks, fighters=(), team1_size=0, events=(), log_level=LOG_FULL, seed=None,
+                 targeting=(None, None)):
+        self.winner = winner
+        self.ticks = ticks
+        self.fighters = fighters
+        self.team1_size = team1_size
+        self.events = events
+        self.log_level = log_level
+        self.seed = seed
+        self.targeting = targeting
+        self._report = None
+    
+    @property
+    def duration(self):
+        # Battle duration in seconds
+        return self.ticks / TICKS_PER_SECOND
+    
+    @property
+    def report(self):
+        # Human readable battle report, rendered on first use
+        if self._report is None:
+            self._report = render_report(self)
+        return self._report
+
+
+def render_event(kind, attacker, target, value):
+    # Log line of one event, given the fighters' names
+    if kind == EVENT_REGEN:
+        return f"{attacker} regenerates {value:.1f} HP"
+    if kind == EVENT_MISS:
+        return f"{attacker}'s attack misses {target}!"
+    if kind == EVENT_WEAK_SPOT:
+        return f"{attacker} finds a weak spot on {target}!"
+    if kind == EVENT_STUN:
+        return f"{attacker} stuns {target} for {value:.1f}s!"
+    if kind == EVENT_HIT:
+        final_damage, base_damage = value
+        return f"{attacker} deals {final_damage:.1f} damage to {target} (reduced from {base_damage:.1f})"
+    return f"{target} has been defeated!"
+
+
+def render_report(result):
+    """
+    Turn a battle result into the text battle report.
+    
+    Args:
+    result (BattleResult): Battle to describe
+    
+    Returns:
+    str: The report; its detail depends on the result's log level
+    """
+    lines = ["=== Battle Report ===", ""]
+    if result.seed is not None:
+        lines += [f"Seed: {result.seed}", ""]
+    if any(result.targeting):
+        names = [battle_targeting.policy_name(policy) for policy in result.targeting]
+        lines += [f"Targeting: Team 1 {names[0]}, Team 2 {names[1]}", ""]
+    if result.log_level != LOG_OFF:
+        lines.append("Initial Stats:")
+        for team_name, fighters in [("Team 1", result.fighters[:result.team1_size]),
+                                    ("Team 2", result.fighters[result.team1_size:])]:
+            lines.append(f"\n{team_name}:")
+            for name, warrior_type, hp, hp_regen, defense, min_dmg, max_dmg, cooldown in fighters:
+                lines.append(
+                    f"{name} ({warrior_type}):\n"
+                    f"  HP: {hp:.1f}\n"
+                    f"  HP Regen: {hp_regen:.2f}/s\n"
+                    f"  Defense: {defense:.1f}\n"
+                    f"  Damage: {min_dmg:.1f}-{max_dmg:.1f}\n"
+                    f"  Attack Speed: {1/cooldown:.2f}/s"
+                )
+        lines.append("\nBattle Begin!")
+    
+    # Group the events by the tick they happened on
+    names = [fighter[0] for fighter in result.fighters]
+    current_tick = None
+    for tick, kind, attacker, target, value in result.events:
+        if tick != current_tick:
+            lines.append(f"\nTime {tick / TICKS_PER_SECOND:.1f}s:")
+            current_tick = tick
+        lines.append(render_event(kind, names[attacker], names[target], value))
+    
+    # Add victory declaration
+    lines.append("\nBattle Results:")
+    if result.winner == 1:
+        lines.append("Team 1 is victorious!")
+    elif result.winner == 2:
+        lines.append("Team 2 is victorious!")
+    else:
+        lines.append("Battle ended in a draw (time limit reached)")
+    
+    return "\n".join(lines) + "\n"
+
+
+# Derived combat stats of one warrior with one item. Profiles never change
+# once compiled, so they can be cached and shared between battles.
+CombatProfile = namedtuple("CombatProfile", [
+    "name", "type", "hp", "hp_regen", "defense", "damage_taken",
+    "min_dmg", "max_dmg", "cooldown", "cooldown_ticks"
+])
+
+# Numbers of a CombatProfile, everything after the name and type
+PROFILE_STATS = len(CombatProfile._fields) - 2
+
+
+def level_stats(warrior, level):
+    """
+    Toughness, dexterity and intelligence of a warrior at a level.
+    
+    Args:
+    warrior (Warrior): The warrior record
+    level (int): Level from 1; each level above 1 adds inctough, incdex and incsmart
+    
+    Returns:
+    tuple: (tough, dex, smart)
+    """
+    if level < 1:
+        raise ValueError(f"Level must be at least 1, not {level}")
+    gained = level - 1
+    return (warrior.tough + warrior.inctough * gained,
+            warrior.dex + warrior.incdex * gained,
+            warrior.smart + warrior.incsmart * gained)
+
+
+def compile_profile(warrior_data):
+    """
+    Derive the combat stats of a warrior and its item.
+    
+    Args:
+    warrior_data (dict): {'warrior': Warrior record, 'item': Item record or None},
+    optionally with the warrior's 'level' (1 when missing)
+    
+    Returns:
+    CombatProfile: The warrior's stats as used in battle
+    """
+    warrior = warrior_data['warrior']
+    item = warrior_data['item']
+    
+    # Stats at the warrior's level plus item bonuses if an item is equipped
+    tough, dex, smart = level_stats(warrior, warrior_data.get('level', 1))
+    if item:
+        tough += item.add_tough
+        dex += item.add_dex
+        smart += item.add_smart
+    
+    # Calculate derived stats
+    base_hp = 150
+    hp = base_hp + tough * 20
+    hp_regen = 0.25 + tough * 0.05
+    defense = dex * 2
+    attack_speed = dex
+    
+    # Apply additional item bonuses
+    if item:
+        hp += item.add_hp
+        hp_regen += item.add_hp_regen
+        defense += item.add_defense
+        attack_speed += item.add_attack_speed
+    
+    # Share of incoming damage left after defense
+    damage_reduction = (0.06 * defense) / (1 + 0.06 * defense)
+    
+    # Calculate actual damage range
+    min_dmg = warrior.min_dmg + smart * 3
+    max_dmg = warrior.max_dmg + smart * 3
+    
+    if item:
+        min_dmg += item.add_dmg
+        max_dmg += item.add_dmg
+    
+    # Calculate attack cooldown
+    base_cooldown = warrior.attack_time
+    actual_cooldown = base_cooldown / (1 + attack_speed/100)
+    
+    # A warrior can attack at most once per tick
+    cooldown_ticks = max(1, seconds_to_ticks(actual_cooldown))
+    
+    return CombatProfile(
+        warrior.name, warrior.type, hp, hp_regen, defense, 1 - damage_reduction,
+        min_dmg, max_dmg, actual_cooldown, cooldown_ticks
+    )
+
+
+class LevelTable:
+    """
+    Item-free combat stats of warriors at every level, in one flat array.
+    
+    Each warrior owns a block of max_level rows of PROFILE_STATS numbers;
+    row level - 1 holds its CombatProfile at that level, so a profile at
+    any level is one slice of the array. A warrior's block is reserved when
+    it is added or first looked up, but each row is only compiled the first
+    time its level is asked for. Blocks of discarded warriors are reused.
+    
+    Args:
+    warriors (iterable): Warrior records to reserve blocks for now
+    max_level (int): Highest level in the table
+    """
+    
+    def __init__(self, warriors=(), max_level=MAX_LEVEL):
+        self.max_level = max_level
+        self.block_size = max_level * PROFILE_STATS
+        self.stats = array('d')
+        self.filled = bytearray()  # 1 for every row that has been compiled
+        self.blocks = {}  # warrior name -> start of its block
+        self.free = []
+        for warrior in warriors:
+            self.add(warrior)
+    
+    def __contains__(self, name):
+        return name in self.blocks
+    
+    def add(self, warrior):
+        # Reserve an empty block for the warrior
+        self.discard(warrior.name)
+        if self.free:
+            start = self.free.pop()
+        else:
+            start = len(self.stats)
+            self.stats.extend(array('d', bytes(8 * self.block_size)))
+            self.filled.extend(bytes(self.max_level))
+        self.blocks[warrior.name] = start
+        return start
+    
+    def profile(self, warrior, level=1):
+        """
+        Item-free CombatProfile of a warrior at a level.
+        
+        Args:
+        warrior (Warrior): The warrior record
+        level (int): Level from 1 to max_level
+        
+        Returns:
+        CombatProfile: The warrior's stats at that level
+        """
+        if not 1 <= level <= self.max_level:
+            raise ValueError(f"Level must be from 1 to {self.max_level}, not {level}")
+        start = self.blocks.get(warrior.name)
+        if start is None:
+            start = self.add(warrior)
+        offset = start + (level - 1) * PROFILE_STATS
+        row = offset // PROFILE_STATS
+        if not self.filled[row]:
+            profile = compile_profile({'warrior': warrior, 'item': None, 'level': level})
+            self.stats[offset:offset + PROFILE_STATS] = array('d', profile[2:])
+            self.filled[row] = 1
+            return profile
+        *stats, cooldown_ticks = self.stats[offset:offset + PROFILE_STATS]
+        return CombatProfile(warrior.name, warrior.type, *stats, int(cooldown_ticks))
+    
+    def discard(self, name):
+        start = self.blocks.pop(name, None)
+        if start is not None:
+            row = start // PROFILE_STATS
+            self.filled[row:row + self.max_level] = bytes(self.max_level)
+            self.free.append(start)
+    
+    def clear(self):
+        self.stats = array('d')
+        self.filled = bytearray()
+        self.blocks.clear()
+        self.free.clear()
+
+
+class ProfileCache:
+    """
+    Compiled combat profiles keyed by (warrior name, item name, level).
+    
+    Profiles without an item come from a LevelTable, which compiles each
+    warrior at a level the first time that level is used. Callers must invalidate a warrior or an
+    item when its record changes; only the profiles built from that record
+    are dropped.
+    """
+    
+    def __init__(self):
+        self.profiles = {}
+        self.keys_by_warrior = {}
+        self.keys_by_item = {}
+        self.levels = LevelTable()
+    
+    def get(self, warrior_data):
+        # Look up the profile, compiling it on first use
+        item = warrior_data['item']
+        level = warrior_data.get('level', 1)
+        key = (warrior_data['warrior'].name, item.name if item else None, level)
+        profile = self.profiles.get(key)
+        if profile is None:
+            if item is None and level <= self.levels.max_level:
+                profile = self.levels.profile(warrior_data['warrior'], level)
+            else:
+                profile = compile_profile(warrior_data)
+            self.profiles[key] = profile
+            self.keys_by_warrior.setdefault(key[0], set()).add(key)
+            self.keys_by_item.setdefault(key[1], set()).add(key)
+        return profile
+    
+    def invalidate_warrior(self, name):
+        self.levels.discard(name)
+        for key in self.keys_by_warrior.pop(name, ()):
+            del self.profiles[key]
+            self.keys_by_item[key[1]].discard(key)
+    
+    def invalidate_item(self, name):
+        for key in self.keys_by_item.pop(name, ()):
+            del self.profiles[key]
+            self.keys_by_warrior[key[0]].discard(key)
+    
+    def clear(self):
+        self.profiles.clear()
+        self.keys_by_warrior.clear()
+        self.keys_by_item.clear()
+        self.levels.clear()
+
+
+def as_profile(entry, cache=None):
+    # Accept either a compiled profile or a {'warrior', 'item'} entry
+    if isinstance(entry, CombatProfile):
+        return entry
+    if cache is not None:
+        return cache.get(entry)
+    return compile_profile(entry)
+
+
+def init_warrior_state(entry):
+    """
+    Build the mutable combat state of one warrior.
+    
+    Args:
+    entry (CombatProfile or dict): Profile or {'warrior': ..., 'item': ...}
+    
+    Returns:
+    dict: Combat stats plus the battle timers, in ticks
+    """
+    profile = as_profile(entry)
+    
+    # Timers are whole ticks so the battle clock never drifts
+    state = {
+        'name': profile.name,
+        'type': profile.type,
+        'hp': profile.hp,
+        'max_hp': profile.hp,
+        'hp_regen': profile.hp_regen,
+        'defense': profile.defense,
+        'damage_taken': profile.damage_taken,
+        'min_dmg': profile.min_dmg,
+        'max_dmg': profile.max_dmg,
+        'cooldown': profile.cooldown,
+        'cooldown_ticks': profile.cooldown_ticks,
+        'next_attack': profile.cooldown_ticks,
+        'next_action': profile.cooldown_ticks,
+        'stun_end': 0,
+        'stun_immune': 0,
+        'stun_diminish': 1.0
+    }
+    
+    return state
+
+
+# Worst-case damage bounds of a warrior against an enemy team:
+# burst - most damage taken between two regenerations
+# damage_rate, hit_sum - most damage taken in n ticks is n * damage_rate + hit_sum
+# max_hit_taken - most damage taken from one attack
+# min_hit_dealt - least damage dealt by one attack, 0 if it can miss
+# stun_slack - most delay the enemy's stuns can still add to its attacks
+# proof_tick - first tick survives can hold
+DamageBounds = namedtuple("DamageBounds", [
+    "burst", "damage_rate", "hit_sum", "max_hit_taken", "min_hit_dealt", "stun_slack", "proof_tick"
+])
+
+# Matchups whose bounds are kept for the next battle
+BOUNDS_CACHE_SIZE = 4096
+
+
+def provable(profile):
+    """
+    Whether the damage bounds hold for a warrior.
+    
+    They assume damage taken is positive, so a bigger roll always hurts
+    more, and regeneration never lowers HP. Battles with any warrior
+    outside that range are never ended early.
+    
+    Args:
+    profile (CombatProfile): The warrior
+    
+    Returns:
+    bool: True if its bounds can be used to prove an outcome
+    """
+    return profile.damage_taken > 0 and profile.hp_regen >= 0
+
+
+class EnemyHits:
+    """
+    Sums of an enemy team's worst-case hits on any one target.
+    
+    Hits are grouped by attacker type and sorted by their highest roll,
+    with prefix sums per weight, so summing every enemy's hits on a target
+    takes a few binary searches instead of a pass over the whole team.
+    Rolls are uniform between min_dmg and max_dmg in either order, so the
+    highest roll is the larger of the two and the lowest the smaller.
+    
+    Args:
+    enemies (tuple): CombatProfiles of the enemy team
+    """
+    
+    # Weights of a hit: once, per tick, and attacks between two regenerations
+    WEIGHTS = 3
+    
+    def __init__(self, enemies):
+        self.types = {enemy.type for enemy in enemies}
+        self.min_damage_taken = min(enemy.damage_taken for enemy in enemies)
+        self.groups = []
+        for warrior_type in sorted(self.types):
+            group = sorted((enemy for enemy in enemies if enemy.type == warrior_type),
+                           key=lambda enemy: max(enemy.min_dmg, enemy.max_dmg))
+            highest = [max(enemy.min_dmg, enemy.max_dmg) for enemy in group]
+            weights = [(1, 1 / enemy.cooldown_ticks, -(-TICKS_PER_SECOND // enemy.cooldown_ticks))
+                       for enemy in group]
+            # prefix[k] holds the sums of each weight and of weight * highest roll
+            # over the k weakest hitters
+            prefix = [(0.0,) * (2 * self.WEIGHTS)]
+            for roll, weight in zip(highest, weights):
+                last = prefix[-1]
+                prefix.append(tuple(last[i] + weight[i] for i in range(self.WEIGHTS)) +
+                              tuple(last[self.WEIGHTS + i] + weight[i] * roll for i in range(self.WEIGHTS)))
+            self.groups.append((warrior_type, highest, prefix))
+    
+    def totals(self, target):
+        """
+        Worst-case hits of the whole team on one target.
+        
+        Args:
+        target (CombatProfile): The warrior being hit; its damage taken
+        must be positive (see provable)
+        
+        Returns:
+        tuple: (hit_sum, damage_rate, burst, max_hit_taken)
+        """
+        sums = [0.0] * self.WEIGHTS
+        largest = 1
+        for warrior_type, highest, prefix in self.groups:
+            # A hit deals at most max(1, highest roll * scale): 1 below the cut,
+            # scaled above it
+            bonus = 1.5 if warrior_type == 'Smart' and target.type == 'Tough' else 1.0
+            scale = target.damage_taken * bonus
+            cut = prefix[bisect.bisect_left(highest, 1 / scale)]
+            last = prefix[-1]
+            for i in range(self.WEIGHTS):
+                sums[i] += cut[i] + scale * (last[self.WEIGHTS + i] - cut[self.WEIGHTS + i])
+            largest = max(largest, highest[-1] * scale)
+        return sums[0], sums[1], sums[2], largest
+    
+    def min_hit_from(self, attacker):
+        # Least damage the attacker deals to any of these enemies, 0 if it can miss
+        if attacker.type == 'Smart' and 'Dexterous' in self.types:
+            return 0.0
+        return max(1, min(attacker.min_dmg, attacker.max_dmg) * self.min_damage_taken)
+
+
+def damage_bounds(profile, enemies):
+    """
+    Worst-case damage bounds of a warrior against an enemy team.
+    
+    The bounds count every enemy, so they stay valid as enemies fall.
+    
+    Args:
+    profile (CombatProfile): The warrior
+    enemies (EnemyHits): Hits of the enemy team
+    
+    Returns:
+    DamageBounds: Bounds used to prove the outcome of a battle early
+    """
+    # At most ceil(10 / cooldown) attacks per enemy between two regenerations
+    hit_sum, damage_rate, burst, largest = enemies.totals(profile)
+    stun_slack = 0
+    if profile.type == 'Dexterous' and 'Tough' in enemies.types:
+        stun_slack = MAX_STUN_TICKS
+    
+    # At once if regeneration outheals any burst, otherwise once even full
+    # HP exceeds the damage still possible
+    if profile.hp_regen >= burst and profile.hp > burst:
+        first_proof = 0
+    elif profile.hp > hit_sum:
+        first_proof = MAX_BATTLE_TICKS - (profile.hp - hit_sum) / damage_rate
+    else:
+        first_proof = math.inf
+    
+    return DamageBounds(burst, damage_rate, hit_sum, largest, enemies.min_hit_from(profile),
+                        stun_slack, first_proof)
+
+
+@functools.lru_cache(maxsize=BOUNDS_CACHE_SIZE)
+def battle_bounds(team1, team2):
+    """
+    DamageBounds of every warrior of a matchup, cached per matchup.
+    
+    Args:
+    team1 (tuple): CombatProfiles of Team 1
+    team2 (tuple): CombatProfiles of Team 2
+    
+    Returns:
+    tuple: (bounds of every warrior in attack order, first proof tick of
+    each team); no bounds and infinite proof ticks unless both teams have
+    warriors and every warrior is provable
+    """
+    # An empty team has already lost, there is nothing to bound
+    if not (team1 and team2) or not all(provable(profile) for profile in team1 + team2):
+        return (), (math.inf, math.inf)
+    hits1 = EnemyHits(team1)
+    hits2 = EnemyHits(team2)
+    bounds1 = [damage_bounds(profile, hits2) for profile in team1]
+    bounds2 = [damage_bounds(profile, hits1) for profile in team2]
+    proof_ticks = (min(bounds.proof_tick for bounds in bounds1), min(bounds.proof_tick for bounds in bounds2))
+    return tuple(bounds1 + bounds2), proof_ticks
+
+
+def survives(state, remaining):
+    """
+    Whether a warrior is proven to survive the rest of the battle.
+    
+    Args:
+    state (dict): Combat state with its DamageBounds, right after a regeneration
+    remaining (int): Ticks left before the time limit
+    
+    Returns:
+    bool: True if no sequence of rolls can defeat the warrior in time
+    """
+    hp = state['hp']
+    if hp <= 0:
+        return False
+    bounds = state['bounds']
+    # Healed back above the worst burst every second, so never below it
+    if state['hp_regen'] >= bounds.burst and hp > bounds.burst:
+        return True
+    # At most ceil(remaining / cooldown) more attacks per enemy
+    return hp > remaining * bounds.damage_rate + bounds.hit_sum
+
+
+def proven_outcome(teams, tick, outcome_only):
+    """
+    Winner of a battle if it is already certain, checked right after a regeneration.
+    
+    Args:
+    teams (list): Combat states of Team 1 and Team 2
+    tick (int): Current tick
+    outcome_only (bool): Also end battles with a certain winner, not only draws
+    
+    Returns:
+    int: 1 or 2 for a certain winner, 0 for a certain draw, None otherwise
+    """
+    remaining = MAX_BATTLE_TICKS - tick
+    survivors = [[state for state in team if survives(state, remaining)] for team in teams]
+    if survivors[0] and survivors[1]:
+        return 0
+    if not outcome_only:
+        return None
+    
+    for side in (0, 1):
+        if not survivors[side] or survivors[1 - side]:
+            continue
+        # Damage the survivors are sure to deal before the time limit...
+        guaranteed = 0.0
+        for state in survivors[side]:
+            first = state['next_action'] + state['bounds'].stun_slack
+            if first < MAX_BATTLE_TICKS:
+                attacks = (MAX_BATTLE_TICKS - 1 - first) // state['cooldown_ticks'] + 1
+                guaranteed += attacks * state['bounds'].min_hit_dealt
+        
+        # ...against the most the other team can soak up, overkill included
+        regens = (MAX_BATTLE_TICKS - 1 - tick) // TICKS_PER_SECOND
+        absorbed = sum(state['hp'] + state['hp_regen'] * regens + state['bounds'].max_hit_taken
+                       for state in teams[1 - side] if state['hp'] > 0)
+        if guaranteed > absorbed:
+            return side + 1
+    return None
+
+
+def simulate_battle(team1, team2, rng=None, seed=None, log_level=LOG_FULL, outcome_only=False, targeting=None):
+    """
+    Fight one battle between two teams.
+    
+    Args:
+    team1 (list): CombatProfile or {'warrior': ..., 'item': ...} entries for Team 1
+    team2 (list): CombatProfile or {'warrior': ..., 'item': ...} entries for Team 2
+    rng (random.Random): Random stream to draw from instead of a seeded one
+    seed (int): Seed of the battle's own random stream, a new one is drawn
+    when neither rng nor seed is given
+    log_level (int): LOG_OFF, LOG_SUMMARY or LOG_FULL
+    outcome_only (bool): End the battle as soon as its winner is certain;
+    the duration is then the tick it became certain
+    targeting: Targeting policy of both teams or a (Team 1, Team 2) pair,
+    see battle_targeting; random targets by default
+    
+    Returns:
+    BattleResult: The winner, the battle duration and the battle log
+    """
+    if rng is None:
+        if seed is None:
+            seed = random.getrandbits(SEED_BITS)
+        rng = random.Random(seed)
+    else:
+        seed = None  # The caller's stream is not reproducible from a seed
+    
+    # Initialize battle states
+    team1 = [as_profile(entry) for entry in team1]
+    team2 = [as_profile(entry) for entry in team2]
+    team1_states = [init_warrior_state(w) for w in team1]
+    team2_states = [init_warrior_state(w) for w in team2]
+    
+    # Every combatant in attack order, with the team it fights for
+    states = team1_states + team2_states
+    team_of = [0] * len(team1_states) + [1] * len(team2_states)
+    for index, state in enumerate(states):
+        state['slot'] = index
+    
+    # Slots of each team's living warriors, in roster order. The fallen are
+    # taken out as they fall, so picking a target never scans the team.
+    living = [list(range(len(team1_states))), list(range(len(team1_states), len(states)))]
+    
+    # Each team's targeting policy, watching the enemy team; None picks at random
+    targeting = battle_targeting.resolve(targeting)
+    policies = [policy(enemy_states) if policy else None
+                for policy, enemy_states in zip(targeting, (team2_states, team1_states))]
+    
+    # Keep the initial stats for the report
+    fighters = ()
+    if log_level >= LOG_SUMMARY:
+        fighters = [
+            (state['name'], state['type'], state['hp'], state['hp_regen'], state['defense'],
+             state['min_dmg'], state['max_dmg'], state['cooldown'])
+            for state in states
+        ]
+    
+    # Only record events when someone may read them
+    events = []
+    log = events.append if log_level >= LOG_FULL else None
+    
+    # A full log shows the whole battle, otherwise it may end once decided.
+    # A draw needs a proven survivor on both teams, a certain winner on one.
+    proven = None
+    check_from = math.inf
+    if log is None:
+        bounds, proof_ticks = battle_bounds(tuple(team1), tuple(team2))
+        for state, state_bounds in zip(states, bounds):
+            state['bounds'] = state_bounds
+        check_from = min(proof_ticks) if outcome_only else max(proof_ticks)
+    
+    # Event queue of (tick, order). Regen uses order -1 so it runs before
+    # any attack on the same tick; attackers keep their roster order.
+    queue = [(state['next_action'], index) for index, state in enumerate(states)]
+    queue.append((TICKS_PER_SECOND, REGEN_EVENT))
+    heapq.heapify(queue)
+    
+    # Battle simulation loop
+    max_ticks = MAX_BATTLE_TICKS
+    tick = 0
+    
+    while queue and living[0] and living[1]:
+        tick, index = heapq.heappop(queue)
+        if tick >= max_ticks:
+            break
+        
+        # Process HP regeneration every second
+        if index == REGEN_EVENT:
+            for slot in living[0] + living[1]:
+                warrior = states[slot]
+                if warrior['hp'] < warrior['max_hp']:
+                    regen = min(warrior['hp_regen'], warrior['max_hp'] - warrior['hp'])
+                    warrior['hp'] += regen
+                    if log:
+                        log((tick, EVENT_REGEN, slot, slot, regen))
+                    if warrior['hp'] <= 0:
+                        # Drained to death by its own regeneration
+                        if log:
+                            log((tick, EVENT_DEFEAT, slot, slot, 0.0))
+                        team = living[team_of[slot]]
+                        del team[bisect.bisect_left(team, slot)]
+                    elif regen < 0 and policies[1 - team_of[slot]] is not None:
+                        # Draining regeneration lowers HP like a hit does
+                        policies[1 - team_of[slot]].damaged(warrior)
+            if not (living[0] and living[1]):
+                break
+            heapq.heappush(queue, (tick + TICKS_PER_SECOND, REGEN_EVENT))
+            if tick >= check_from:
+                proven = proven_outcome((team1_states, team2_states), tick, outcome_only)
+                if proven is not None:
+                    break
+            continue
+        
+        # Skip dead warriors and attacks that were pushed back by a stun
+        attacker = states[index]
+        if attacker['hp'] <= 0 or attacker['next_action'] != tick:
+            continue
+        
+        # Choose target from opposite team
+        policy = policies[team_of[index]]
+        targets = living[1 - team_of[index]]
+        if len(targets) == 1:
+            target = states[targets[0]]
+        elif policy is None:
+            target = states[rng.choice(targets)]
+        else:
+            target = policy.pick(attacker)
+        
+        # Process type advantages
+        miss = False
+        bonus_dmg = 1.0
+        
+        if attacker['type'] == 'Smart' and target['type'] == 'Dexterous':
+            if rng.random() < 0.2:  # 20% chance to miss
+                miss = True
+                if log:
+                    log((tick, EVENT_MISS, index, target['slot'], 0.0))
+        
+        elif attacker['type'] == 'Smart' and target['type'] == 'Tough':
+            if rng.random() < 0.2:  # 20% chance for bonus damage
+                bonus_dmg = 1.5
+                if log:
+                    log((tick, EVENT_WEAK_SPOT, index, target['slot'], bonus_dmg))
+        
+        elif attacker['type'] == 'Tough' and target['type'] == 'Dexterous':
+            if rng.random() < 0.2 and tick >= target['stun_immune']:  # 20% chance to stun
+                stun_duration = target['stun_diminish']
+                target['stun_end'] = tick + seconds_to_ticks(stun_duration)
+                target['stun_immune'] = tick + seconds_to_ticks(stun_duration + 1)
+                target['stun_diminish'] *= 0.5
+                if log:
+                    log((tick, EVENT_STUN, index, target['slot'], stun_duration))
+                
+                # Push the target's pending attack back to the end of the stun
+                if target['next_action'] < target['stun_end']:
+                    target['next_action'] = target['stun_end']
+                    heapq.heappush(queue, (target['next_action'], target['slot']))
+        
+        if not miss:
+            # Calculate damage
+            base_damage = rng.uniform(attacker['min_dmg'], attacker['max_dmg'])
+            final_damage = max(1, base_damage * target['damage_taken'] * bonus_dmg)
+            
+            target['hp'] -= final_damage
+            if log:
+                log((tick, EVENT_HIT, index, target['slot'], (final_damage, base_damage)))
+            
+            if target['hp'] <= 0:
+                if log:
+                    log((tick, EVENT_DEFEAT, index, target['slot'], 0.0))
+                del targets[bisect.bisect_left(targets, target['slot'])]
+            elif policy is not None:
+                policy.damaged(target)
+        
+        # Set next attack time
+        attacker['next_attack'] = tick + attacker['cooldown_ticks']
+        attacker['next_action'] = max(attacker['next_attack'], attacker['stun_end'])
+        heapq.heappush(queue, (attacker['next_action'], index))
+    
+    # Check victory conditions
+    if proven:
+        winner = proven
+    elif not living[1]:
+        winner = 1
+    elif not living[0]:
+        winner = 2
+    else:
+        winner = 0
+        tick = max_ticks
+    
+    return BattleResult(winner, tick, fighters, len(team1_states), events, log_level, seed, targeting)
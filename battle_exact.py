@@ -0,0 +1,514 @@
+"""
+Borders of Aeon: Exact 1v1 Odds
+==============================
+
+Win, loss and draw probabilities of a 1v1 battle by dynamic programming
+instead of sampling, so balance reports carry no sampling noise.
+
+How It Works
+-----------
+In a 1v1 battle the tick at which each warrior would fall depends only on
+the other warrior's attacks: its attack ticks, its damage rolls and the
+regeneration in between. So each warrior's fall tick has its own
+distribution, computed by a Markov chain over the warrior's HP and the
+attacker's timers, advanced tick by tick:
+
+- HP is counted in small steps, and one attack moves the HP distribution
+  down by the distribution of its damage in steps.
+- Regeneration moves it up once a second, capped at the maximum HP.
+  Draining regeneration moves it down instead, only while the warrior is
+  wounded, and can make it fall before the attacks of that tick.
+- When a Tough warrior can stun a Dexterous attacker, the attacker's next
+  action, stun immunity and number of stuns so far are part of the state,
+  so the delays of stuns are followed exactly.
+
+The two distributions are then combined in tick order. Falls to draining
+regeneration come before the attacks of their tick. Team 1 wins ties,
+since it strikes first within a tick and wins when both are drained on
+the same tick, and a battle with no fall before the 5 minute limit is a
+draw.
+
+Error Bound
+----------
+Rounding HP to steps is the only approximation; the step is picked so
+that regeneration is a whole number of steps where possible. Each chain
+is solved three times: rounding damage up, rounding it down, and
+splitting it between the two nearest steps so its mean is kept. The
+first two bound the true probabilities from both sides and the third
+gives the reported ones, with the error bound being the largest distance
+to a bound. solve refines the steps until the bound is below max_error.
+
+Solved chains are remembered, so repeated matchups are instant.
+"""
+
+import functools
+import math
+
+import battle_engine
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional and only speeds up the chains
+    np = None
+
+# Chance that a type advantage triggers on an attack
+ADVANTAGE_CHANCE = 0.2
+
+# HP steps per warrior in the first, coarsest solve
+INITIAL_STEPS = 64
+
+# Finest HP resolution tried before giving up on max_error
+MAX_STEPS = 8192
+
+# Probability mass small enough to drop from the chain
+NEGLIGIBLE = 1e-15
+
+# Solved chains kept for repeated matchups
+CHAIN_CACHE_SIZE = 256
+
+# Damage rounding of a chain: against the target, in its favor, or mean-preserving
+ROUND_UP = "up"
+ROUND_DOWN = "down"
+ROUND_SPLIT = "split"
+
+
+def stun_table():
+    # (stun ticks, immunity ticks) after 0, 1, 2, ... stuns, as the engine
+    # computes them, until stuns round down to nothing; the last entry
+    # repeats forever
+    table = []
+    duration = 1.0
+    while not table or table[-1][0] > 0:
+        table.append((battle_engine.seconds_to_ticks(duration), battle_engine.seconds_to_ticks(duration + 1)))
+        duration *= 0.5
+    return table
+
+
+STUN_TABLE = stun_table()
+
+
+def in_steps(value, hp_step):
+    # value / hp_step, snapped to a whole number when float error is all that separates them
+    steps = value / hp_step
+    if abs(steps - round(steps)) < 1e-9:
+        return float(round(steps))
+    return steps
+
+
+def round_steps(steps, rounding):
+    # Whole steps of a quantity that works against the target (damage)
+    if rounding == ROUND_UP:
+        return math.ceil(steps)
+    if rounding == ROUND_DOWN:
+        return math.floor(steps)
+    return round(steps)
+
+
+def favor_steps(steps, rounding):
+    # Whole steps of a quantity that works for the target (HP, regeneration)
+    return round_steps(steps, {ROUND_UP: ROUND_DOWN, ROUND_DOWN: ROUND_UP}.get(rounding, rounding))
+
+
+def damage_pieces(attacker, target):
+    """
+    Distribution of the damage of one attack.
+
+    Args:
+    attacker (CombatProfile): Attacking warrior
+    target (CombatProfile): Defending warrior
+
+    Returns:
+    list: (probability, low, high) pieces, uniform between low and high or
+    exactly low when they are equal
+    """
+    # Mixture of (probability, damage factor); a miss deals no damage
+    outcomes = [(1.0, 1.0)]
+    if attacker.type == 'Smart' and target.type == 'Dexterous':
+        outcomes = [(1 - ADVANTAGE_CHANCE, 1.0), (ADVANTAGE_CHANCE, 0.0)]
+    elif attacker.type == 'Smart' and target.type == 'Tough':
+        outcomes = [(1 - ADVANTAGE_CHANCE, 1.0), (ADVANTAGE_CHANCE, 1.5)]
+
+    pieces = []
+    for weight, factor in outcomes:
+        if factor == 0.0:
+            pieces.append((weight, 0.0, 0.0))
+            continue
+        # A hit deals max(1, base * damage_taken * bonus), base uniform
+        low = attacker.min_dmg * target.damage_taken * factor
+        high = attacker.max_dmg * target.damage_taken * factor
+        # The engine draws between the two ends in either order
+        low, high = min(low, high), max(low, high)
+        if high <= 1 or high == low:
+            pieces.append((weight, max(1.0, low), max(1.0, low)))
+        elif low >= 1:
+            pieces.append((weight, low, high))
+        else:
+            pieces.append((weight * (1 - low) / (high - low), 1.0, 1.0))
+            pieces.append((weight * (high - 1) / (high - low), 1.0, high))
+    return pieces
+
+
+def damage_kernel(attacker, target, hp_step, rounding):
+    """
+    Distribution of the damage of one attack, in HP steps.
+
+    Args:
+    attacker (CombatProfile): Attacking warrior
+    target (CombatProfile): Defending warrior
+    hp_step (float): HP per step
+    rounding (str): ROUND_UP, ROUND_DOWN or ROUND_SPLIT
+
+    Returns:
+    list: (steps, probability) pairs
+    """
+    kernel = {}
+
+    def place(steps, p):
+        # Put probability p on a damage of steps, splitting it if fractional
+        if rounding != ROUND_SPLIT:
+            steps = round_steps(steps, rounding)
+            kernel[steps] = kernel.get(steps, 0.0) + p
+            return
+        whole = math.floor(steps)
+        fraction = steps - whole
+        kernel[whole] = kernel.get(whole, 0.0) + p * (1 - fraction)
+        if fraction:
+            kernel[whole + 1] = kernel.get(whole + 1, 0.0) + p * fraction
+
+    for weight, low, high in damage_pieces(attacker, target):
+        if high == low:
+            place(in_steps(low, hp_step), weight)
+            continue
+        # Cut the uniform range at step boundaries and place each part at its middle
+        for step in range(math.floor(low / hp_step), math.ceil(high / hp_step)):
+            part_low = max(low, step * hp_step)
+            part_high = min(high, (step + 1) * hp_step)
+            if part_high <= part_low:
+                continue
+            p = weight * (part_high - part_low) / (high - low)
+            if rounding == ROUND_SPLIT:
+                place((part_low + part_high) / 2 / hp_step, p)
+            else:
+                kernel_step = step + 1 if rounding == ROUND_UP else step
+                kernel[kernel_step] = kernel.get(kernel_step, 0.0) + p
+    return sorted(kernel.items())
+
+
+def distribution(top):
+    # HP distribution of a warrior at full health, index = steps left
+    hp = np.zeros(top + 1) if np is not None else [0.0] * (top + 1)
+    hp[top] = 1.0
+    return hp
+
+
+def scale(hp, p):
+    if np is not None:
+        return hp * p
+    return [m * p for m in hp]
+
+
+def mass(hp):
+    if np is not None:
+        return float(hp.sum())
+    return sum(hp)
+
+
+def strike(hp, kernel):
+    # Apply one attack to an HP distribution; returns (new distribution, fall chance)
+    top = len(hp) - 1
+    if np is not None:
+        # The new distribution is a correlation of the old one with the kernel
+        width = kernel[-1][0]
+        dense = np.zeros(width + 1)
+        for steps, p in kernel:
+            dense[steps] = p
+        after = np.convolve(hp, dense[::-1])[width:width + top + 1]
+        after[0] = 0.0
+        # A warrior with k steps left falls to any hit of k steps or more
+        at_least = np.cumsum(dense[::-1])[::-1]
+        reach = min(top, width)
+        return after, float(np.dot(hp[1:reach + 1], at_least[1:reach + 1]))
+
+    after = [0.0] * (top + 1)
+    fallen = 0.0
+    prefix = [0.0] * (top + 1)  # prefix[k]: chance that HP is k steps or less
+    for steps in range(1, top + 1):
+        prefix[steps] = prefix[steps - 1] + hp[steps]
+    for steps, p in kernel:
+        if steps >= top:
+            fallen += p * prefix[top]
+            continue
+        fallen += p * prefix[steps]
+        after[1:top + 1 - steps] = [a + p * m for a, m in zip(after[1:top + 1 - steps], hp[1 + steps:])]
+    return after, fallen
+
+
+def heal(hp, steps):
+    # Heal every living state by a whole number of steps, capped at the top
+    top = len(hp) - 1
+    healed = np.zeros(top + 1) if np is not None else [0.0] * (top + 1)
+    if top - steps > 1:
+        healed[1 + steps:top] = hp[1:top - steps]
+    healed[top] = sum(hp[max(1, top - steps):]) if np is None else hp[max(1, top - steps):].sum()
+    return healed
+
+
+def drain(hp, steps):
+    # Drain every wounded state by a whole number of steps; the full state
+    # is untouched, as in the engine. Returns (new distribution, fall chance)
+    top = len(hp) - 1
+    drained = np.zeros(top + 1) if np is not None else [0.0] * (top + 1)
+    if top - steps > 1:
+        drained[1:top - steps] = hp[1 + steps:top]
+    drained[top] = hp[top]
+    return drained, mass(hp[1:min(steps + 1, top)])
+
+
+def shift(hp, steps):
+    # Regenerate by a whole number of steps; returns (new distribution, fall chance)
+    if steps < 0:
+        return drain(hp, -steps)
+    return heal(hp, steps), 0.0
+
+
+def regenerate(hp, steps):
+    # Regenerate by steps; fractional steps are split between the two nearest
+    # whole ones. Returns (new distribution, fall chance)
+    whole = math.floor(steps)
+    fraction = steps - whole
+    if not fraction:
+        return shift(hp, whole)
+    low, low_fallen = shift(hp, whole)
+    high, high_fallen = shift(hp, whole + 1)
+    return (merged(scale(low, 1 - fraction), scale(high, fraction)),
+            low_fallen * (1 - fraction) + high_fallen * fraction)
+
+
+def merged(hp, other):
+    if np is not None:
+        return hp + other
+    return [a + b for a, b in zip(hp, other)]
+
+
+def merge(states, state, hp):
+    # Add an HP distribution to a state
+    existing = states.get(state)
+    states[state] = hp if existing is None else merged(existing, hp)
+
+
+@functools.lru_cache(maxsize=CHAIN_CACHE_SIZE)
+def fall_ticks(attacker, target, hp_step, rounding, attacker_first):
+    """
+    Distribution of the tick at which target falls to attacker.
+
+    The attacker is assumed to keep fighting; combine two of these to
+    get the outcome of the battle.
+
+    Args:
+    attacker (CombatProfile): Attacking warrior
+    target (CombatProfile): Defending warrior
+    hp_step (float): HP per step
+    rounding (str): ROUND_UP, ROUND_DOWN or ROUND_SPLIT
+    attacker_first (bool): The attacker is on Team 1, so it acts before
+    the target within a tick
+
+    Returns:
+    tuple: (drained, struck) lists with the chance of falling at each tick
+    below MAX_BATTLE_TICKS to draining regeneration and to an attack
+    """
+    kernel = damage_kernel(attacker, target, hp_step, rounding)
+    top = max(1, favor_steps(in_steps(target.hp, hp_step), rounding))
+    regen = in_steps(target.hp_regen, hp_step)
+    if rounding != ROUND_SPLIT:
+        regen = favor_steps(regen, rounding)
+    stuns_attacker = target.type == 'Tough' and attacker.type == 'Dexterous'
+
+    # State: (attacker's next action, stun immunity end, stuns so far) -> HP distribution
+    states = {(attacker.cooldown_ticks, 0, 0): distribution(top)}
+    target_attack = target.cooldown_ticks  # The target is never stunned when it stuns
+    falls = [0.0] * battle_engine.MAX_BATTLE_TICKS
+    drained = [0.0] * battle_engine.MAX_BATTLE_TICKS
+
+    def attack(states, tick):
+        # The attacker strikes if its next action is due
+        advanced = {}
+        for (next_action, immune, stuns), hp in states.items():
+            if next_action == tick:
+                hp, fallen = strike(hp, kernel)
+                falls[tick] += fallen
+                if mass(hp) < NEGLIGIBLE:
+                    continue
+                next_action = tick + attacker.cooldown_ticks
+            merge(advanced, (next_action, immune, stuns), hp)
+        return advanced
+
+    def regenerate_all(states, tick):
+        # Regeneration of every state; draining regeneration may make the target fall
+        regenerated = {}
+        for state, hp in states.items():
+            hp, fallen = regenerate(hp, regen)
+            drained[tick] += fallen
+            if mass(hp) < NEGLIGIBLE:
+                continue
+            regenerated[state] = hp
+        return regenerated
+
+    def stun(states, tick):
+        # The target's attack may stun the attacker, pushing back its next action
+        branched = {}
+        for (next_action, immune, stuns), hp in states.items():
+            if tick < immune:
+                merge(branched, (next_action, immune, stuns), hp)
+                continue
+            merge(branched, (next_action, 0, stuns), scale(hp, 1 - ADVANTAGE_CHANCE))
+            if mass(hp) * ADVANTAGE_CHANCE < NEGLIGIBLE:
+                continue
+            stun_ticks, immune_ticks = STUN_TABLE[stuns]
+            stunned = (max(next_action, tick + stun_ticks), tick + immune_ticks,
+                       min(stuns + 1, len(STUN_TABLE) - 1))
+            merge(branched, stunned, scale(hp, ADVANTAGE_CHANCE))
+        return branched
+
+    for tick in range(1, battle_engine.MAX_BATTLE_TICKS):
+        if not states:
+            break
+
+        # Process HP regeneration every second
+        if tick % battle_engine.TICKS_PER_SECOND == 0 and regen:
+            states = regenerate_all(states, tick)
+
+        # Within a tick Team 1 acts first, as in the engine; a Team 1 stun
+        # stops a Team 2 attack due on the same tick
+        stunning = stuns_attacker and tick == target_attack
+        if stunning:
+            target_attack += target.cooldown_ticks
+        if stunning and not attacker_first:
+            states = stun(states, tick)
+        states = attack(states, tick)
+        if stunning and attacker_first:
+            states = stun(states, tick)
+
+    return drained, falls
+
+
+def combine(team1_falls, team2_falls):
+    # (Team 1 wins, Team 2 wins) from the (drained, struck) fall ticks of each side's warrior
+    team1_wins = 0.0
+    team2_wins = 0.0
+    team1_standing = 1.0  # Chance Team 1 has not fallen before this point
+    team2_standing = 1.0
+    for tick in range(battle_engine.MAX_BATTLE_TICKS):
+        # Regeneration comes before the attacks of a tick, and Team 1 strikes
+        # first, so it wins when both would fall at the same point
+        for team1_fall, team2_fall in zip(team1_falls, team2_falls):
+            team1_wins += team2_fall[tick] * team1_standing
+            team2_standing -= team2_fall[tick]
+            team2_wins += team1_fall[tick] * team2_standing
+            team1_standing -= team1_fall[tick]
+    return team1_wins, team2_wins
+
+
+def step_for(profile, steps):
+    # HP step of a warrior at a resolution, a whole fraction of its regeneration if possible
+    hp_step = max(profile.hp, 1.0) / steps
+    regen = abs(profile.hp_regen)
+    if regen >= hp_step:
+        hp_step = regen / round(regen / hp_step)
+    return hp_step
+
+
+class ExactOdds:
+    """
+    Outcome probabilities of a 1v1 battle with rigorous bounds.
+
+    Args:
+    team1_win (float): Chance Team 1 wins
+    team2_win (float): Chance Team 2 wins
+    team1_bounds (tuple): (low, high) bounds of Team 1 winning
+    team2_bounds (tuple): (low, high) bounds of Team 2 winning
+    steps (int): HP steps per warrior of the chains
+    """
+
+    def __init__(self, team1_win, team2_win, team1_bounds, team2_bounds, steps):
+        # Rounding in the split chains can stray past a bound by float error
+        self.team1_win = max(0.0, min(max(team1_win, team1_bounds[0]), team1_bounds[1]))
+        self.team2_win = max(0.0, min(max(team2_win, team2_bounds[0]), team2_bounds[1]))
+        self.draw = max(0.0, 1 - self.team1_win - self.team2_win)
+        self.team1_bounds = team1_bounds
+        self.team2_bounds = team2_bounds
+        self.draw_bounds = (max(0.0, 1 - team1_bounds[1] - team2_bounds[1]),
+                            min(1.0, 1 - team1_bounds[0] - team2_bounds[0]))
+        self.steps = steps
+
+    @property
+    def error_bound(self):
+        # Largest distance from a reported probability to the true one
+        return max(max(value - low, high - value) for value, (low, high) in [
+            (self.team1_win, self.team1_bounds), (self.team2_win, self.team2_bounds),
+            (self.draw, self.draw_bounds)])
+
+    def summary(self):
+        text = "=== Exact Odds ===\n\n"
+        text += f"HP steps per warrior: {self.steps} (error at most {self.error_bound:.2%})\n\n"
+        for label, value, (low, high) in [("Team 1 wins", self.team1_win, self.team1_bounds),
+                                          ("Team 2 wins", self.team2_win, self.team2_bounds),
+                                          ("Draws", self.draw, self.draw_bounds)]:
+            text += f"{label}: {value:.2%} (between {low:.2%} and {high:.2%})\n"
+        return text
+
+
+def solve_at(warrior1, warrior2, steps):
+    """
+    Outcome probabilities of a 1v1 battle at one HP resolution.
+
+    Args:
+    warrior1 (CombatProfile or dict): Team 1 warrior and item
+    warrior2 (CombatProfile or dict): Team 2 warrior and item
+    steps (int): HP steps per warrior
+
+    Returns:
+    ExactOdds: Probabilities with their bounds
+    """
+    first = battle_engine.as_profile(warrior1)
+    second = battle_engine.as_profile(warrior2)
+    step1 = step_for(first, steps)
+    step2 = step_for(second, steps)
+
+    def outcome(rounding1, rounding2):
+        # Team 1 falls with rounding1 applied to its chain, Team 2 with rounding2
+        return combine(fall_ticks(second, first, step1, rounding1, False),
+                       fall_ticks(first, second, step2, rounding2, True))
+
+    # Team 1 fares best when damage is rounded down on it and up on Team 2
+    best = outcome(ROUND_DOWN, ROUND_UP)
+    worst = outcome(ROUND_UP, ROUND_DOWN)
+    team1_win, team2_win = outcome(ROUND_SPLIT, ROUND_SPLIT)
+    return ExactOdds(team1_win, team2_win, (worst[0], best[0]), (best[1], worst[1]), steps)
+
+
+def solve(warrior1, warrior2, max_error=0.01, steps=None):
+    """
+    Exact win, loss and draw probabilities of a 1v1 battle.
+
+    Args:
+    warrior1 (CombatProfile or dict): Team 1 warrior and item
+    warrior2 (CombatProfile or dict): Team 2 warrior and item
+    max_error (float): Largest acceptable error of a probability
+    steps (int): Solve at this many HP steps per warrior only instead of
+    refining
+
+    Returns:
+    ExactOdds: Probabilities and their error bound; the bound may exceed
+    max_error if even MAX_STEPS steps per warrior could not reach it
+    """
+    if steps is not None:
+        return solve_at(warrior1, warrior2, steps)
+
+    first = battle_engine.as_profile(warrior1)
+    second = battle_engine.as_profile(warrior2)
+    steps = INITIAL_STEPS
+    while True:
+        odds = solve_at(first, second, steps)
+        if odds.error_bound <= max_error or steps >= MAX_STEPS:
+            return odds
+        steps *= 2
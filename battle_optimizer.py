@@ -0,0 +1,392 @@
+"""
+Borders of Aeon: Optimizer
+=========================
+
+Searches for the best equipment of a warrior and the best teams.
+
+best_items ranks every item (and fighting with no item) for a warrior
+against one opponent or a whole field of opponents by Monte Carlo win
+rate. Instead of fighting the same number of battles with every item it
+uses successive halving: all items get a few battles, the better half
+goes on to a round with twice as many, and so on until two items are
+left. The last and largest round compares those two. Clearly worse items
+drop out after a handful of battles, and the budget goes to telling the
+good ones apart.
+
+All items meet the same opponents in the same order, and every opponent
+is fought once from each side, so the items are compared on equal terms.
+Battles run over the process pool of battle_tournament.
+
+Team Builder
+-----------
+Picking 3 of N warriors and an item for each is a C(N,3)×items³ search.
+TeamBuilder runs a beam search over it instead: teams are grown one slot
+at a time from the strongest (warrior, item) options, keeping only the
+best partial teams by their predicted advantage over the opponents from
+battle_analysis, which takes microseconds instead of a simulation.
+Only the teams left at the end are simulated against the opponents, and
+every simulated (team, opponent) matchup is remembered, so repeating or
+widening a search only fights the matchups it has not seen.
+"""
+
+import heapq
+import math
+import random
+
+import battle_analysis
+import battle_batch
+import battle_engine
+import battle_tournament
+
+# Battles per item in the first round of successive halving
+INITIAL_BATTLES = 64
+
+# Partial teams kept after each slot of the beam search
+BEAM_WIDTH = 16
+
+# Strongest (warrior, item) options tried in every team slot
+SLOT_OPTIONS = 60
+
+# Items kept per warrior when picking the slot options
+ITEMS_PER_WARRIOR = 3
+
+# Battles per simulated (team, opponent) matchup
+TEAM_BATTLES = 50
+
+
+class Candidate:
+    """
+    One option being searched and the battles it has fought so far.
+
+    Args:
+    label (str): How the option is shown
+    entry (object): The option itself, e.g. an Item or None
+    """
+
+    def __init__(self, label, entry):
+        self.label = label
+        self.entry = entry
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+        self.rounds = 0
+
+    @property
+    def battles(self):
+        return self.wins + self.losses + self.draws
+
+    @property
+    def win_rate(self):
+        return self.wins / self.battles if self.battles else 0.0
+
+    def interval(self, confidence=0.95):
+        return battle_batch.wilson_interval(self.wins, self.battles, confidence)
+
+
+class SearchResult:
+    """
+    Ranked candidates of a successive halving search.
+
+    Args:
+    candidates (list): Every Candidate, including those dropped early
+    battles (int): Battles fought by the search
+    brute_force_battles (int): Battles needed to give every candidate as
+    many battles as the winner
+    seed (int): Base seed the battles were drawn from
+    confidence (float): Confidence level of the intervals
+    """
+
+    def __init__(self, candidates, battles, brute_force_battles, seed, confidence=0.95):
+        self.candidates = candidates
+        self.battles = battles
+        self.brute_force_battles = brute_force_battles
+        self.seed = seed
+        self.confidence = confidence
+
+    def ranking(self):
+        # Candidates that survived longer first, then by win rate
+        return sorted(self.candidates, key=lambda candidate: (-candidate.rounds, -candidate.win_rate))
+
+    @property
+    def best(self):
+        return self.ranking()[0]
+
+    def summary(self, title="Best Items", top=20):
+        text = f"=== {title} ===\n\n"
+        share = self.battles / self.brute_force_battles if self.brute_force_battles else 1.0
+        text += (f"Battles: {self.battles} ({share:.0%} of the {self.brute_force_battles} "
+                 f"needed without halving, seed {self.seed})\n\n")
+        level = f"{self.confidence:.0%}"
+        for rank, candidate in enumerate(self.ranking()[:top], 1):
+            low, high = candidate.interval(self.confidence)
+            text += (f"{rank}. {candidate.label}: {candidate.win_rate:.1%} win rate "
+                     f"({level} CI {low:.1%}-{high:.1%}, {candidate.battles} battles, "
+                     f"{candidate.draws} draws, round {candidate.rounds})\n")
+        return text
+
+
+def successive_halving(candidates, profiles, opponents, initial_battles=INITIAL_BATTLES, seed=None,
+                       workers=None, confidence=0.95, progress=None, cancel=None):
+    """
+    Rank candidates by win rate against a field, halving them every round.
+
+    Args:
+    candidates (list): Candidate of every option
+    profiles (list): CombatProfile fighting for each candidate
+    opponents (list): CombatProfile of every opponent in the field
+    initial_battles (int): Battles per candidate in the first round
+    seed (int): Base seed, a random one is picked when omitted
+    workers (int): Worker processes, defaults to one per core
+    confidence (float): Confidence level of the intervals
+    progress (callable): Called with (battles done, battles) after each chunk
+    cancel (threading.Event): Stops the search early when set
+
+    Returns:
+    SearchResult: The ranked candidates, or None when cancelled
+    """
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+
+    # Every battle pairs a candidate (first) with an opponent (after them)
+    field_start = len(profiles)
+    pool = battle_tournament.start_pool(list(profiles) + list(opponents), workers)
+
+    # Planned battles: each round halves the field and doubles the battles,
+    # and the last one compares the two finalists
+    plan = []
+    alive = len(candidates)
+    battles_per_candidate = max(2, initial_battles)
+    while True:
+        plan.append((alive, battles_per_candidate))
+        if alive <= 2:
+            break
+        alive = math.ceil(alive / 2)
+        battles_per_candidate *= 2
+    total = sum(alive * battles for alive, battles in plan)
+    done = 0
+    surviving = list(range(len(candidates)))
+    matches_fought = 0
+
+    def collect(chunk_pairs, outcomes):
+        nonlocal done
+        for (i, _), (wins, losses, draws) in zip(chunk_pairs, outcomes):
+            candidate = candidates[i]
+            candidate.wins += wins
+            candidate.losses += losses
+            candidate.draws += draws
+        done += len(chunk_pairs) * 2
+        if progress is not None:
+            progress(done, total)
+
+    try:
+        for round_index, (_, battles_per_candidate) in enumerate(plan):
+            # The same opponents, in the same order, for every candidate
+            matches = battles_per_candidate // 2
+            field = [field_start + (matches_fought + k) % len(opponents) for k in range(matches)]
+            matches_fought += matches
+            pairs = [(i, opponent) for i in surviving for opponent in field]
+            chunks = battle_tournament.cut_chunks(pairs, 2, prefix=f"round{round_index}.")
+            if not battle_tournament.play_chunks(pool, chunks, 2, seed, collect, cancel):
+                return None
+            for i in surviving:
+                candidates[i].rounds = round_index + 1
+
+            # Keep the better half for the next round; after the final it only ranks the two
+            surviving.sort(key=lambda i: -candidates[i].win_rate)
+            surviving = surviving[:math.ceil(len(surviving) / 2)]
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    brute_force = len(candidates) * max(candidate.battles for candidate in candidates)
+    return SearchResult(candidates, done, brute_force, seed, confidence)
+
+
+def best_items(warrior, items, opponents, initial_battles=INITIAL_BATTLES, seed=None, workers=None,
+               confidence=0.95, level=1, progress=None, cancel=None):
+    """
+    Rank the items for a warrior against one opponent or a field.
+
+    Args:
+    warrior (Warrior): The warrior to equip
+    items (list): Item records to try; fighting with no item is tried too
+    opponents (list): CombatProfile or {'warrior': ..., 'item': ...} entries
+    initial_battles (int): Battles per item in the first round
+    seed (int): Base seed, a random one is picked when omitted
+    workers (int): Worker processes, defaults to one per core
+    confidence (float): Confidence level of the intervals
+    level (int): Level of the warrior
+    progress (callable): Called with (battles done, battles) after each chunk
+    cancel (threading.Event): Stops the search early when set
+
+    Returns:
+    SearchResult: Items ranked by win rate, or None when cancelled
+    """
+    candidates = [Candidate("No item", None)] + [Candidate(item.name, item) for item in items]
+    profiles = [battle_engine.compile_profile({'warrior': warrior, 'item': candidate.entry, 'level': level})
+                for candidate in candidates]
+    opponents = [battle_engine.as_profile(entry) for entry in opponents]
+    return successive_halving(candidates, profiles, opponents, initial_battles, seed, workers,
+                              confidence, progress, cancel)
+
+
+class TeamSearchResult(SearchResult):
+    """
+    Ranked teams of a team builder search.
+
+    Args:
+    candidates (list): Candidate of every finalist team
+    battles (int): Battles fought by the search; remembered matchups are free
+    brute_force_battles (int): Battles needed to simulate every composition
+    seed (int): Base seed the battles were drawn from
+    confidence (float): Confidence level of the intervals
+    remembered (int): Matchups answered from earlier searches
+    """
+
+    def __init__(self, candidates, battles, brute_force_battles, seed, confidence=0.95, remembered=0):
+        super().__init__(candidates, battles, brute_force_battles, seed, confidence)
+        self.remembered = remembered
+
+    def ranking(self):
+        return sorted(self.candidates, key=lambda candidate: -candidate.win_rate)
+
+    def summary(self, title="Best Teams", top=10):
+        text = f"=== {title} ===\n\n"
+        text += (f"Battles: {self.battles}, {self.remembered} matchups remembered from earlier "
+                 f"searches ({self.brute_force_battles:.3g} to simulate every composition)\n\n")
+        level = f"{self.confidence:.0%}"
+        for rank, candidate in enumerate(self.ranking()[:top], 1):
+            low, high = candidate.interval(self.confidence)
+            text += (f"{rank}. {candidate.label}\n   {candidate.win_rate:.1%} win rate "
+                     f"({level} CI {low:.1%}-{high:.1%}, {candidate.battles} battles)\n")
+        return text
+
+
+class TeamBuilder:
+    """
+    Beam search for the best team against some opponent teams.
+
+    Args:
+    team_size (int): Warriors per team
+    beam_width (int): Partial teams kept after each slot
+    slot_options (int): Strongest (warrior, item) options tried per slot
+    battles (int): Battles per simulated (team, opponent) matchup
+    """
+
+    def __init__(self, team_size=3, beam_width=BEAM_WIDTH, slot_options=SLOT_OPTIONS, battles=TEAM_BATTLES):
+        self.team_size = team_size
+        self.beam_width = beam_width
+        self.slot_options = slot_options
+        self.battles = battles
+        self.results = {}  # (team profiles, opponent profiles) -> [wins, losses, draws]
+
+    def options(self, warriors, items, opponents, level=1):
+        """
+        Strongest (profile, item name) options, a few items per warrior.
+
+        Warriors are first ranked without items by their matchup-free
+        strength, so only the best of a large roster get every item
+        compiled; the options are then ranked against the opponents.
+        """
+        def strength(pair):
+            return battle_analysis.strength(pair[0])
+
+        bare = [(battle_engine.compile_profile({'warrior': warrior, 'item': None, 'level': level}), warrior)
+                for warrior in warriors]
+        shortlist = heapq.nlargest(self.slot_options * 2, bare, key=strength)
+        options = []
+        for profile, warrior in shortlist:
+            equipped = [(profile, None)] + [
+                (battle_engine.compile_profile({'warrior': warrior, 'item': item, 'level': level}), item.name)
+                for item in items
+            ]
+            options.extend(heapq.nlargest(ITEMS_PER_WARRIOR, equipped, key=strength))
+        return heapq.nlargest(self.slot_options, options, key=lambda option: self.score((option,), opponents))
+
+    def score(self, team, opponents):
+        # Predicted advantage of a (partial) team, averaged over the opponents
+        profiles = [profile for profile, _ in team]
+        return sum(battle_analysis.advantage(profiles, opponent) for opponent in opponents) / len(opponents)
+
+    def beam_search(self, options, opponents):
+        # Grow teams one slot at a time, keeping the best partial teams
+        beam = [()]
+        for _ in range(self.team_size):
+            grown = {}
+            for team in beam:
+                used = {profile.name for profile, _ in team}
+                for option in options:
+                    if option[0].name in used:
+                        continue
+                    new_team = tuple(sorted(team + (option,), key=lambda pair: (pair[0].name, pair[1] or "")))
+                    grown[new_team] = new_team
+            beam = heapq.nlargest(self.beam_width, grown.values(), key=lambda team: self.score(team, opponents))
+        return beam
+
+    def search(self, warriors, items, opponents, seed=None, workers=None, confidence=0.95,
+               level=1, progress=None, cancel=None):
+        """
+        Find the teams with the best win rate against the opponents.
+
+        Args:
+        warriors (list): Warrior records to pick from
+        items (list): Item records to equip; no item is tried too
+        opponents (list): Opponent teams, each a list of CombatProfile or
+        {'warrior': ..., 'item': ...} entries
+        seed (int): Base seed, a random one is picked when omitted
+        workers (int): Worker processes, defaults to one per core
+        confidence (float): Confidence level of the intervals
+        level (int): Level of the warriors picked for the team
+        progress (callable): Called with (battles done, battles) after each chunk
+        cancel (threading.Event): Stops the search early when set
+
+        Returns:
+        TeamSearchResult: The finalist teams ranked by simulated win rate,
+        or None when cancelled
+        """
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        opponents = [tuple(sorted(battle_engine.as_profile(entry) for entry in team)) for team in opponents]
+        finalists = self.beam_search(self.options(warriors, items, opponents, level), opponents)
+
+        # Only the matchups not simulated by an earlier search are fought
+        teams = [tuple(sorted(profile for profile, _ in team)) for team in finalists]
+        sides = [list(team) for team in teams] + [list(team) for team in opponents]
+        pairs = [(t, len(teams) + o) for t, team in enumerate(teams) for o, opponent in enumerate(opponents)
+                 if (team, opponent) not in self.results]
+        remembered = len(teams) * len(opponents) - len(pairs)
+        total = len(pairs) * self.battles
+        done = 0
+
+        def collect(chunk_pairs, outcomes):
+            nonlocal done
+            for (t, o), outcome in zip(chunk_pairs, outcomes):
+                self.results[(teams[t], opponents[o - len(teams)])] = list(outcome)
+            done += len(chunk_pairs) * self.battles
+            if progress is not None:
+                progress(done, total)
+
+        if pairs:
+            pool = battle_tournament.start_pool(sides, workers)
+            try:
+                chunks = battle_tournament.cut_chunks(pairs, self.battles, prefix="teams.")
+                if not battle_tournament.play_chunks(pool, chunks, self.battles, seed, collect, cancel):
+                    return None
+            finally:
+                if pool is not None:
+                    pool.shutdown(cancel_futures=True)
+
+        candidates = []
+        for team, finalist in zip(teams, finalists):
+            label = ", ".join(f"{profile.name} + {item}" if item else profile.name for profile, item in finalist)
+            candidate = Candidate(label, finalist)
+            for opponent in opponents:
+                wins, losses, draws = self.results[(team, opponent)]
+                candidate.wins += wins
+                candidate.losses += losses
+                candidate.draws += draws
+            candidates.append(candidate)
+
+        compositions = math.comb(len(warriors), self.team_size) * (len(items) + 1) ** self.team_size
+        brute_force = compositions * len(opponents) * self.battles
+        return TeamSearchResult(candidates, done, brute_force, seed, confidence, remembered)
@@ -0,0 +1,298 @@
+"""
+Borders of Aeon: Ratings
+=======================
+
+Elo ratings of warriors and of 3v3 team compositions.
+
+Every finished battle moves the ratings of the two sides toward its
+result in O(1): the winner takes points from the loser in proportion to
+how unexpected the win was. 1v1 battles rate warriors; larger battles
+rate the team composition, the sorted names of its members joined by
+" + ", so the same three warriors share one rating whatever their order.
+A "+" within a name is doubled in the key, so a warrior named "A + B"
+(key "A ++ B") never shares a rating with the team of A and B.
+
+Results can come one battle at a time (record) or as counts from a batch
+or tournament (record_counts). A batch moves the ratings as far as one
+update per battle with the mean score of the batch would, so the order of
+wins and losses does not matter, but in O(1) however many battles it
+holds: the updates are summed in closed form and solved by bisection.
+
+Ratings are kept in memory and saved to a CSV file, config/ratings.csv
+in the Battle Arena, with an atomic rename. A lock guards the table, so
+worker threads can rate battles while the GUI renames warriors.
+"""
+
+import heapq
+import math
+import threading
+
+from battle_records import Record, read_records
+from battle_storage import write_atomic
+
+# Rating of a warrior or team without results
+INITIAL_RATING = 1500.0
+
+# Largest rating change of a single battle
+K_FACTOR = 32.0
+
+
+class Rating(Record):
+    FIELDS = ("key", "kind", "rating", "games", "wins", "losses", "draws")
+    NUMERIC_FIELDS = frozenset(FIELDS[2:])
+    __slots__ = FIELDS
+
+
+# Separator of the members' names in a team key
+TEAM_SEPARATOR = " + "
+
+
+def team_key(names):
+    # A warrior's own name, or the sorted names of a team's members; every
+    # "+" of a name is doubled so the separator only appears between names
+    return TEAM_SEPARATOR.join(name.replace("+", "++") for name in sorted(names))
+
+
+def key_names(key):
+    # Names of the warrior or team members of a key, the inverse of team_key
+    return [name.replace("++", "+") for name in key.split(TEAM_SEPARATOR)]
+
+
+def expected_score(rating, opponent_rating):
+    # Chance of winning against the opponent, counting a draw as half
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+# Rating points per natural log of the odds
+ELO_SCALE = 400 / math.log(10)
+
+# Bisection steps of rating_gap_after, far below a hundredth of a point
+GAP_STEPS = 60
+
+
+def gap_potential(gap, score):
+    """
+    Integral of 1 / (score - expected) over the rating gap.
+
+    It grows by 2 * K_FACTOR with every Elo update at the same score, which
+    lets a batch of updates be solved in one go.
+
+    Args:
+    gap (float): Rating of the first side minus that of the second
+    score (float): Mean score of the first side
+
+    Returns:
+    float: The potential at this gap, infinite at the gap the score settles at
+    """
+    odds = 10 ** max(-300.0, min(gap / 400, 300.0))
+    if score >= 1:
+        return gap + ELO_SCALE * odds
+    if score <= 0:
+        return -gap + ELO_SCALE / odds
+    distance = abs(score - (1 - score) * odds)
+    if distance == 0:
+        return math.inf
+    return gap / score - ELO_SCALE / (score * (1 - score)) * math.log(distance)
+
+
+def rating_gap_after(gap, score, battles, k_factor=K_FACTOR):
+    """
+    Rating gap after many Elo updates with the same score.
+
+    Each update moves the gap by 2 * k_factor * (score - expected), and
+    never by more than 2 * k_factor. Following that flow for every battle
+    raises gap_potential by 2 * k_factor per battle, so the new gap is
+    found by bisection between the old one and the farthest it can move.
+    The flow is within a few points of stepping battle by battle.
+
+    Args:
+    gap (float): Rating of the first side minus that of the second
+    score (float): Mean score of the first side
+    battles (int): Number of battles
+    k_factor (float): Largest rating change of a single battle
+
+    Returns:
+    float: The new gap; it never crosses the gap the score settles at
+    """
+    direction = score - expected_score(gap, 0)
+    if direction == 0 or not battles:
+        return gap
+    if battles == 1:
+        # A single battle takes the usual Elo step
+        return gap + 2 * k_factor * direction
+    target = gap_potential(gap, score) + 2 * k_factor * battles
+    near, far = gap, gap + math.copysign(2 * k_factor * battles, direction)
+    if 0 < score < 1:
+        # Stop short of the gap where the score is expected
+        settled = 400 * math.log10(score / (1 - score))
+        far = min(far, settled) if direction > 0 else max(far, settled)
+    for _ in range(GAP_STEPS):
+        middle = (near + far) / 2
+        if gap_potential(middle, score) < target:
+            near = middle
+        else:
+            far = middle
+    return (near + far) / 2
+
+
+def merge_ratings(rating, other):
+    # Fold other into rating: results add up, ratings average by games played
+    games = rating.games + other.games
+    if games:
+        rating.rating = (rating.rating * rating.games + other.rating * other.games) / games
+    rating.games = games
+    rating.wins += other.wins
+    rating.losses += other.losses
+    rating.draws += other.draws
+
+
+class RatingTable:
+    """
+    Ratings of every warrior and team that has fought, by key.
+
+    Args:
+    filename (str): CSV file to load from and save to, None to keep in memory
+    k_factor (float): Largest rating change of a single battle
+    """
+
+    def __init__(self, filename=None, k_factor=K_FACTOR):
+        self.filename = filename
+        self.k_factor = k_factor
+        self.ratings = {}
+        self.lock = threading.RLock()
+        if filename is not None:
+            for rating in read_records(filename, Rating):
+                self.ratings[rating.key] = rating
+
+    def get(self, names):
+        # Rating record of a warrior or team, created on first use
+        key = team_key(names)
+        with self.lock:
+            rating = self.ratings.get(key)
+            if rating is None:
+                kind = "warrior" if len(names) == 1 else "team"
+                rating = Rating(key=key, kind=kind, rating=INITIAL_RATING)
+                self.ratings[key] = rating
+            return rating
+
+    def rating(self, names):
+        with self.lock:
+            rating = self.ratings.get(team_key(names))
+            return rating.rating if rating is not None else INITIAL_RATING
+
+    def record(self, team1_names, team2_names, winner):
+        """
+        Rate one battle.
+
+        Args:
+        team1_names (list): Names of the Team 1 warriors
+        team2_names (list): Names of the Team 2 warriors
+        winner (int): 1 or 2 for the winning team, 0 for a draw
+        """
+        wins = [0, 0, 0]
+        wins[winner] = 1
+        self.record_counts(team1_names, team2_names, wins[1], wins[2], wins[0])
+
+    def record_counts(self, team1_names, team2_names, team1_wins, team2_wins, draws):
+        """
+        Rate a batch of battles between the same two sides.
+
+        Args:
+        team1_names (list): Names of the first side's warriors
+        team2_names (list): Names of the second side's warriors
+        team1_wins (int): Battles won by the first side
+        team2_wins (int): Battles won by the second side
+        draws (int): Battles that ended in a draw
+        """
+        battles = team1_wins + team2_wins + draws
+        if not battles:
+            return
+        with self.lock:
+            first = self.get(team1_names)
+            second = self.get(team2_names)
+            self.apply_counts(first, second, battles, team1_wins, team2_wins, draws)
+
+    def apply_counts(self, first, second, battles, team1_wins, team2_wins, draws):
+        # As far as one Elo step per battle, each with the batch's mean score
+        score = (team1_wins + draws / 2) / battles
+        gap = first.rating - second.rating
+        change = (rating_gap_after(gap, score, battles, self.k_factor) - gap) / 2
+        first.rating += change
+        second.rating -= change
+
+        first.games += battles
+        first.wins += team1_wins
+        first.losses += team2_wins
+        first.draws += draws
+        second.games += battles
+        second.wins += team2_wins
+        second.losses += team1_wins
+        second.draws += draws
+
+    def renamed_keys(self, old_name, new_name):
+        # New key of every rating of the warrior and of the teams it is in
+        renamed = {}
+        for key in self.ratings:
+            names = key_names(key)
+            if old_name in names:
+                renamed[key] = team_key([new_name if name == old_name else name for name in names])
+        return renamed
+
+    def rename_conflicts(self, old_name, new_name):
+        # Keys that renaming would move onto ratings which already exist
+        with self.lock:
+            return sorted(key for key in self.renamed_keys(old_name, new_name).values() if key in self.ratings)
+
+    def rename(self, old_name, new_name, merge=False):
+        """
+        Keep the ratings of a warrior and of its teams when it is renamed.
+
+        Args:
+        old_name (str): Current name of the warrior
+        new_name (str): New name of the warrior
+        merge (bool): Merge ratings that already exist under the new name
+        with the renamed ones instead of raising
+
+        Raises:
+        ValueError: Ratings exist under the new name and merge is False;
+        nothing is renamed then
+        """
+        if old_name == new_name:
+            return
+        with self.lock:
+            renamed = self.renamed_keys(old_name, new_name)
+            conflicts = sorted(key for key in renamed.values() if key in self.ratings)
+            if conflicts and not merge:
+                raise ValueError(f"Ratings already exist for {', '.join(conflicts)}")
+            moved = [self.ratings.pop(key) for key in renamed]
+            for rating, key in zip(moved, renamed.values()):
+                existing = self.ratings.get(key)
+                if existing is not None:
+                    merge_ratings(existing, rating)
+                    continue
+                rating.key = key
+                self.ratings[key] = rating
+
+    def top(self, kind, count=10):
+        # Best rated warriors or teams
+        with self.lock:
+            return heapq.nlargest(count, (rating for rating in self.ratings.values() if rating.kind == kind),
+                                  key=lambda rating: rating.rating)
+
+    def save(self):
+        if self.filename is not None:
+            with self.lock:
+                write_atomic(self.filename, list(self.ratings.values()), Rating)
+
+    def summary(self, count=10):
+        text = "=== Ratings ===\n"
+        with self.lock:
+            for kind, title in [("warrior", "Warriors"), ("team", "Teams")]:
+                text += f"\n{title}:\n"
+                best = self.top(kind, count)
+                if not best:
+                    text += "  No battles yet\n"
+                for rank, rating in enumerate(best, 1):
+                    text += (f"  {rank}. {rating.key}: {rating.rating:.0f} "
+                             f"({rating.wins:.0f}W {rating.losses:.0f}L {rating.draws:.0f}D)\n")
+        return text
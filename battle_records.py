@@ -0,0 +1,343 @@
+"""
+Borders of Aeon: Records
+=======================
+
+Typed warrior and item records.
+
+Rows are parsed once when they are loaded from CSV: numeric columns
+become floats and every record stores its fields in __slots__ instead of
+a per-row dict. Records are written back to CSV with write_records.
+"""
+
+import bisect
+import csv
+import os
+
+
+class Record:
+    """
+    Base class of the warrior and item records.
+
+    Subclasses list their CSV columns in FIELDS (also their __slots__)
+    and the columns holding numbers in NUMERIC_FIELDS.
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+    NUMERIC_FIELDS = frozenset()
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            default = 0.0 if field in self.NUMERIC_FIELDS else ""
+            setattr(self, field, values.get(field, default))
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Parse one CSV row.
+
+        Args:
+        row (dict): Column name to value, as read from CSV or JSON
+
+        Returns:
+        Record: The parsed record; blank numbers become 0
+        """
+        values = {}
+        for field in cls.FIELDS:
+            value = row.get(field)
+            if isinstance(value, str):
+                value = value.strip()
+            if field in cls.NUMERIC_FIELDS:
+                value = float(value) if value not in (None, "") else 0.0
+            elif value is None:
+                value = ""
+            values[field] = value
+        return cls(**values)
+
+    def to_row(self):
+        # Column name to value, ready for csv.DictWriter
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self):
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.FIELDS)
+        return f"{type(self).__name__}({values})"
+
+
+class Warrior(Record):
+    FIELDS = (
+        "name", "title", "type", "tough", "inctough",
+        "dex", "incdex", "smart", "incsmart", "min_dmg",
+        "max_dmg", "attack_time"
+    )
+    NUMERIC_FIELDS = frozenset([
+        "tough", "inctough", "dex", "incdex", "smart",
+        "incsmart", "min_dmg", "max_dmg", "attack_time"
+    ])
+    __slots__ = FIELDS
+
+    @property
+    def label(self):
+        # How the warrior is shown in lists and dropdowns
+        return f"{self.name} ({self.type})"
+
+
+class Item(Record):
+    FIELDS = (
+        "name", "add_tough", "add_dex", "add_smart",
+        "add_hp", "add_hp_regen", "add_dmg",
+        "add_defense", "add_attack_speed"
+    )
+    NUMERIC_FIELDS = frozenset(FIELDS[1:])
+    __slots__ = FIELDS
+
+
+def read_records(filename, record_class):
+    """
+    Load every record of a CSV file.
+
+    Args:
+    filename (str): Path of the CSV file
+    record_class (type): Warrior or Item
+
+    Returns:
+    list: The parsed records, empty if the file does not exist
+    """
+    if not os.path.exists(filename):
+        return []
+    with open(filename, "r", newline="") as file:
+        return [record_class.from_row(row) for row in csv.DictReader(file)]
+
+
+def write_records(filename, records, record_class):
+    """
+    Write records to a CSV file, replacing its contents.
+
+    Args:
+    filename (str): Path of the CSV file
+    records (iterable): Records to write
+    record_class (type): Warrior or Item, gives the column order
+    """
+    with open(filename, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=record_class.FIELDS)
+        writer.writeheader()
+        writer.writerows(record.to_row() for record in records)
+
+
+# Deleted rows allowed per live row before a roster is compacted
+TOMBSTONE_FRACTION = 8
+
+# Deleted rows always allowed before a roster is compacted
+MIN_TOMBSTONES = 64
+
+
+class Roster:
+    """
+    Ordered list of records with an index from name to list position.
+
+    The position of a record is also its row in the list views, so
+    lookups by name or by selected row are O(1). Names are unique; when
+    a file holds duplicates the first record with a name wins lookups.
+    A sorted copy of the names answers prefix searches by bisection.
+
+    Deleting a record leaves a tombstone (None) in its slot instead of
+    moving every later record, and a Fenwick tree over the live slots maps
+    rows to slots in O(log n) until the tombstones are swept out in one
+    batch. Without tombstones a row is its slot again.
+
+    Args:
+    records (iterable): Initial records in display order
+    """
+
+    def __init__(self, records=()):
+        self.records = []
+        self.positions = {}  # name -> slot in records
+        for record in records:
+            self.positions.setdefault(record.name, len(self.records))
+            self.records.append(record)
+        self.sorted_names = sorted(self.positions)
+        self.tombstones = 0
+        self.live = None  # Fenwick tree of live slots, only while there are tombstones
+
+    def __len__(self):
+        return len(self.records) - self.tombstones
+
+    def __iter__(self):
+        if not self.tombstones:
+            return iter(self.records)
+        return (record for record in self.records if record is not None)
+
+    def __getitem__(self, position):
+        return self.records[self.slot(position)]
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def get(self, name, default=None):
+        slot = self.positions.get(name)
+        return default if slot is None else self.records[slot]
+
+    def position(self, name):
+        # List position of the record with this name
+        slot = self.positions[name]
+        return self.live_before(slot) if self.tombstones else slot
+
+    def page(self, offset, limit):
+        # Records shown in rows offset .. offset + limit - 1
+        if not self.tombstones:
+            return self.records[offset:offset + limit]
+        if offset >= len(self):
+            return []
+        records = []
+        slot = self.slot(offset)
+        while slot < len(self.records) and len(records) < limit:
+            if self.records[slot] is not None:
+                records.append(self.records[slot])
+            slot += 1
+        return records
+
+    def names_with_prefix(self, prefix, limit=-1):
+        """
+        Names starting with prefix, in sorted order.
+
+        Args:
+        prefix (str): Start of the name, '' for every name
+        limit (int): Most names to return, -1 for no limit
+
+        Returns:
+        list: The matching names
+        """
+        names = []
+        index = bisect.bisect_left(self.sorted_names, prefix)
+        while index < len(self.sorted_names) and len(names) != limit:
+            name = self.sorted_names[index]
+            if not name.startswith(prefix):
+                break
+            names.append(name)
+            index += 1
+        return names
+
+    def index_name(self, name, slot):
+        self.positions[name] = slot
+        bisect.insort(self.sorted_names, name)
+
+    def unindex_name(self, name):
+        del self.positions[name]
+        del self.sorted_names[bisect.bisect_left(self.sorted_names, name)]
+
+    # Rows and slots
+    def slot(self, position):
+        # Slot of the record shown in a row; raises IndexError past the end
+        count = len(self)
+        if position < 0:
+            position += count
+        if not 0 <= position < count:
+            raise IndexError(position)
+        if not self.tombstones:
+            return position
+        # Descend the Fenwick tree to the slot holding the (position + 1)-th live record
+        slot = 0
+        step = 1 << (len(self.live) - 1).bit_length()
+        remaining = position + 1
+        while step:
+            node = slot + step
+            if node < len(self.live) and self.live[node] < remaining:
+                slot = node
+                remaining -= self.live[node]
+            step >>= 1
+        return slot
+
+    def live_before(self, slot):
+        # Live records in the slots before this one
+        count = 0
+        while slot > 0:
+            count += self.live[slot]
+            slot -= slot & -slot
+        return count
+
+    def build_live(self):
+        # Fenwick tree of the live slots, node i covering slots up to i - 1
+        live = [0] + [0 if record is None else 1 for record in self.records]
+        for node in range(1, len(live)):
+            parent = node + (node & -node)
+            if parent < len(live):
+                live[parent] += live[node]
+        self.live = live
+
+    def kill(self, slot):
+        # Leave a tombstone in a slot
+        if self.live is None:
+            self.build_live()
+        self.records[slot] = None
+        self.tombstones += 1
+        node = slot + 1
+        while node < len(self.live):
+            self.live[node] -= 1
+            node += node & -node
+
+    def compact(self):
+        # Sweep the tombstones out; records keep their order and first-wins names
+        slots = [0] * len(self.records)
+        records = []
+        for slot, record in enumerate(self.records):
+            if record is not None:
+                slots[slot] = len(records)
+                records.append(record)
+        self.records = records
+        self.positions = {name: slots[slot] for name, slot in self.positions.items()}
+        self.tombstones = 0
+        self.live = None
+
+    # Changes
+    def add(self, record):
+        """
+        Append a record.
+
+        Returns:
+        int: Its position
+
+        Raises:
+        ValueError: If a record with the same name exists
+        """
+        if record.name in self.positions:
+            raise ValueError(f"{record.name} already exists")
+        self.index_name(record.name, len(self.records))
+        self.records.append(record)
+        if self.live is not None:
+            # New node: itself plus the live slots it covers
+            node = len(self.live)
+            self.live.append(1 + self.live_before(node - 1) - self.live_before(node - (node & -node)))
+        return len(self) - 1
+
+    def replace(self, position, record):
+        """
+        Put a record in place of the one at position, keeping its row.
+
+        Returns:
+        Record: The record that was replaced
+
+        Raises:
+        ValueError: If the new name belongs to another record
+        """
+        slot = self.slot(position)
+        old = self.records[slot]
+        if record.name != old.name:
+            if record.name in self.positions:
+                raise ValueError(f"{record.name} already exists")
+            if self.positions.get(old.name) == slot:
+                self.unindex_name(old.name)
+            self.index_name(record.name, slot)
+        else:
+            self.positions[record.name] = slot
+        self.records[slot] = record
+        return old
+
+    def pop(self, position):
+        # Remove the record at position; later rows move up by one
+        slot = self.slot(position)
+        record = self.records[slot]
+        if self.positions.get(record.name) == slot:
+            self.unindex_name(record.name)
+        self.kill(slot)
+        if self.tombstones > max(MIN_TOMBSTONES, len(self) // TOMBSTONE_FRACTION):
+            self.compact()
+        return record
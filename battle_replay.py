@@ -0,0 +1,293 @@
+"""
+Borders of Aeon: Battle Replays
+==============================
+
+Compact binary replays of single battles that can be fought again and
+checked bit for bit.
+
+A battle is fully determined by its fighters, the targeting policies of
+both teams and the seed of its random stream. A replay keeps them all,
+plus the battle's event log, so the battle
+can be re-run from the file alone and every event compared with the
+original, down to the bits of each damage roll. The roster hash tells
+whether a replay was fought with the same warriors and items as another
+battle or the current roster.
+
+A battle from a batch is replayed from the batch's seed and the battle's
+number:
+
+    record(team1, team2, battle_batch.battle_seed(seed, battle_index))
+
+File Format
+----------
+All numbers are little-endian.
+
+- Header: magic "BARP", version (uint16), seed length (uint16) and the
+  seed as unsigned bytes
+- Targeting: policy names of Team 1 and Team 2 (uint16 length + UTF-8),
+  "Random" for random targets; version 1 replays have none
+- Roster: Team 1 and Team 2 sizes (uint16), the 16 byte roster hash, then
+  every fighter's name and type (uint16 length + UTF-8), seven stats
+  (float64) and cooldown ticks (uint32)
+- Result: winner (uint8) and ticks (uint32)
+- Events: count (uint32), then tick (uint16), kind (uint8), attacker and
+  target (uint16) and the value (float64; two for hits, final and base
+  damage)
+"""
+
+import hashlib
+import os
+import struct
+
+import battle_engine
+import battle_targeting
+
+MAGIC = b"BARP"
+VERSION = 2
+
+# Versions that can still be read; version 1 has no targeting policies
+READABLE_VERSIONS = (1, 2)
+
+HEADER = struct.Struct("<4sHH")
+TEAM_SIZES = struct.Struct("<HH")
+LENGTH = struct.Struct("<H")
+STATS = struct.Struct("<7dI")
+RESULT = struct.Struct("<BI")
+COUNT = struct.Struct("<I")
+EVENT = struct.Struct("<HBHHd")
+HIT_EVENT = struct.Struct("<HBHHdd")
+
+
+class Replay:
+    """
+    One recorded battle.
+
+    Args:
+    seed (int): Seed of the battle's random stream
+    team1 (list): CombatProfiles of Team 1
+    team2 (list): CombatProfiles of Team 2
+    winner (int): 1 or 2 for the winning team, 0 for a draw
+    ticks (int): Battle duration in ticks
+    events (list): (tick, kind, attacker, target, value) event tuples
+    targeting (tuple): Targeting policy classes of Team 1 and Team 2, None
+    for random targets
+    """
+
+    def __init__(self, seed, team1, team2, winner, ticks, events, targeting=(None, None)):
+        self.seed = seed
+        self.team1 = team1
+        self.team2 = team2
+        self.winner = winner
+        self.ticks = ticks
+        self.events = events
+        self.targeting = targeting
+
+    @property
+    def roster_hash(self):
+        return roster_hash(self.team1, self.team2)
+
+    def fight(self):
+        # Fight the battle again from its seed, with the full log
+        return battle_engine.simulate_battle(self.team1, self.team2, seed=self.seed, targeting=self.targeting)
+
+
+def pack_text(text):
+    data = text.encode("utf-8")
+    return LENGTH.pack(len(data)) + data
+
+
+def pack_roster(team1, team2):
+    # Stats of every fighter, Team 1 first
+    parts = [TEAM_SIZES.pack(len(team1), len(team2))]
+    for profile in list(team1) + list(team2):
+        parts.append(pack_text(profile.name))
+        parts.append(pack_text(profile.type))
+        parts.append(STATS.pack(*profile[2:]))
+    return b"".join(parts)
+
+
+def roster_hash(team1, team2):
+    """
+    Fingerprint of the fighters of a battle.
+
+    Args:
+    team1 (list): CombatProfile or {'warrior': ..., 'item': ...} entries for Team 1
+    team2 (list): CombatProfile or {'warrior': ..., 'item': ...} entries for Team 2
+
+    Returns:
+    bytes: 16 byte hash of every fighter's name, type and stats
+    """
+    team1 = [battle_engine.as_profile(entry) for entry in team1]
+    team2 = [battle_engine.as_profile(entry) for entry in team2]
+    return hashlib.blake2b(pack_roster(team1, team2), digest_size=16).digest()
+
+
+def record(team1, team2, seed=None, targeting=None):
+    """
+    Fight a battle and record it.
+
+    Args:
+    team1 (list): CombatProfile or {'warrior': ..., 'item': ...} entries for Team 1
+    team2 (list): CombatProfile or {'warrior': ..., 'item': ...} entries for Team 2
+    seed (int): Seed of the battle, a new one is drawn when omitted
+    targeting: Targeting policies of the teams, see battle_engine.simulate_battle
+
+    Returns:
+    tuple: (Replay, BattleResult) of the battle
+    """
+    team1 = [battle_engine.as_profile(entry) for entry in team1]
+    team2 = [battle_engine.as_profile(entry) for entry in team2]
+    result = battle_engine.simulate_battle(team1, team2, seed=seed, targeting=targeting)
+    return from_result(result, team1, team2), result
+
+
+def from_result(result, team1, team2):
+    """
+    Replay of a battle that was already fought.
+
+    Args:
+    result (BattleResult): A battle fought from a seed with the full log
+    team1 (list): CombatProfiles of Team 1
+    team2 (list): CombatProfiles of Team 2
+
+    Returns:
+    Replay: The battle's replay
+    """
+    if result.seed is None or result.log_level != battle_engine.LOG_FULL:
+        raise ValueError("Only battles fought from a seed with a full log can be replayed")
+    return Replay(result.seed, list(team1), list(team2), result.winner, result.ticks, list(result.events),
+                  result.targeting)
+
+
+def encode(replay):
+    # The replay as bytes, in the file format above
+    seed_bytes = replay.seed.to_bytes((replay.seed.bit_length() + 7) // 8 or 1, "little")
+    parts = [HEADER.pack(MAGIC, VERSION, len(seed_bytes)), seed_bytes]
+    parts += [pack_text(battle_targeting.policy_name(policy)) for policy in replay.targeting]
+
+    roster = pack_roster(replay.team1, replay.team2)
+    parts += [roster[:TEAM_SIZES.size], hashlib.blake2b(roster, digest_size=16).digest(),
+              roster[TEAM_SIZES.size:]]
+
+    parts.append(RESULT.pack(replay.winner, replay.ticks))
+    parts.append(COUNT.pack(len(replay.events)))
+    for tick, kind, attacker, target, value in replay.events:
+        if kind == battle_engine.EVENT_HIT:
+            parts.append(HIT_EVENT.pack(tick, kind, attacker, target, *value))
+        else:
+            parts.append(EVENT.pack(tick, kind, attacker, target, value))
+    return b"".join(parts)
+
+
+def decode(data):
+    """
+    Read a replay back from bytes.
+
+    Args:
+    data (bytes): A replay in the file format above
+
+    Returns:
+    Replay: The replay; raises ValueError if the data is not a valid replay
+    """
+    try:
+        magic, version, seed_length = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a battle replay")
+        if version not in READABLE_VERSIONS:
+            raise ValueError(f"Unsupported replay version {version}")
+        offset = HEADER.size
+        seed = int.from_bytes(data[offset:offset + seed_length], "little")
+        offset += seed_length
+
+        def read_text():
+            nonlocal offset
+            (length,) = LENGTH.unpack_from(data, offset)
+            offset += LENGTH.size + length
+            return data[offset - length:offset].decode("utf-8")
+
+        targeting = (None, None)
+        if version >= 2:
+            targeting = battle_targeting.resolve((read_text(), read_text()))
+
+        roster_start = offset
+        team1_size, team2_size = TEAM_SIZES.unpack_from(data, offset)
+        offset += TEAM_SIZES.size
+        stored_hash = data[offset:offset + 16]
+        offset += 16
+        profiles_start = offset
+        profiles = []
+        for _ in range(team1_size + team2_size):
+            name = read_text()
+            warrior_type = read_text()
+            stats = STATS.unpack_from(data, offset)
+            offset += STATS.size
+            profiles.append(battle_engine.CombatProfile(name, warrior_type, *stats))
+        roster = data[roster_start:roster_start + TEAM_SIZES.size] + data[profiles_start:offset]
+        if hashlib.blake2b(roster, digest_size=16).digest() != stored_hash:
+            raise ValueError("Replay roster does not match its hash")
+
+        winner, ticks = RESULT.unpack_from(data, offset)
+        offset += RESULT.size
+        (count,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        events = []
+        for _ in range(count):
+            tick, kind, attacker, target, value = EVENT.unpack_from(data, offset)
+            if kind == battle_engine.EVENT_HIT:
+                tick, kind, attacker, target, final_damage, base_damage = HIT_EVENT.unpack_from(data, offset)
+                value = (final_damage, base_damage)
+                offset += HIT_EVENT.size
+            else:
+                offset += EVENT.size
+            events.append((tick, kind, attacker, target, value))
+    except struct.error:
+        raise ValueError("Replay is truncated")
+
+    return Replay(seed, profiles[:team1_size], profiles[team1_size:], winner, ticks, events, targeting)
+
+
+def write(filename, replay):
+    # Write next to the target, then rename it into place
+    temp_name = filename + ".tmp"
+    with open(temp_name, "wb") as file:
+        file.write(encode(replay))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_name, filename)
+
+
+def read(filename):
+    with open(filename, "rb") as file:
+        return decode(file.read())
+
+
+def verify(replay):
+    """
+    Fight a replay again and compare it with the recording.
+
+    Args:
+    replay (Replay): Recorded battle
+
+    Returns:
+    tuple: (matches, message); matches is True when every event and the
+    result are identical to the bit, message tells where they first differ
+    """
+    rerun = from_result(replay.fight(), replay.team1, replay.team2)
+    expected = encode(replay)
+    actual = encode(rerun)
+    if actual == expected:
+        return True, f"Replay verified: {len(replay.events)} events match bit for bit"
+
+    for index, (old, new) in enumerate(zip(replay.events, rerun.events)):
+        if encode_event(old) != encode_event(new):
+            return False, f"Event {index} differs at {old[0] / battle_engine.TICKS_PER_SECOND:.1f}s"
+    if len(replay.events) != len(rerun.events):
+        return False, f"Recorded {len(replay.events)} events, the rerun has {len(rerun.events)}"
+    return False, "The battle result differs"
+
+
+def encode_event(event):
+    tick, kind, attacker, target, value = event
+    if kind == battle_engine.EVENT_HIT:
+        return HIT_EVENT.pack(tick, kind, attacker, target, *value)
+    return EVENT.pack(tick, kind, attacker, target, value)
@@ -0,0 +1,519 @@
+"""
+Borders of Aeon: Storage
+=======================
+
+Persistence of the warrior and item rosters.
+
+Two interchangeable backends are provided. Both load() a roster that
+supports lookups by name and by row, and both take changes through
+add(), replace() and pop().
+
+JournaledTable keeps a roster in a CSV snapshot plus an append-only
+journal of mutations. Every add, edit and delete appends one line to the
+journal instead of rewriting the whole CSV. Loading replays the journal
+on top of the snapshot, and once the journal grows long enough it is
+compacted into a new snapshot on a background thread.
+
+Crash Safety
+-----------
+Journal lines are flushed and fsynced before a change is reported as
+saved, and a torn last line is ignored on replay. Snapshots are written
+to a temporary file and renamed over the CSV, so a crash leaves either
+the old or the new snapshot. Every journal line carries a sequence number,
+and a small state file next to the snapshot records the last one folded
+into it. The state file is replaced just before the snapshot is renamed
+into place and names the snapshot by its hash, so loading can always tell
+which journal lines a snapshot already holds and skips them. A background
+compaction that fails keeps its journal; the next one appends to it.
+
+SQLite
+-----
+SQLiteTable keeps the roster in a table of a stdlib sqlite3 database
+instead of in memory, with indexes on name and type, keyset paged reads
+for the list views and one transaction per change or batch. CSV files can
+still be imported and exported.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from battle_records import Roster, read_records, write_records
+
+# Journal lines written before the snapshot is rewritten
+COMPACT_AFTER = 1000
+
+# Rows between the keyset anchors of an SQLite roster
+ANCHOR_ROWS = 1024
+
+
+def write_atomic(filename, records, record_class):
+    # Write a full CSV next to the target, then rename it into place
+    temp_name = filename + ".tmp"
+    write_records(temp_name, records, record_class)
+    with open(temp_name, "rb+") as file:
+        os.fsync(file.fileno())
+    os.replace(temp_name, filename)
+
+
+def write_json_atomic(filename, data):
+    # Same as write_atomic, for a JSON document
+    temp_name = filename + ".tmp"
+    with open(temp_name, "w") as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_name, filename)
+
+
+class JournaledTable:
+    """
+    A roster persisted as a CSV snapshot plus a mutation journal.
+
+    Args:
+    filename (str): Path of the CSV snapshot
+    record_class (type): Warrior or Item
+    compact_after (int): Journal lines that trigger a background compaction
+    """
+
+    def __init__(self, filename, record_class, compact_after=COMPACT_AFTER):
+        self.filename = filename
+        self.record_class = record_class
+        self.compact_after = compact_after
+        self.journal_name = filename + ".journal"
+        self.old_journal_name = filename + ".journal.old"
+        self.state_name = filename + ".state"
+        self.roster = Roster()
+        self.journal = None
+        self.journal_lines = 0
+        # Sequence numbers of the last journal line and of the last one in the snapshot
+        self.seq = 0
+        self.snapshot_seq = 0
+        self.lock = threading.Lock()
+        self.compactor = None
+        # Error of the last background compaction, None once one succeeds
+        self.compaction_error = None
+
+    # Loading
+    def load(self):
+        """
+        Read the snapshot and replay the journals on top of it.
+
+        Returns:
+        Roster: The current roster; later changes must go through this table
+        """
+        self.wait_for_compaction()
+        self.close_journal()
+
+        self.roster = Roster(read_records(self.filename, self.record_class))
+        self.snapshot_seq = self.read_snapshot_seq()
+        self.seq = self.snapshot_seq
+        replayed = 0
+        complete = True
+        for journal_name in (self.old_journal_name, self.journal_name):
+            count, intact = self.replay(journal_name)
+            replayed += count
+            complete = complete and intact
+
+        # Fold a journal left behind by an interrupted compaction or cut
+        # short by a crash right away, so new lines are never appended to it
+        if os.path.exists(self.old_journal_name) or not complete:
+            self.compact()
+        else:
+            self.journal_lines = replayed
+        return self.roster
+
+    def read_snapshot_seq(self):
+        # Last journal line folded into the snapshot on disk, 0 if unknown
+        if not os.path.exists(self.state_name) or not os.path.exists(self.filename):
+            return 0
+        with open(self.state_name, "r") as file:
+            state = json.load(file)
+        with open(self.filename, "rb") as file:
+            digest = hashlib.blake2b(file.read(), digest_size=16).hexdigest()
+        # A crash between the two renames leaves the state of a snapshot that never landed
+        return state["seq"] if state["digest"] == digest else state["previous_seq"]
+
+    def replay(self, journal_name):
+        # Apply a journal file; returns (entries applied, whether it was intact)
+        if not os.path.exists(journal_name):
+            return 0, True
+        count = 0
+        with open(journal_name, "r") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    return count, False  # Torn write at the end of the journal
+                seq = entry.get("seq")
+                if seq is not None and seq <= self.snapshot_seq:
+                    continue  # Already folded into the snapshot
+                self.apply(entry)
+                self.seq = max(self.seq, seq or 0)
+                count += 1
+        return count, True
+
+    def apply(self, entry):
+        # Replay one journal entry
+        roster = self.roster
+        if entry["op"] == "delete":
+            if entry["name"] in roster:
+                roster.pop(roster.position(entry["name"]))
+            return
+
+        record = self.record_class.from_row(entry["row"])
+        if record.name in roster:
+            roster.replace(roster.position(record.name), record)
+        elif entry["op"] == "add":
+            roster.add(record)
+        elif entry["name"] in roster:
+            roster.replace(roster.position(entry["name"]), record)
+        # A replace whose record is gone changes nothing
+
+    # Mutations
+    def add(self, record):
+        # Append a record; raises ValueError if the name is taken
+        position = self.roster.add(record)
+        self.append({"op": "add", "row": record.to_row()})
+        return position
+
+    def replace(self, position, record):
+        # Replace the record at position; raises ValueError if the name is taken
+        old = self.roster.replace(position, record)
+        self.append({"op": "replace", "name": old.name, "row": record.to_row()})
+        return old
+
+    def pop(self, position):
+        record = self.roster.pop(position)
+        self.append({"op": "delete", "name": record.name})
+        return record
+
+    def append(self, entry):
+        with self.lock:
+            if self.journal is None:
+                self.journal = open(self.journal_name, "a")
+            self.seq += 1
+            entry["seq"] = self.seq
+            self.journal.write(json.dumps(entry) + "\n")
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+            self.journal_lines += 1
+            compact = self.journal_lines >= self.compact_after and not self.compacting()
+        if compact:
+            self.compact_in_background()
+
+    # Compaction
+    def compacting(self):
+        return self.compactor is not None and self.compactor.is_alive()
+
+    def compact(self):
+        """
+        Rewrite the snapshot now and drop every journal.
+
+        Also redoes the work of a failed background compaction.
+
+        Raises:
+        OSError: If the snapshot cannot be written; the journals are kept
+        """
+        self.wait_for_compaction()
+        with self.lock:
+            self.close_journal()
+            self.save_snapshot(list(self.roster), self.seq)
+            for journal_name in (self.old_journal_name, self.journal_name):
+                if os.path.exists(journal_name):
+                    os.remove(journal_name)
+            self.journal_lines = 0
+            self.compaction_error = None
+
+    def compact_in_background(self):
+        # Move the journal aside, then fold it into a snapshot off-thread
+        with self.lock:
+            self.close_journal()
+            if os.path.exists(self.old_journal_name):
+                # A failed compaction left its journal behind; keep its lines too
+                self.append_journal(self.journal_name, self.old_journal_name)
+            elif os.path.exists(self.journal_name):
+                os.replace(self.journal_name, self.old_journal_name)
+            self.journal_lines = 0
+            records = list(self.roster)
+            seq = self.seq
+        self.compactor = threading.Thread(target=self.write_snapshot, args=(records, seq), daemon=True)
+        self.compactor.start()
+
+    def append_journal(self, source, target):
+        # Move the lines of one journal to the end of another
+        if not os.path.exists(source):
+            return
+        with open(source, "r") as new, open(target, "a") as old:
+            old.write(new.read())
+            old.flush()
+            os.fsync(old.fileno())
+        os.remove(source)
+
+    def write_snapshot(self, records, seq):
+        # Body of the compaction thread; a failure is kept for the next compaction
+        try:
+            self.save_snapshot(records, seq)
+            os.remove(self.old_journal_name)
+            self.compaction_error = None
+        except OSError as error:
+            self.compaction_error = error
+
+    def save_snapshot(self, records, seq):
+        # Record the new snapshot's hash and sequence number, then rename it into place
+        temp_name = self.filename + ".tmp"
+        write_records(temp_name, records, self.record_class)
+        with open(temp_name, "rb+") as file:
+            digest = hashlib.blake2b(file.read(), digest_size=16).hexdigest()
+            os.fsync(file.fileno())
+        write_json_atomic(self.state_name, {"digest": digest, "seq": seq, "previous_seq": self.snapshot_seq})
+        os.replace(temp_name, self.filename)
+        self.snapshot_seq = seq
+
+    def wait_for_compaction(self):
+        if self.compactor is not None:
+            self.compactor.join()
+            self.compactor = None
+
+    def close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def close(self):
+        # Leave a compact snapshot and no journal behind
+        self.compact()
+
+
+def table_name(record_class):
+    # Warrior -> warriors, Item -> items
+    return record_class.__name__.lower() + "s"
+
+
+class SQLiteRoster:
+    """
+    Read side of an SQLite table, with the same lookups as Roster.
+
+    Nothing is held in memory but a sparse index and the number of rows:
+    every other call is a query.
+    Rows keep the order in which they were added, through an integer seq
+    column.
+
+    Pages are read by keyset rather than LIMIT/OFFSET, which would step
+    over every row before the page. The seq of every ANCHOR_ROWS-th row is
+    kept as an anchor, found once through the primary key, so a page
+    starts from its anchor and never skips more than ANCHOR_ROWS rows.
+    The position of a row is counted from the anchor before it the same way,
+    and the number of rows is counted once, then kept up to date by the
+    table's mutations.
+
+    Args:
+    connection (sqlite3.Connection): Open database
+    record_class (type): Warrior or Item
+    """
+
+    def __init__(self, connection, record_class):
+        self.connection = connection
+        self.record_class = record_class
+        self.table = table_name(record_class)
+        self.columns = ", ".join(record_class.FIELDS)
+        self.anchors = [0]  # anchors[k] <= seq of row k * ANCHOR_ROWS
+        self.count = None  # Number of rows, counted on first use
+
+    def record(self, row):
+        return self.record_class(**dict(zip(self.record_class.FIELDS, row)))
+
+    def __len__(self):
+        if self.count is None:
+            self.count = self.connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        return self.count
+
+    def __iter__(self):
+        cursor = self.connection.execute(f"SELECT {self.columns} FROM {self.table} ORDER BY seq")
+        return (self.record(row) for row in cursor)
+
+    def __getitem__(self, position):
+        records = self.page(position, 1)
+        if not records:
+            raise IndexError(position)
+        return records[0]
+
+    def __contains__(self, name):
+        return self.connection.execute(
+            f"SELECT 1 FROM {self.table} WHERE name = ?", (name,)).fetchone() is not None
+
+    def get(self, name, default=None):
+        row = self.connection.execute(
+            f"SELECT {self.columns} FROM {self.table} WHERE name = ?", (name,)).fetchone()
+        return default if row is None else self.record(row)
+
+    def position(self, name):
+        # Row of the record with this name; counts the rows between it and the anchor before it
+        row = self.connection.execute(
+            f"SELECT seq FROM {self.table} WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        seq = row[0]
+        while self.anchors[-1] < seq and self.next_anchor():
+            pass
+        anchor = bisect.bisect_right(self.anchors, seq) - 1
+        return anchor * ANCHOR_ROWS + self.connection.execute(
+            f"SELECT COUNT(*) FROM {self.table} WHERE seq >= ? AND seq < ?",
+            (self.anchors[anchor], seq)).fetchone()[0]
+
+    def next_anchor(self):
+        # Find the anchor after the last one; False past the last row
+        row = self.connection.execute(
+            f"SELECT seq FROM {self.table} WHERE seq >= ? ORDER BY seq LIMIT 1 OFFSET ?",
+            (self.anchors[-1], ANCHOR_ROWS)).fetchone()
+        if row is None:
+            return False
+        self.anchors.append(row[0])
+        return True
+
+    def page(self, offset, limit):
+        # Records shown in rows offset .. offset + limit - 1
+        anchor = offset // ANCHOR_ROWS
+        while len(self.anchors) <= anchor:
+            if not self.next_anchor():
+                return []  # Past the last row
+        cursor = self.connection.execute(
+            f"SELECT {self.columns} FROM {self.table} WHERE seq >= ? ORDER BY seq LIMIT ? OFFSET ?",
+            (self.anchors[anchor], limit, offset - anchor * ANCHOR_ROWS))
+        return [self.record(row) for row in cursor]
+
+    def added(self, count):
+        # Rows were appended; anchors stay where they are
+        if self.count is not None:
+            self.count += count
+
+    def removed(self, position):
+        # A row was deleted: anchors of the rows after it moved
+        del self.anchors[position // ANCHOR_ROWS + 1:]
+        if self.count is not None:
+            self.count -= 1
+
+    def names_with_prefix(self, prefix, limit=-1):
+        # Names starting with prefix, in sorted order, through the name index
+        cursor = self.connection.execute(
+            f"SELECT name FROM {self.table} WHERE name >= ? AND name < ? ORDER BY name LIMIT ?",
+            (prefix, prefix + "\U0010ffff", limit))
+        return [row[0] for row in cursor]
+
+    def of_type(self, warrior_type, offset=0, limit=-1):
+        # Warriors of one type, through the type index
+        cursor = self.connection.execute(
+            f"SELECT {self.columns} FROM {self.table} WHERE type = ? ORDER BY seq LIMIT ? OFFSET ?",
+            (warrior_type, limit, offset))
+        return [self.record(row) for row in cursor]
+
+
+class SQLiteTable:
+    """
+    A roster persisted in an SQLite database.
+
+    Args:
+    filename (str): Path of the database file, shared by all tables
+    record_class (type): Warrior or Item
+    """
+
+    def __init__(self, filename, record_class):
+        self.filename = filename
+        self.record_class = record_class
+        self.table = table_name(record_class)
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.create_schema()
+        self.roster = SQLiteRoster(self.connection, record_class)
+
+    def create_schema(self):
+        columns = ", ".join(
+            f"{field} REAL NOT NULL DEFAULT 0" if field in self.record_class.NUMERIC_FIELDS
+            else f"{field} TEXT NOT NULL DEFAULT ''"
+            for field in self.record_class.FIELDS if field != "name"
+        )
+        with self.connection:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                f"seq INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, {columns})")
+            if "type" in self.record_class.FIELDS:
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {self.table}_type ON {self.table} (type, seq)")
+
+    def load(self):
+        """
+        Returns:
+        SQLiteRoster: Query-backed roster; changes must go through this table
+        """
+        return self.roster
+
+    # Mutations
+    def values(self, record):
+        return [getattr(record, field) for field in self.record_class.FIELDS]
+
+    def add(self, record):
+        # Append a record; raises ValueError if the name is taken
+        self.add_many([record])
+        return len(self.roster) - 1
+
+    def add_many(self, records, skip_duplicates=False):
+        """
+        Append many records in one transaction.
+
+        Args:
+        records (iterable): Records to append
+        skip_duplicates (bool): Skip records whose name is taken, so the
+        first record with a name wins
+
+        Raises:
+        ValueError: If a name is taken and duplicates are not skipped;
+        nothing is written then
+        """
+        fields = self.record_class.FIELDS
+        placeholders = ", ".join("?" for _ in fields)
+        verb = "INSERT OR IGNORE" if skip_duplicates else "INSERT"
+        try:
+            with self.connection:
+                cursor = self.connection.executemany(
+                    f"{verb} INTO {self.table} ({', '.join(fields)}) VALUES ({placeholders})",
+                    (self.values(record) for record in records))
+        except sqlite3.IntegrityError as error:
+            raise ValueError(f"Duplicate name: {error}") from error
+        # Skipped duplicates are not counted in rowcount
+        self.roster.added(cursor.rowcount)
+
+    def replace(self, position, record):
+        # Replace the record at position; raises ValueError if the name is taken
+        old = self.roster[position]
+        assignments = ", ".join(f"{field} = ?" for field in self.record_class.FIELDS)
+        try:
+            with self.connection:
+                self.connection.execute(
+                    f"UPDATE {self.table} SET {assignments} WHERE name = ?",
+                    self.values(record) + [old.name])
+        except sqlite3.IntegrityError as error:
+            raise ValueError(f"{record.name} already exists") from error
+        return old
+
+    def pop(self, position):
+        record = self.roster[position]
+        with self.connection:
+            self.connection.execute(f"DELETE FROM {self.table} WHERE name = ?", (record.name,))
+        self.roster.removed(position)
+        return record
+
+    # CSV import and export
+    def import_csv(self, filename):
+        # Append every record of a CSV file in one transaction; as in a CSV
+        # roster, the first record with a name wins and later ones are dropped
+        self.add_many(read_records(filename, self.record_class), skip_duplicates=True)
+
+    def export_csv(self, filename):
+        # Write the whole table to a CSV file, atomically
+        write_atomic(filename, self.roster, self.record_class)
+
+    def close(self):
+        self.connection.close()
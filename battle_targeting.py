@@ -0,0 +1,228 @@
+"""
+Borders of Aeon: Targeting Policies
+==================================
+
+How warriors choose which enemy to attack.
+
+By default every attack picks a living enemy at random. A team can
+instead follow a targeting policy:
+
+- Lowest HP: focus the enemy closest to falling
+- Highest Threat: strike the enemy that deals the most damage per second
+- Type Advantage: prefer enemies the attacker has a type advantage over,
+  avoid the ones it can miss, and finish the weakest of them first
+- Spread: attack the enemy that has been attacked the least
+
+Lazy Heaps
+---------
+Each policy keeps the enemy team in a heap ordered by its key, so a pick
+takes O(log n) however large the team is. Entries are never searched for
+and removed: fallen enemies and superseded entries stay in the heap and
+are dropped when they reach the top.
+
+A stored key may be lower than the enemy's current key, but never higher.
+Regeneration and the attack count of Spread only raise keys, so they are
+fixed when the entry reaches the top. Damage lowers the Lowest HP key, so
+the engine reports every hit, and every regeneration that drains HP, and
+the enemy gets a fresh entry.
+"""
+
+import heapq
+
+# Heap entries kept per living enemy before the heap is rebuilt
+COMPACT_FACTOR = 4
+
+
+def advantage(attacker_type, target_type):
+    # Preference of a target: 0 with a type advantage, 2 if the attack can miss, 1 otherwise
+    if attacker_type == 'Tough' and target_type == 'Dexterous':
+        return 0
+    if attacker_type == 'Smart' and target_type == 'Tough':
+        return 0
+    if attacker_type == 'Smart' and target_type == 'Dexterous':
+        return 2
+    return 1
+
+
+class TargetPolicy:
+    """
+    Base of the targeting policies: the enemy team in a lazy heap.
+
+    Subclasses define key(); the enemy with the lowest key is attacked.
+
+    Args:
+    enemies (list): Combat states of the enemy team
+    """
+
+    name = None
+
+    def __init__(self, enemies):
+        self.states = {state['slot']: state for state in enemies}
+        self.versions = dict.fromkeys(self.states, 0)
+        self.rebuild()
+
+    def key(self, state):
+        raise NotImplementedError
+
+    def rebuild(self):
+        # One current entry per living enemy, ties broken by roster order
+        self.heap = [(self.key(state), slot, self.versions[slot])
+                     for slot, state in self.states.items() if state['hp'] > 0]
+        heapq.heapify(self.heap)
+
+    def update(self, state):
+        # Give an enemy whose key dropped a fresh entry; its old ones go stale
+        slot = state['slot']
+        self.versions[slot] += 1
+        heapq.heappush(self.heap, (self.key(state), slot, self.versions[slot]))
+        if len(self.heap) > COMPACT_FACTOR * len(self.states):
+            self.rebuild()
+
+    def head(self):
+        """
+        The living enemy with the lowest key.
+
+        Returns:
+        dict: Its combat state, None if the whole team has fallen
+        """
+        heap = self.heap
+        while heap:
+            key, slot, version = heap[0]
+            state = self.states[slot]
+            if state['hp'] <= 0 or version != self.versions[slot]:
+                heapq.heappop(heap)
+                continue
+            current = self.key(state)
+            if key != current:
+                # The key rose since the entry was made; move it down
+                heapq.heapreplace(heap, (current, slot, version))
+                continue
+            return state
+        return None
+
+    def pick(self, attacker):
+        """
+        Choose the target of an attack.
+
+        Args:
+        attacker (dict): Combat state of the attacker
+
+        Returns:
+        dict: Combat state of the target
+        """
+        return self.head()
+
+    def damaged(self, state):
+        # Called after a living enemy takes damage
+        self.update(state)
+
+
+class LowestHP(TargetPolicy):
+    name = "Lowest HP"
+
+    def key(self, state):
+        return state['hp']
+
+
+class HighestThreat(TargetPolicy):
+    name = "Highest Threat"
+
+    def key(self, state):
+        # Mean damage per tick, highest first
+        return -(state['min_dmg'] + state['max_dmg']) / (2 * state['cooldown_ticks'])
+
+    def damaged(self, state):
+        # Threat does not change with HP
+        pass
+
+
+class Spread(TargetPolicy):
+    name = "Spread"
+
+    def __init__(self, enemies):
+        self.attacks = {state['slot']: 0 for state in enemies}
+        super().__init__(enemies)
+
+    def key(self, state):
+        return self.attacks[state['slot']]
+
+    def pick(self, attacker):
+        target = self.head()
+        self.attacks[target['slot']] += 1
+        return target
+
+    def damaged(self, state):
+        # Only attacks count, not the damage they deal
+        pass
+
+
+class TypeAdvantage(TargetPolicy):
+    """
+    Prefer type advantages, then the weakest enemy.
+
+    Keeps a Lowest HP heap per enemy type; an attack compares the heads of
+    at most three heaps.
+
+    Args:
+    enemies (list): Combat states of the enemy team
+    """
+
+    name = "Type Advantage"
+
+    def __init__(self, enemies):
+        self.by_type = {}
+        for state in enemies:
+            self.by_type.setdefault(state['type'], []).append(state)
+        self.by_type = {warrior_type: LowestHP(group) for warrior_type, group in self.by_type.items()}
+
+    def pick(self, attacker):
+        best = None
+        for warrior_type, policy in self.by_type.items():
+            state = policy.head()
+            if state is None:
+                continue
+            rank = (advantage(attacker['type'], warrior_type), state['hp'], state['slot'])
+            if best is None or rank < best[0]:
+                best = (rank, state)
+        return best[1]
+
+    def damaged(self, state):
+        self.by_type[state['type']].damaged(state)
+
+
+# Policies by name; None attacks a random living enemy
+POLICIES = {
+    "Random": None,
+    LowestHP.name: LowestHP,
+    HighestThreat.name: HighestThreat,
+    TypeAdvantage.name: TypeAdvantage,
+    Spread.name: Spread,
+}
+
+
+def policy_name(policy):
+    # Display name of a policy, "Random" for None
+    return "Random" if policy is None else policy.name
+
+
+def resolve(targeting):
+    """
+    Targeting policies of both teams.
+
+    Args:
+    targeting: None, a policy class or name for both teams, or a
+    (Team 1, Team 2) pair of them
+
+    Returns:
+    tuple: (Team 1 policy, Team 2 policy) classes, None for random targets
+    """
+    if not isinstance(targeting, (tuple, list)):
+        targeting = (targeting, targeting)
+    policies = []
+    for policy in targeting:
+        if isinstance(policy, str):
+            if policy not in POLICIES:
+                raise ValueError(f"Unknown targeting policy {policy}")
+            policy = POLICIES[policy]
+        policies.append(policy)
+    return tuple(policies)
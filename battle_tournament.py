@@ -0,0 +1,558 @@
+"""
+Borders of Aeon: Tournaments
+===========================
+
+Round robin and Swiss tournaments over a whole roster.
+
+In a round robin every warrior fights every other warrior a fixed number
+of times, which grows as N². A Swiss tournament instead plays about
+log2(N) rounds, each pairing warriors with similar scores, and ranks
+even very large rosters with O(N log N) battles.
+
+Matchups are cut into chunks of pairs and spread over a process pool;
+each worker receives the compiled combat profiles once when it starts
+and afterwards only the pairs to fight.
+
+Sides alternate between repetitions, so neither warrior of a pair always
+gets the Team 1 advantage of striking first within a tick. Only winners
+are counted, so battles end as soon as their winner is certain.
+
+Reproducibility
+--------------
+Every chunk draws from its own random stream seeded from the base seed
+and the chunk number, as in battle_batch. The same seed gives the same
+tournament whatever the number of workers.
+
+Output
+-----
+write_matrix saves the win rate of every warrior (row) against every
+other warrior (column); write_standings saves the ranking by points,
+one point per win and half a point per draw. Swiss standings break ties
+in score by the Buchholz score, the sum of the opponents' scores.
+
+Checkpoints
+----------
+A Swiss tournament can save its scores after every round, written
+atomically to a JSON file. Running it again with the same warriors and
+settings resumes after the last completed round. A warrior whose stats
+changed, for example by fighting at another level, starts a new one.
+Ratings are only recorded for rounds that reached the checkpoint, so a
+round cut short and played again on resume is rated once.
+
+Usage
+----
+python battle_tournament.py --reps 10 --workers 32
+python battle_tournament.py --swiss --checkpoint swiss.json
+python battle_tournament.py --level 10
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import battle_batch
+import battle_engine
+from battle_records import Warrior, read_records
+from battle_storage import write_json_atomic
+
+# Battles handed to a worker at a time
+CHUNK_BATTLES = battle_batch.CHUNK_SIZE
+
+# Players further down the Swiss ranking tried to avoid a rematch
+REMATCH_LOOKAHEAD = 8
+
+# Profiles of the tournament, set once in every worker process
+worker_profiles = None
+
+
+def init_worker(profiles):
+    global worker_profiles
+    worker_profiles = profiles
+
+
+def as_team(entry):
+    # A single profile fights as a team of one; teams (lists) pass through
+    return entry if isinstance(entry, list) else [entry]
+
+
+def run_pairs(pairs, repetitions, seed, chunk_key):
+    """
+    Fight a chunk of pairs of the tournament in this process.
+
+    Args:
+    pairs (list): (i, j) indexes of the warriors or teams of each pair
+    repetitions (int): Battles per pair
+    seed (int): Base seed of the tournament
+    chunk_key (int or str): Identifies the chunk's random stream
+
+    Returns:
+    list: (wins of the first warrior, wins of the second, draws) per pair
+    """
+    rng = battle_batch.chunk_rng(seed, chunk_key)
+    results = []
+    for i, j in pairs:
+        first = as_team(worker_profiles[i])
+        second = as_team(worker_profiles[j])
+        wins = [0, 0, 0]  # Draws, first warrior, second warrior
+        for repetition in range(repetitions):
+            if repetition % 2 == 0:
+                winner = battle_engine.simulate_battle(
+                    first, second, rng=rng, log_level=battle_engine.LOG_OFF, outcome_only=True).winner
+            else:
+                winner = battle_engine.simulate_battle(
+                    second, first, rng=rng, log_level=battle_engine.LOG_OFF, outcome_only=True).winner
+                winner = (0, 2, 1)[winner]
+            wins[winner] += 1
+        results.append((wins[1], wins[2], wins[0]))
+    return results
+
+
+def start_pool(profiles, workers):
+    # Worker processes primed with the profiles (or teams), or None to fight inline
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1:
+        init_worker(profiles)
+        return None
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(profiles,))
+
+
+def play_chunks(pool, chunks, repetitions, seed, collect, cancel=None):
+    """
+    Fight chunks of pairs, inline or on a pool.
+
+    Args:
+    pool (ProcessPoolExecutor): Workers from start_pool, None to fight inline
+    chunks (list): (chunk key, pairs) of every chunk
+    repetitions (int): Battles per pair
+    seed (int): Base seed of the tournament
+    collect (callable): Called with (pairs, results) as each chunk finishes
+    cancel (threading.Event): Stops early when set
+
+    Returns:
+    bool: False when cancelled
+    """
+    if pool is None:
+        for chunk_key, pairs in chunks:
+            if cancel is not None and cancel.is_set():
+                return False
+            collect(pairs, run_pairs(pairs, repetitions, seed, chunk_key))
+        return True
+
+    futures = {
+        pool.submit(run_pairs, pairs, repetitions, seed, chunk_key): pairs
+        for chunk_key, pairs in chunks
+    }
+    for future in as_completed(futures):
+        if cancel is not None and cancel.is_set():
+            for pending in futures:
+                pending.cancel()
+            return False
+        collect(futures[future], future.result())
+    return True
+
+
+def cut_chunks(pairs, repetitions, prefix=""):
+    # Fixed-size chunks of pairs keep results independent of the worker count
+    size = max(1, CHUNK_BATTLES // max(1, repetitions))
+    return [(f"{prefix}{chunk_index}" if prefix else chunk_index, pairs[start:start + size])
+            for chunk_index, start in enumerate(range(0, len(pairs), size))]
+
+
+class TournamentResult:
+    """
+    Win and draw counts of every pair of a round robin.
+
+    Args:
+    names (list): Warrior names, in roster order
+    repetitions (int): Battles fought by every pair
+    seed (int): Base seed the battles were drawn from
+    """
+
+    def __init__(self, names, repetitions, seed):
+        self.names = names
+        self.repetitions = repetitions
+        self.seed = seed
+        count = len(names)
+        self.wins = [[0] * count for _ in range(count)]
+        self.draws = [[0] * count for _ in range(count)]
+
+    def record(self, i, j, wins_i, wins_j, draws):
+        self.wins[i][j] = wins_i
+        self.wins[j][i] = wins_j
+        self.draws[i][j] = self.draws[j][i] = draws
+
+    def win_rate(self, i, j):
+        # Share of the battles between i and j that i won
+        return self.wins[i][j] / self.repetitions
+
+    def standings(self):
+        """
+        Returns:
+        list: (name, wins, losses, draws, points) rows, best first
+        """
+        rows = []
+        for i, name in enumerate(self.names):
+            wins = sum(self.wins[i])
+            draws = sum(self.draws[i])
+            losses = sum(row[i] for row in self.wins)
+            rows.append((name, wins, losses, draws, wins + draws / 2))
+        rows.sort(key=lambda row: (-row[4], -row[1], row[0]))
+        return rows
+
+    def write_matrix(self, filename):
+        # Win rate of the row warrior against the column warrior
+        with open(filename, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["warrior"] + self.names)
+            for i, name in enumerate(self.names):
+                writer.writerow([name] + [
+                    "" if i == j else f"{self.win_rate(i, j):.4f}" for j in range(len(self.names))
+                ])
+
+    def write_standings(self, filename):
+        games = self.repetitions * (len(self.names) - 1)
+        with open(filename, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["rank", "warrior", "wins", "losses", "draws", "points", "score"])
+            for rank, (name, wins, losses, draws, points) in enumerate(self.standings(), 1):
+                score = points / games if games else 0.0
+                writer.writerow([rank, name, wins, losses, draws, points, f"{score:.4f}"])
+
+    def summary(self, top=20):
+        text = "=== Round Robin ===\n\n"
+        text += (f"Warriors: {len(self.names)}, {self.repetitions} battles per pair "
+                 f"(seed {self.seed})\n\n")
+        games = self.repetitions * (len(self.names) - 1)
+        for rank, (name, wins, losses, draws, points) in enumerate(self.standings()[:top], 1):
+            score = points / games if games else 0.0
+            text += f"{rank}. {name}: {wins}W {losses}L {draws}D ({score:.1%})\n"
+        return text
+
+
+def round_robin(warriors, repetitions=10, seed=None, workers=None, progress=None, cancel=None,
+                ratings=None):
+    """
+    Fight every pair of warriors a number of times.
+
+    Args:
+    warriors (list): CombatProfile or {'warrior': ..., 'item': ...} entries
+    repetitions (int): Battles fought by every pair
+    seed (int): Base seed, a random one is picked when omitted
+    workers (int): Worker processes, defaults to one per core
+    progress (callable): Called with (battles done, battles) after each chunk
+    cancel (threading.Event): Stops the tournament early when set
+    ratings (battle_ratings.RatingTable): Rated in pair order once every
+    pair has fought; a cancelled tournament is not rated
+
+    Returns:
+    TournamentResult: Results of every pair, or None when cancelled
+    """
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+
+    profiles = [battle_engine.as_profile(entry) for entry in warriors]
+    result = TournamentResult([profile.name for profile in profiles], repetitions, seed)
+    pairs = list(itertools.combinations(range(len(profiles)), 2))
+    battles = len(pairs) * repetitions
+    done = 0
+
+    def collect(chunk_pairs, outcomes):
+        nonlocal done
+        for (i, j), (wins_i, wins_j, draws) in zip(chunk_pairs, outcomes):
+            result.record(i, j, wins_i, wins_j, draws)
+        done += len(chunk_pairs) * repetitions
+        if progress is not None:
+            progress(done, battles)
+
+    pool = start_pool(profiles, workers)
+    try:
+        finished = play_chunks(pool, cut_chunks(pairs, repetitions), repetitions, seed, collect, cancel)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    if not finished:
+        return None
+
+    # Chunks finish in any order; rating in pair order keeps ratings reproducible
+    if ratings is not None:
+        for i, j in pairs:
+            ratings.record_counts([result.names[i]], [result.names[j]], result.wins[i][j], result.wins[j][i],
+                                  result.draws[i][j])
+    return result
+
+
+class SwissResult:
+    """
+    Scores of a Swiss tournament after some rounds.
+
+    Args:
+    names (list): Warrior names, in roster order
+    rounds (int): Rounds of the full tournament
+    repetitions (int): Battles per match
+    seed (int): Base seed the battles were drawn from
+    """
+
+    def __init__(self, names, rounds, repetitions, seed):
+        self.names = names
+        self.rounds = rounds
+        self.repetitions = repetitions
+        self.seed = seed
+        self.rounds_played = 0
+        count = len(names)
+        self.scores = [0.0] * count
+        self.wins = [0] * count
+        self.losses = [0] * count
+        self.draws = [0] * count
+        self.opponents = [[] for _ in range(count)]
+        self.had_bye = [False] * count
+
+    def record(self, i, j, wins_i, wins_j):
+        # A match goes to the warrior who won more of its battles
+        self.opponents[i].append(j)
+        self.opponents[j].append(i)
+        if wins_i > wins_j:
+            self.scores[i] += 1
+            self.wins[i] += 1
+            self.losses[j] += 1
+        elif wins_j > wins_i:
+            self.scores[j] += 1
+            self.wins[j] += 1
+            self.losses[i] += 1
+        else:
+            self.scores[i] += 0.5
+            self.scores[j] += 0.5
+            self.draws[i] += 1
+            self.draws[j] += 1
+
+    def record_bye(self, i):
+        self.had_bye[i] = True
+        self.scores[i] += 1
+
+    def buchholz(self, i):
+        # Tie break: sum of the scores of the warrior's opponents
+        return sum(self.scores[j] for j in self.opponents[i])
+
+    def standings(self):
+        """
+        Returns:
+        list: (name, score, buchholz, wins, losses, draws) rows, best first
+        """
+        rows = [(name, self.scores[i], self.buchholz(i), self.wins[i], self.losses[i], self.draws[i])
+                for i, name in enumerate(self.names)]
+        rows.sort(key=lambda row: (-row[1], -row[2], row[0]))
+        return rows
+
+    def write_standings(self, filename):
+        with open(filename, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["rank", "warrior", "score", "buchholz", "wins", "losses", "draws"])
+            for rank, row in enumerate(self.standings(), 1):
+                writer.writerow([rank] + list(row))
+
+    def summary(self, top=20):
+        text = "=== Swiss Tournament ===\n\n"
+        text += (f"Warriors: {len(self.names)}, round {self.rounds_played} of {self.rounds}, "
+                 f"{self.repetitions} battles per match (seed {self.seed})\n\n")
+        for rank, (name, score, buchholz, wins, losses, draws) in enumerate(self.standings()[:top], 1):
+            text += f"{rank}. {name}: {score:g} points, {wins}W {losses}L {draws}D (Buchholz {buchholz:g})\n"
+        return text
+
+    # Checkpoints
+    def to_checkpoint(self):
+        return {
+            "names": self.names, "rounds": self.rounds, "repetitions": self.repetitions,
+            "seed": self.seed, "rounds_played": self.rounds_played, "scores": self.scores,
+            "wins": self.wins, "losses": self.losses, "draws": self.draws,
+            "opponents": self.opponents, "had_bye": self.had_bye,
+        }
+
+    @classmethod
+    def from_checkpoint(cls, data):
+        result = cls(data["names"], data["rounds"], data["repetitions"], data["seed"])
+        for field in ("rounds_played", "scores", "wins", "losses", "draws", "opponents", "had_bye"):
+            setattr(result, field, data[field])
+        return result
+
+
+def swiss_pairings(result, seeding):
+    """
+    Pair warriors with equal or close scores for the next round.
+
+    Warriors are ranked by score through one sort, then each one is
+    paired with the next free warrior it has not met yet, looking at most
+    REMATCH_LOOKAHEAD warriors down the ranking before allowing a rematch.
+
+    Args:
+    result (SwissResult): Scores so far
+    seeding (list): Random rank of every warrior, breaks ties in score
+
+    Returns:
+    tuple: (list of (i, j) pairs, index of the warrior with a bye or None)
+    """
+    count = len(result.names)
+    order = sorted(range(count), key=lambda i: (-result.scores[i], seeding[i]))
+    used = [False] * count
+
+    # The lowest ranked warrior without a bye sits out an odd round
+    bye = None
+    if count % 2:
+        bye = next((i for i in reversed(order) if not result.had_bye[i]), order[-1])
+        used[bye] = True
+
+    pairs = []
+    for position, i in enumerate(order):
+        if used[i]:
+            continue
+        used[i] = True
+        met = set(result.opponents[i])
+        first = partner = None
+        candidate = position + 1
+        looked = 0
+        while candidate < count and looked < REMATCH_LOOKAHEAD:
+            j = order[candidate]
+            if not used[j]:
+                if first is None:
+                    first = j
+                if j not in met:
+                    partner = j
+                    break
+                looked += 1
+            candidate += 1
+        if partner is None:
+            partner = first  # Rematch with the next free warrior
+        used[partner] = True
+        pairs.append((i, partner))
+    return pairs, bye
+
+
+def swiss(warriors, rounds=None, repetitions=3, seed=None, workers=None, checkpoint=None,
+          progress=None, cancel=None, ratings=None):
+    """
+    Rank warriors with a Swiss tournament.
+
+    Each round pairs warriors with similar scores, so about log2(N) rounds
+    of N/2 matches rank the roster with O(N log N) battles. The matches of
+    a round are fought in parallel.
+
+    Args:
+    warriors (list): CombatProfile or {'warrior': ..., 'item': ...} entries
+    rounds (int): Number of rounds, defaults to ceil(log2(N))
+    repetitions (int): Battles per match; an odd number avoids drawn matches
+    seed (int): Base seed, a random one is picked when omitted
+    workers (int): Worker processes, defaults to one per core
+    checkpoint (str): JSON file saved after every round; a tournament of
+    the same warriors, stats and settings found there is resumed, anything
+    else is replaced. The file is removed once the last round is played
+    progress (callable): Called with (battles done, battles) after each chunk
+    cancel (threading.Event): Stops after the current chunk when set;
+    the last completed round stays in the checkpoint
+    ratings (battle_ratings.RatingTable): Rated round by round, once a
+    round is complete and checkpointed, so a resumed round is never rated
+    twice
+
+    Returns:
+    SwissResult: Scores and standings, or None when cancelled
+    """
+    profiles = [battle_engine.as_profile(entry) for entry in warriors]
+    names = [profile.name for profile in profiles]
+    stats = [list(profile) for profile in profiles]
+    if rounds is None:
+        rounds = max(1, math.ceil(math.log2(max(2, len(profiles)))))
+
+    result = None
+    if checkpoint is not None and os.path.exists(checkpoint):
+        with open(checkpoint, "r") as file:
+            data = json.load(file)
+        # Checkpoints from before stats were saved match on names alone
+        if (data["names"] == names and data.get("profiles", stats) == stats and data["rounds"] == rounds
+                and data["repetitions"] == repetitions and seed in (None, data["seed"])):
+            result = SwissResult.from_checkpoint(data)
+    if result is None:
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        result = SwissResult(names, rounds, repetitions, seed)
+    seed = result.seed
+
+    # Ties in score are broken by a random but reproducible seeding
+    seeding = list(range(len(profiles)))
+    random.Random(f"{seed}-seeding").shuffle(seeding)
+
+    battles = rounds * (len(profiles) // 2) * repetitions
+    done = result.rounds_played * (len(profiles) // 2) * repetitions
+
+    # Outcomes of the round being played, by pair
+    outcomes_by_pair = {}
+
+    def collect(chunk_pairs, outcomes):
+        nonlocal done
+        outcomes_by_pair.update(zip(chunk_pairs, outcomes))
+        done += len(chunk_pairs) * repetitions
+        if progress is not None:
+            progress(done, battles)
+
+    pool = start_pool(profiles, workers) if result.rounds_played < rounds else None
+    try:
+        while result.rounds_played < rounds:
+            pairs, bye = swiss_pairings(result, seeding)
+            chunks = cut_chunks(pairs, repetitions, prefix=f"round{result.rounds_played}.")
+            outcomes_by_pair.clear()
+            if not play_chunks(pool, chunks, repetitions, seed, collect, cancel):
+                return None
+
+            # A round counts only once all of its matches are in, in pairing order
+            for i, j in pairs:
+                wins_i, wins_j, draws = outcomes_by_pair[(i, j)]
+                result.record(i, j, wins_i, wins_j)
+            if bye is not None:
+                result.record_bye(bye)
+            result.rounds_played += 1
+            if checkpoint is not None:
+                write_json_atomic(checkpoint, dict(result.to_checkpoint(), profiles=stats))
+            if ratings is not None:
+                for i, j in pairs:
+                    wins_i, wins_j, draws = outcomes_by_pair[(i, j)]
+                    ratings.record_counts([names[i]], [names[j]], wins_i, wins_j, draws)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    if checkpoint is not None and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Round robin or Swiss tournament of the roster")
+    parser.add_argument("--warriors", default=os.path.join("config", "warriors.csv"),
+                        help="roster CSV file")
+    parser.add_argument("--swiss", action="store_true", help="play a Swiss tournament")
+    parser.add_argument("--rounds", type=int, help="Swiss rounds, ceil(log2(N)) by default")
+    parser.add_argument("--checkpoint", help="Swiss checkpoint file to save and resume from")
+    parser.add_argument("--reps", type=int,
+                        help="battles per pair of warriors (10) or per Swiss match (3)")
+    parser.add_argument("--seed", type=int, help="base seed of the random streams")
+    parser.add_argument("--level", type=int, default=1,
+                        help=f"level of every warrior, 1 to {battle_engine.MAX_LEVEL}")
+    parser.add_argument("--workers", type=int, help="worker processes, one per core by default")
+    parser.add_argument("--matrix", default="tournament_matrix.csv", help="win rate matrix output")
+    parser.add_argument("--standings", default="tournament_standings.csv", help="standings output")
+    args = parser.parse_args()
+
+    roster = read_records(args.warriors, Warrior)
+    if not 1 <= args.level <= battle_engine.MAX_LEVEL:
+        parser.error(f"--level must be from 1 to {battle_engine.MAX_LEVEL}")
+    entries = [{'warrior': warrior, 'item': None, 'level': args.level} for warrior in roster]
+    if args.swiss:
+        tournament = swiss(entries, args.rounds, args.reps or 3, seed=args.seed,
+                           workers=args.workers, checkpoint=args.checkpoint)
+    else:
+        tournament = round_robin(entries, args.reps or 10, seed=args.seed, workers=args.workers)
+        tournament.write_matrix(args.matrix)
+    tournament.write_standings(args.standings)
+    print(tournament.summary())
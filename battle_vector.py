@@ -0,0 +1,243 @@
+"""
+Borders of Aeon: Vectorized Battles
+==================================
+
+Thousands of 1v1 battles of the same matchup fought in lockstep with NumPy.
+
+Every battle is a row in a set of arrays (HP, next attack, stun timers).
+Each step jumps every battle to its own next event tick and resolves the
+regen, Team 1 attack and Team 2 attack events of that tick with
+array-wide random draws and masks, so the interpreter cost is paid once
+per step instead of once per attack.
+
+The rules and the tick clock are the ones of battle_engine, so the
+outcomes match simulate_battle statistically (not draw for draw).
+Battles proven to be draws by the bounds of battle_engine end early, as
+in simulate_battle.
+
+Dependencies
+-----------
+NumPy is optional for the rest of the Battle Arena and only needed here.
+"""
+
+import battle_batch
+import battle_engine
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+# Type advantage of an attacker over a target
+NO_EFFECT = 0
+MISS = 1
+WEAK_SPOT = 2
+STUN = 3
+
+
+def type_effect(attacker_type, target_type):
+    # Same type advantage rules as simulate_battle
+    if attacker_type == 'Smart' and target_type == 'Dexterous':
+        return MISS
+    if attacker_type == 'Smart' and target_type == 'Tough':
+        return WEAK_SPOT
+    if attacker_type == 'Tough' and target_type == 'Dexterous':
+        return STUN
+    return NO_EFFECT
+
+
+def seconds_to_ticks(seconds):
+    # Array version of battle_engine.seconds_to_ticks
+    return np.maximum(0, np.ceil(np.round(seconds * battle_engine.TICKS_PER_SECOND, 9))).astype(np.int64)
+
+
+class Side:
+    """
+    One side of every battle: fixed stats plus per-battle arrays.
+
+    Args:
+    state (dict): Combat state from battle_engine.init_warrior_state
+    battles (int): Number of battles fought in lockstep
+    """
+
+    def __init__(self, state, battles):
+        self.type = state['type']
+        self.max_hp = state['max_hp']
+        self.hp_regen = state['hp_regen']
+        self.min_dmg = state['min_dmg']
+        self.max_dmg = state['max_dmg']
+        self.damage_taken = state['damage_taken']
+        self.cooldown_ticks = state['cooldown_ticks']
+
+        self.hp = np.full(battles, state['hp'], dtype=np.float64)
+        self.next_attack = np.full(battles, state['next_attack'], dtype=np.int64)
+        self.next_action = np.full(battles, state['next_action'], dtype=np.int64)
+        self.stun_end = np.zeros(battles, dtype=np.int64)
+        self.stun_immune = np.zeros(battles, dtype=np.int64)
+        self.stun_diminish = np.ones(battles, dtype=np.float64)
+
+    def keep(self, mask):
+        # Drop the rows of battles that have finished
+        self.hp = self.hp[mask]
+        self.next_attack = self.next_attack[mask]
+        self.next_action = self.next_action[mask]
+        self.stun_end = self.stun_end[mask]
+        self.stun_immune = self.stun_immune[mask]
+        self.stun_diminish = self.stun_diminish[mask]
+
+
+def attack(attacker, target, effect, rows, tick, rng):
+    """
+    Resolve the attacks of attacker on target in the given battle rows.
+
+    Args:
+    attacker (Side): Attacking side
+    target (Side): Defending side
+    effect (int): Type advantage of the attacker over the target
+    rows (ndarray or slice): Battles where the attacker acts now
+    tick (ndarray): Current tick of each of those battles
+    rng (numpy.random.Generator): Random stream
+    """
+    count = len(tick)
+    bonus = 1.0
+    hit = None
+
+    if effect == MISS:
+        hit = rng.random(count) >= 0.2  # 20% chance to miss
+    elif effect == WEAK_SPOT:
+        bonus = np.where(rng.random(count) < 0.2, 1.5, 1.0)  # 20% chance for bonus damage
+    elif effect == STUN:
+        stun = (rng.random(count) < 0.2) & (tick >= target.stun_immune[rows])  # 20% chance to stun
+        stunned = np.flatnonzero(stun) if isinstance(rows, slice) else rows[stun]
+        stun_tick = tick[stun]
+        duration = target.stun_diminish[stunned]
+        target.stun_end[stunned] = stun_tick + seconds_to_ticks(duration)
+        target.stun_immune[stunned] = stun_tick + seconds_to_ticks(duration + 1)
+        target.stun_diminish[stunned] = duration * 0.5
+        # Push the target's pending attack back to the end of the stun
+        target.next_action[stunned] = np.maximum(target.next_action[stunned], target.stun_end[stunned])
+
+    base_damage = rng.uniform(attacker.min_dmg, attacker.max_dmg, count)
+    final_damage = np.maximum(1, base_damage * target.damage_taken * bonus)
+    if hit is not None:
+        final_damage = np.where(hit, final_damage, 0.0)
+    target.hp[rows] -= final_damage
+
+    # Set next attack time
+    attacker.next_attack[rows] = tick + attacker.cooldown_ticks
+    attacker.next_action[rows] = np.maximum(attacker.next_attack[rows], attacker.stun_end[rows])
+
+
+def survives(side, bounds, remaining):
+    # Array version of battle_engine.survives, right after a regeneration
+    proven = side.hp > remaining * bounds.damage_rate + bounds.hit_sum
+    if side.hp_regen >= bounds.burst:
+        proven |= side.hp > bounds.burst
+    return proven & (side.hp > 0)
+
+
+def acting_rows(mask):
+    # Battles selected by mask; a plain slice when they all act in lockstep
+    rows = np.flatnonzero(mask)
+    if not len(rows):
+        return None
+    if len(rows) == len(mask):
+        return slice(None)
+    return rows
+
+
+def simulate_1v1_batch(warrior1, warrior2, battles, seed=None):
+    """
+    Fight the same 1v1 matchup many times in lockstep.
+
+    Args:
+    warrior1 (CombatProfile or dict): Team 1 warrior and item
+    warrior2 (CombatProfile or dict): Team 2 warrior and item
+    battles (int): Number of battles
+    seed (int): Seed of the NumPy random generator
+
+    Returns:
+    tuple: (winners, ticks) arrays; winner is 1, 2 or 0 for a draw
+    """
+    if np is None:
+        raise RuntimeError("The vectorized battle engine requires NumPy (pip install numpy)")
+
+    rng = np.random.default_rng(seed)
+    side1 = Side(battle_engine.init_warrior_state(warrior1), battles)
+    side2 = Side(battle_engine.init_warrior_state(warrior2), battles)
+    effect12 = type_effect(side1.type, side2.type)
+    effect21 = type_effect(side2.type, side1.type)
+    # No bounds and no stalemate checks unless both warriors are provable
+    bounds, proof_ticks = battle_engine.battle_bounds(
+        (battle_engine.as_profile(warrior1),), (battle_engine.as_profile(warrior2),))
+    bounds1, bounds2 = bounds or (None, None)
+    check_from = max(proof_ticks)
+
+    winners = np.zeros(battles, dtype=np.int8)
+    ticks = np.full(battles, battle_engine.MAX_BATTLE_TICKS, dtype=np.int64)
+
+    # Original battle number of every row still being fought
+    active = np.arange(battles)
+    next_regen = np.full(battles, battle_engine.TICKS_PER_SECOND, dtype=np.int64)
+
+    while len(active):
+        # Jump every battle to its own next event
+        tick = np.minimum(np.minimum(side1.next_action, side2.next_action), next_regen)
+        running = tick < battle_engine.MAX_BATTLE_TICKS
+
+        # Process HP regeneration every second
+        regen_mask = (next_regen == tick) & running
+        regen = acting_rows(regen_mask)
+        stalemate = None
+        if regen is not None:
+            for side in (side1, side2):
+                # Only the wounded regenerate, as in battle_engine, draining included
+                hp = side.hp[regen]
+                side.hp[regen] = np.where(hp < side.max_hp, np.minimum(hp + side.hp_regen, side.max_hp), hp)
+            next_regen[regen] += battle_engine.TICKS_PER_SECOND
+            # Battles where both sides are proven to survive are draws
+            if tick.max() >= check_from:
+                remaining = battle_engine.MAX_BATTLE_TICKS - tick
+                stalemate = regen_mask & survives(side1, bounds1, remaining) & survives(side2, bounds2, remaining)
+
+        # Team 1 attacks before Team 2 within a tick; a side drained to death
+        # by its regeneration has ended the battle already
+        rows = acting_rows((side1.next_action == tick) & running & (side1.hp > 0) & (side2.hp > 0))
+        if rows is not None:
+            attack(side1, side2, effect12, rows, tick[rows], rng)
+
+        rows = acting_rows((side2.next_action == tick) & running & (side1.hp > 0) & (side2.hp > 0))
+        if rows is not None:
+            attack(side2, side1, effect21, rows, tick[rows], rng)
+
+        # Check victory conditions
+        team1_won = side2.hp <= 0
+        team2_won = side1.hp <= 0
+        finished = team1_won | team2_won | ~running
+        if stalemate is not None:
+            finished |= stalemate
+        if finished.any():
+            # When both fall on one regeneration Team 1 wins, as in battle_engine
+            winners[active[team2_won]] = 2
+            winners[active[team1_won]] = 1
+            decided = team1_won | team2_won
+            ticks[active[decided]] = tick[decided]
+
+            keep = ~finished
+            active = active[keep]
+            next_regen = next_regen[keep]
+            side1.keep(keep)
+            side2.keep(keep)
+
+    return winners, ticks
+
+
+def estimate_win_rates(warrior1, warrior2, battles=100000, seed=None, confidence=0.95):
+    """
+    Vectorized counterpart of battle_batch.estimate_win_rates for 1v1.
+
+    Returns:
+    battle_batch.WinRateEstimate: Win/draw probabilities and battle durations
+    """
+    winners, ticks = simulate_1v1_batch(warrior1, warrior2, battles, seed)
+    return battle_batch.WinRateEstimate(list(zip(winners.tolist(), ticks.tolist())), seed, confidence)
@@ -2,7 +2,7 @@
 Borders of Aeon: Battle Arena
 ============================
 
-A tactical battle simulation game where warriors with different types and abilities face off in 1v1 or 3v3 matches.
+A tactical battle simulation game where warriors with different types and abilities face off in 1v1, 3v3 or large NvN matches.
 
 Game Features
 ------------
@@ -19,7 +19,7 @@ Game Features
    - Strategic item allocation
 
 3. Battle System
-   - 1v1 or 3v3 battle modes
+   - 1v1, 3v3 and NvN battle modes
    - Real-time battle simulation
    - Type-based combat mechanics
    - Detailed battle logs
@@ -36,7 +36,7 @@ Warrior Stats
 • Dexterity: Affects defense and attack speed
 • Intelligence: Affects damage output
 • Base Stats: Min/max damage, attack time
-• Level-up Stats: Stat growth per level
+• Level-up Stats: Stat growth per level, from level 1 up to level 20
 
 Item Effects
 -----------
@@ -64,24 +64,83 @@ User Manual
    - All stat modifications should be numbers
 
 3. Battle Simulation:
-   - Choose 1v1 or 3v3 battle mode
-   - Select warriors for each team
+   - Choose 1v1 or 3v3 battle mode, or NvN for two random squads of
+     "Size" warriors each drawn from the roster (100v100, 1000v1000, ...)
+   - Select warriors for each team; type the start of a name and open
+     the dropdown to list only the matching warriors
    - Optionally equip items
-   - Click "Start Battle" to begin
+   - Set "Level" to fight with every warrior at that level; each level
+     above 1 adds the warrior's Tough, Dex and Smart increments
+   - Pick how each team chooses its targets: at random, the enemy with
+     the lowest HP, the highest threat, the best type advantage, or the
+     one attacked the least (Spread); used by "Start Battle" and
+     "Win Rates"
+   - The predicted winner, DPS, effective HP and kill times of both
+     teams are shown as soon as the teams are complete
+   - Click "Start Battle" to begin; the battle's seed is shown in its
+     report and the battle is saved as a replay
+   - Click "Check Replay" to fight the last battle again from its seed
+     and check that every event matches the saved replay
+   - Click "Win Rates" to fight the matchup "Battles" times on every core
+     and see win/draw probabilities with 95% confidence intervals
+   - Click "Exact Odds" in 1v1 mode to compute the win/draw probabilities
+     without sampling, with a bound on their rounding error
+   - Click "Tournament" to fight every pair of warriors "Reps" times; the
+     win rate matrix and standings are saved in the config folder
+   - Click "Swiss" to rank a large roster in about log2(N) rounds of
+     "Reps" battles per match; a cancelled Swiss tournament resumes from
+     its last completed round the next time
+   - Click "Best Item" to rank every item for the first Team 1 warrior
+     against the first Team 2 warrior, or against the roster when Team 2
+     is empty
+   - Click "Best Team" to search warriors and items for a team of the
+     current mode against Team 2, or against random teams when Team 2
+     is not complete
+   - Every battle updates the Elo ratings of the warriors (1v1) or team
+     compositions (3v3); click "Ratings" to see the best rated. Random
+     NvN squads and battles above level 1 are not rated
+   - Battles run in the background; watch the progress bar or press
+     "Cancel" to stop a long run
    - Watch the battle unfold in the log window
    - Use "Refresh Lists" to update warrior/item selections
 
 File Structure
 -------------
+battlearena.py - tkinter application
+battle_engine.py - Battle rules, usable without tkinter
+battle_records.py - Typed warrior and item records, CSV load/save
+battle_storage.py - Journaled CSV or SQLite roster storage
+battle_batch.py - Monte Carlo win rates over a process pool
+battle_vector.py - NumPy lockstep engine for large 1v1 batches
+battle_tournament.py - Round robin and Swiss tournaments over a process pool
+battle_ratings.py - Elo ratings of warriors and team compositions
+battle_optimizer.py - Item search by successive halving, team builder
+battle_analysis.py - Closed-form battle estimates and predicted winner
+battle_exact.py - Exact 1v1 odds by dynamic programming
+battle_replay.py - Binary battle replays, checked bit for bit
+battle_targeting.py - Targeting policies over lazy heaps
 config/
     warriors.csv - Stores warrior data
     items.csv - Stores item data
+    tournament_*.csv - Win rate matrix and standings of the last tournament
+    ratings.csv - Elo ratings of warriors and teams
+    swiss_standings.csv - Standings of the last Swiss tournament
+    swiss_checkpoint.json - Progress of an unfinished Swiss tournament
+    last_battle.replay - Seed, targeting, fighters and events of the last battle
+    *.csv.journal - Changes not yet folded into the CSV files
+
+For very large rosters start the game with "--db arena.sqlite" to keep
+warriors and items in an SQLite database instead. A new database is
+filled from the CSV files; "--db arena.sqlite --export-csv" writes it
+back to them.
 
 Dependencies
 -----------
 - Python 3.x
 - tkinter (usually included with Python)
-- Standard library modules: csv, random, os
+- Standard library modules: argparse, csv, hashlib, heapq, json, math,
+  random, os, sqlite3, struct, statistics, concurrent.futures, queue, threading
+- NumPy (optional, for battle_vector.py; speeds up battle_exact.py)
 
 Author
 ------
@@ -91,12 +150,228 @@ John Kenneth Realingo
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import csv
-import random
+import tkinter.font as tkfont
+import argparse
 import os
+import queue
+import random
+import threading
+
+import battle_analysis
+import battle_batch
+import battle_engine
+import battle_exact
+import battle_optimizer
+import battle_ratings
+import battle_records
+import battle_replay
+import battle_targeting
+import battle_tournament
+from battle_records import Item, Warrior
+from battle_storage import JournaledTable, SQLiteTable
+
+# How often the Tk thread checks on a background simulation, in milliseconds
+POLL_INTERVAL_MS = 16
+
+# Lines of a battle report inserted per Tk event
+STREAM_CHUNK_LINES = 200
+
+# Rows moved by one step of the mouse wheel in the roster lists
+WHEEL_ROWS = 3
+
+# Most matches listed when a warrior or item dropdown opens
+CHOICE_LIMIT = 100
+
+# Opponents drawn from the roster when searching against the whole field
+FIELD_SIZE = 500
+
+# Random opponent teams drawn from the roster for the team builder
+FIELD_TEAMS = 10
+
+# Largest team whose composition gets an Elo rating
+RATED_TEAM_SIZE = 3
+
+# Largest random squad of an NvN battle
+MAX_SQUAD_SIZE = 10000
+
+class VirtualListView:
+    """
+    A Listbox that only holds the rows currently on screen.
+
+    Rows are read from the roster with len() and page() whenever the view
+    scrolls, so a list of a million warriors costs one screenful of labels.
+    Adding, editing or deleting a record touches only its own row.
+
+    Args:
+    parent (tk.Widget): Container of the view
+    roster (callable): Returns the Roster or SQLiteRoster to show
+    label (callable): Text shown for a record
+    """
+
+    def __init__(self, parent, roster, label):
+        self.roster = roster
+        self.label = label
+        self.offset = 0
+        self.total = len(roster())
+        self.selected = None
+        self.render_pending = False
+
+        self.frame = tk.Frame(parent)
+        self.listbox = tk.Listbox(self.frame, exportselection=False)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.on_scrollbar)
+        self.listbox.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self.rows = int(self.listbox.cget("height"))
+
+        # The listbox never scrolls by itself; every move goes through offset
+        self.listbox.bind("<Configure>", self.on_resize)
+        self.listbox.bind("<<ListboxSelect>>", self.on_select)
+        self.listbox.bind("<MouseWheel>", lambda e: self.scroll_by(-WHEEL_ROWS if e.delta > 0 else WHEEL_ROWS))
+        self.listbox.bind("<Button-4>", lambda e: self.scroll_by(-WHEEL_ROWS))
+        self.listbox.bind("<Button-5>", lambda e: self.scroll_by(WHEEL_ROWS))
+        self.listbox.bind("<Up>", lambda e: self.move_selection(-1))
+        self.listbox.bind("<Down>", lambda e: self.move_selection(1))
+        self.listbox.bind("<Prior>", lambda e: self.move_selection(-self.rows))
+        self.listbox.bind("<Next>", lambda e: self.move_selection(self.rows))
+        self.render()
+
+    # Scrolling
+    def on_resize(self, event):
+        # Show as many rows as fit in the new height
+        font = tkfont.Font(font=self.listbox.cget("font"))
+        row_height = font.metrics("linespace") + 2 * int(self.listbox.cget("selectborderwidth")) + 1
+        border = 2 * (int(self.listbox.cget("borderwidth")) + int(self.listbox.cget("highlightthickness")))
+        rows = max(1, (event.height - border) // row_height)
+        if rows != self.rows:
+            self.rows = rows
+            self.scroll_to(self.offset)
+            self.schedule_render()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.total))
+        elif unit == "pages":
+            self.scroll_by(int(amount) * self.rows)
+        else:
+            self.scroll_by(int(amount))
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.offset + rows)
+        return "break"
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, self.total - self.rows))
+        if offset != self.offset:
+            self.offset = offset
+            self.schedule_render()
+
+    def schedule_render(self):
+        # Coalesce a burst of scroll events (e.g. dragging) into one page read
+        if not self.render_pending:
+            self.render_pending = True
+            self.listbox.after_idle(self.render)
+
+    def render(self):
+        self.render_pending = False
+        records = self.roster().page(self.offset, self.rows)
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, *[self.label(record) for record in records])
+        self.show_selection()
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, min(1.0, (self.offset + self.rows) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    # Selection
+    def on_select(self, event):
+        selected = self.listbox.curselection()
+        if selected:
+            self.selected = self.offset + selected[0]
+
+    def show_selection(self):
+        self.listbox.selection_clear(0, tk.END)
+        if self.selected is not None and 0 <= self.selected - self.offset < self.listbox.size():
+            self.listbox.selection_set(self.selected - self.offset)
+            self.listbox.activate(self.selected - self.offset)
+
+    def move_selection(self, step):
+        # Keyboard navigation over the whole roster, not just the visible rows
+        if not self.total:
+            return "break"
+        start = self.offset if self.selected is None else self.selected
+        self.selected = max(0, min(start + step, self.total - 1))
+        if self.selected < self.offset:
+            self.scroll_to(self.selected)
+        elif self.selected >= self.offset + self.rows:
+            self.scroll_to(self.selected - self.rows + 1)
+        self.show_selection()
+        return "break"
+
+    def selection(self):
+        """
+        Returns:
+        int: Roster position of the selected row, or None
+        """
+        return self.selected
+
+    # Changes to the roster
+    def reload(self):
+        # The whole roster was replaced; start again from the top
+        self.total = len(self.roster())
+        self.offset = 0
+        self.selected = None
+        self.render()
+
+    def refresh_row(self, position):
+        # The record at position was edited
+        row = position - self.offset
+        if 0 <= row < self.listbox.size():
+            self.listbox.delete(row)
+            self.listbox.insert(row, self.label(self.roster()[position]))
+            self.show_selection()
+
+    def row_added(self, position):
+        # A record was inserted at position
+        self.total += 1
+        row = position - self.offset
+        if 0 <= row < self.rows:
+            self.listbox.insert(row, self.label(self.roster()[position]))
+            if self.listbox.size() > self.rows:
+                self.listbox.delete(tk.END)
+        if self.selected is not None and self.selected >= position:
+            self.selected += 1
+        self.show_selection()
+        self.update_scrollbar()
+
+    def row_removed(self, position):
+        # The record at position was deleted; later rows moved up by one
+        self.total -= 1
+        if self.selected == position:
+            self.selected = None
+        elif self.selected is not None and self.selected > position:
+            self.selected -= 1
+
+        if self.offset > max(0, self.total - self.rows):
+            # Deleting near the end pulls the window up by a row
+            self.offset = max(0, self.total - self.rows)
+            self.render()
+            return
+        row = position - self.offset
+        if row < 0:
+            self.offset -= 1  # A row above the window; the visible records are unchanged
+        elif row < self.listbox.size():
+            self.listbox.delete(row)
+            bottom = self.offset + self.listbox.size()
+            if bottom < self.total:
+                self.listbox.insert(tk.END, self.label(self.roster()[bottom]))
+        self.show_selection()
+        self.update_scrollbar()
 
 class BattleArenaApp:
-    def __init__(self, root):
+    def __init__(self, root, database=None):
         self.root = root
         self.root.title("Borders of Aeon: Battle Arena")
         self.root.geometry("1024x768")
@@ -122,61 +397,76 @@ class BattleArenaApp:
         # Ensure CSV files exist
         self.create_csv_files()
         
+        if database:
+            # Very large rosters live in SQLite, seeded from the CSV files
+            self.warrior_table = SQLiteTable(database, Warrior)
+            self.item_table = SQLiteTable(database, Item)
+            for table, filename in [(self.warrior_table, "warriors.csv"), (self.item_table, "items.csv")]:
+                if not len(table.load()):
+                    table.import_csv(os.path.join(self.config_dir, filename))
+        else:
+            # Rosters are saved as a CSV snapshot plus a journal of changes
+            self.warrior_table = JournaledTable(os.path.join(self.config_dir, "warriors.csv"), Warrior)
+            self.item_table = JournaledTable(os.path.join(self.config_dir, "items.csv"), Item)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Compiled combat stats of each warrior/item pair used in battle
+        self.profile_cache = battle_engine.ProfileCache()
+        
+        # The last battle, saved so it can be fought again
+        self.replay_path = os.path.join(self.config_dir, "last_battle.replay")
+        
+        # Team builders by team size; they remember every simulated matchup
+        self.team_builders = {}
+        
+        # Elo ratings of warriors and teams, updated by every battle
+        self.ratings = battle_ratings.RatingTable(os.path.join(self.config_dir, "ratings.csv"))
+        
         # Initialize functionalities
         self.init_warrior_management()
         self.init_item_management()
         self.init_simulation()
 
-    # Utility: Read CSV
-    def read_csv(self, filename):
-        if not os.path.exists(filename):
-            return []
-        with open(filename, "r", newline="") as file:
-            reader = csv.DictReader(file)
-            return list(reader)
-        
-    # Utility: Write CSV
-    def write_csv(self, filename, data, fieldnames):
-        with open(filename, "w", newline="") as file:
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(data)
+    # Utility: Read CSV into typed records
+    def read_csv(self, filename, record_class):
+        return battle_records.read_records(filename, record_class)
+        
+    # Utility: Write typed records to CSV
+    def write_csv(self, filename, data, record_class):
+        battle_records.write_records(filename, data, record_class)
+
+    def on_close(self):
+        # Fold the journals into the CSV files (or close the database) before leaving
+        try:
+            self.warrior_table.close()
+            self.item_table.close()
+        except OSError as e:
+            # The journals are kept and replayed on the next start
+            messagebox.showerror("Error", f"Could not save the rosters: {e}")
+        self.root.destroy()
 
     def create_csv_files(self):
         # Create warriors.csv if it doesn't exist
         warriors_path = os.path.join(self.config_dir, "warriors.csv")
         if not os.path.exists(warriors_path):
-            self.write_csv(warriors_path, [], [
-                "name", "title", "type", "tough", "inctough", 
-                "dex", "incdex", "smart", "incsmart", "min_dmg", 
-                "max_dmg", "attack_time"
-            ])
+            self.write_csv(warriors_path, [], Warrior)
             
         # Create items.csv if it doesn't exist
         items_path = os.path.join(self.config_dir, "items.csv")
         if not os.path.exists(items_path):
-            self.write_csv(items_path, [], [
-                "name", "add_tough", "add_dex", "add_smart", 
-                "add_hp", "add_hp_regen", "add_dmg", 
-                "add_defense", "add_attack_speed"
-            ])
+            self.write_csv(items_path, [], Item)
 
     # 1. Warrior Management Tab
     def init_warrior_management(self):
         ttk.Label(self.warriors_tab, text="Manage Warriors").pack()
         
         # Load warriors from file
-        self.warriors = self.read_csv(os.path.join(self.config_dir, "warriors.csv"))
-        self.warrior_fieldnames = [
-            "name", "title", "type", "tough", "inctough", 
-            "dex", "incdex", "smart", "incsmart", "min_dmg", 
-            "max_dmg", "attack_time"
-        ]
-        
-        # Warrior List Display
-        self.warrior_listbox = tk.Listbox(self.warriors_tab)
-        self.warrior_listbox.pack(fill='both', expand=True)
-        self.load_warrior_list()
+        self.warriors = self.warrior_table.load()
+        self.warrior_fieldnames = list(Warrior.FIELDS)
+        
+        # Warrior List Display, only the visible rows are filled in
+        self.warrior_view = VirtualListView(self.warriors_tab, lambda: self.warriors, lambda w: w.label)
+        self.warrior_view.frame.pack(fill='both', expand=True)
 
         # Add/Edit Warrior Buttons
         self.warrior_buttons = tk.Frame(self.warriors_tab)
@@ -187,46 +477,39 @@ class BattleArenaApp:
         tk.Button(self.warrior_buttons, text="Delete Warrior", command=self.delete_warrior).pack(side=tk.LEFT)
 
     def load_warrior_list(self):
-        self.warrior_listbox.delete(0, tk.END)
-        for warrior in self.warriors:
-            self.warrior_listbox.insert(tk.END, f"{warrior['name']} ({warrior['type']})")
+        self.warrior_view.reload()
         
     def add_warrior(self):
         WarriorEditor(self, mode="add")
         
     def edit_warrior(self):
-        selected = self.warrior_listbox.curselection()
-        if not selected:
+        selected = self.warrior_view.selection()
+        if selected is None:
             messagebox.showerror("Error", "No warrior selected!")
             return
-        warrior = self.warriors[selected[0]]
+        warrior = self.warriors[selected]
         WarriorEditor(self, mode="edit", warrior=warrior)
 
     def delete_warrior(self):
-        selected = self.warrior_listbox.curselection()
-        if not selected:
+        selected = self.warrior_view.selection()
+        if selected is None:
             messagebox.showerror("Error", "No warrior selected!")
             return
-        self.warriors.pop(selected[0])
-        self.write_csv(os.path.join(self.config_dir, "warriors.csv"), self.warriors, self.warrior_fieldnames)
-        self.load_warrior_list()
+        warrior = self.warrior_table.pop(selected)
+        self.profile_cache.invalidate_warrior(warrior.name)
+        self.warrior_view.row_removed(selected)
 
     # 2. Item Management Tab
     def init_item_management(self):
         ttk.Label(self.items_tab, text="Manage Items").pack()
         
         # Load items from file
-        self.items = self.read_csv(os.path.join(self.config_dir, "items.csv"))
-        self.item_fieldnames = [
-            "name", "add_tough", "add_dex", "add_smart", 
-            "add_hp", "add_hp_regen", "add_dmg", 
-            "add_defense", "add_attack_speed"
-        ]
-        
-        # Item List Display
-        self.item_listbox = tk.Listbox(self.items_tab)
-        self.item_listbox.pack(fill='both', expand=True)
-        self.load_item_list()
+        self.items = self.item_table.load()
+        self.item_fieldnames = list(Item.FIELDS)
+        
+        # Item List Display, only the visible rows are filled in
+        self.item_view = VirtualListView(self.items_tab, lambda: self.items, lambda item: item.name)
+        self.item_view.frame.pack(fill='both', expand=True)
 
         # Add/Edit Item Buttons
         self.item_buttons = tk.Frame(self.items_tab)
@@ -237,29 +520,27 @@ class BattleArenaApp:
         tk.Button(self.item_buttons, text="Delete Item", command=self.delete_item).pack(side=tk.LEFT)
 
     def load_item_list(self):
-        self.item_listbox.delete(0, tk.END)
-        for item in self.items:
-            self.item_listbox.insert(tk.END, item['name'])
+        self.item_view.reload()
 
     def add_item(self):
         ItemEditor(self, mode="add")
         
     def edit_item(self):
-        selected = self.item_listbox.curselection()
-        if not selected:
+        selected = self.item_view.selection()
+        if selected is None:
             messagebox.showerror("Error", "No item selected!")
             return
-        item = self.items[selected[0]]
+        item = self.items[selected]
         ItemEditor(self, mode="edit", item=item)
 
     def delete_item(self):
-        selected = self.item_listbox.curselection()
-        if not selected:
+        selected = self.item_view.selection()
+        if selected is None:
             messagebox.showerror("Error", "No item selected!")
             return
-        self.items.pop(selected[0])
-        self.write_csv(os.path.join(self.config_dir, "items.csv"), self.items, self.item_fieldnames)
-        self.load_item_list()
+        item = self.item_table.pop(selected)
+        self.profile_cache.invalidate_item(item.name)
+        self.item_view.row_removed(selected)
 
     # 3. Simulation Tab
     def init_simulation(self):
@@ -269,6 +550,10 @@ class BattleArenaApp:
         teams_frame = ttk.Frame(self.simulation_tab)
         teams_frame.pack(fill='both', expand=True)
         
+        # Instant prediction of the selected matchup
+        self.preview_var = tk.StringVar(value="")
+        ttk.Label(self.simulation_tab, textvariable=self.preview_var).pack(fill='x', padx=10)
+        
         # Create frames for team selection and items
         self.team1_frame = ttk.LabelFrame(teams_frame, text="Team 1")
         self.team1_frame.pack(side=tk.LEFT, padx=10, pady=5, fill='both', expand=True)
@@ -276,6 +561,17 @@ class BattleArenaApp:
         self.team2_frame = ttk.LabelFrame(teams_frame, text="Team 2")
         self.team2_frame.pack(side=tk.LEFT, padx=10, pady=5, fill='both', expand=True)
         
+        # How each team picks the enemy to attack
+        self.targeting_vars = []
+        for team_frame in (self.team1_frame, self.team2_frame):
+            targeting_frame = ttk.Frame(team_frame)
+            targeting_frame.pack(fill='x', padx=5, pady=5)
+            ttk.Label(targeting_frame, text="Targeting:").pack(side=tk.LEFT)
+            targeting_var = tk.StringVar(value="Random")
+            ttk.Combobox(targeting_frame, textvariable=targeting_var, state="readonly",
+                         values=list(battle_targeting.POLICIES)).pack(side=tk.LEFT)
+            self.targeting_vars.append(targeting_var)
+        
         # Create dropdown variables and lists
         self.team1_selections = []
         self.team2_selections = []
@@ -301,7 +597,8 @@ class BattleArenaApp:
             
             var1 = tk.StringVar()
             self.team1_vars.append(var1)
-            dropdown1 = ttk.Combobox(warrior_frame1, textvariable=var1, state="readonly")
+            dropdown1 = ttk.Combobox(warrior_frame1, textvariable=var1)
+            dropdown1.configure(postcommand=lambda d=dropdown1, v=var1: self.fill_warrior_choices(d, v))
             dropdown1.pack(side=tk.LEFT, fill='x', expand=True)
             self.team1_dropdowns.append(dropdown1)
             var1.trace('w', lambda *args, team=1, idx=i: self.on_warrior_select(team, idx))
@@ -313,9 +610,11 @@ class BattleArenaApp:
             
             item_var1 = tk.StringVar()
             self.team1_item_vars.append(item_var1)
-            item_dropdown1 = ttk.Combobox(item_frame1, textvariable=item_var1, state="readonly", width=15)
+            item_dropdown1 = ttk.Combobox(item_frame1, textvariable=item_var1, width=15)
+            item_dropdown1.configure(postcommand=lambda d=item_dropdown1, v=item_var1: self.fill_item_choices(d, v))
             item_dropdown1.pack(side=tk.LEFT)
             self.team1_item_dropdowns.append(item_dropdown1)
+            item_var1.trace('w', lambda *args: self.update_preview())
             
             # Team 2 warrior and item selection
             frame2 = ttk.Frame(self.team2_frame)
@@ -328,7 +627,8 @@ class BattleArenaApp:
             
             var2 = tk.StringVar()
             self.team2_vars.append(var2)
-            dropdown2 = ttk.Combobox(warrior_frame2, textvariable=var2, state="readonly")
+            dropdown2 = ttk.Combobox(warrior_frame2, textvariable=var2)
+            dropdown2.configure(postcommand=lambda d=dropdown2, v=var2: self.fill_warrior_choices(d, v))
             dropdown2.pack(side=tk.LEFT, fill='x', expand=True)
             self.team2_dropdowns.append(dropdown2)
             var2.trace('w', lambda *args, team=2, idx=i: self.on_warrior_select(team, idx))
@@ -340,9 +640,11 @@ class BattleArenaApp:
             
             item_var2 = tk.StringVar()
             self.team2_item_vars.append(item_var2)
-            item_dropdown2 = ttk.Combobox(item_frame2, textvariable=item_var2, state="readonly", width=15)
+            item_dropdown2 = ttk.Combobox(item_frame2, textvariable=item_var2, width=15)
+            item_dropdown2.configure(postcommand=lambda d=item_dropdown2, v=item_var2: self.fill_item_choices(d, v))
             item_dropdown2.pack(side=tk.LEFT)
             self.team2_item_dropdowns.append(item_dropdown2)
+            item_var2.trace('w', lambda *args: self.update_preview())
         
         # Control frame
         control_frame = ttk.Frame(self.simulation_tab)
@@ -354,15 +656,75 @@ class BattleArenaApp:
                         value="1v1", command=self.update_battle_mode).pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(control_frame, text="3v3 Battle", variable=self.battle_type, 
                         value="3v3", command=self.update_battle_mode).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(control_frame, text="NvN Battle", variable=self.battle_type, 
+                        value="NvN", command=self.update_battle_mode).pack(side=tk.LEFT, padx=5)
+        ttk.Label(control_frame, text="Size:").pack(side=tk.LEFT)
+        self.squad_size = tk.StringVar(value="100")
+        ttk.Entry(control_frame, textvariable=self.squad_size, width=6).pack(side=tk.LEFT)
+        
+        # Level every warrior fights at
+        ttk.Label(control_frame, text="Level:").pack(side=tk.LEFT, padx=(5, 0))
+        self.level = tk.StringVar(value="1")
+        ttk.Spinbox(control_frame, textvariable=self.level, from_=1, to=battle_engine.MAX_LEVEL,
+                    width=4).pack(side=tk.LEFT)
+        self.level.trace('w', lambda *args: self.update_preview())
         
         # Battle button
         ttk.Button(control_frame, text="Start Battle", 
                    command=self.run_simulation).pack(side=tk.RIGHT, padx=5)
         
+        # Win rate estimate over many battles
+        ttk.Button(control_frame, text="Win Rates", 
+                   command=self.run_win_rates).pack(side=tk.RIGHT, padx=5)
+        self.battle_count = tk.StringVar(value="1000")
+        ttk.Entry(control_frame, textvariable=self.battle_count, width=8).pack(side=tk.RIGHT)
+        ttk.Label(control_frame, text="Battles:").pack(side=tk.RIGHT)
+        
+        # Fight the last battle again from its replay
+        ttk.Button(control_frame, text="Check Replay", 
+                   command=self.check_replay).pack(side=tk.RIGHT, padx=5)
+        
+        # Exact 1v1 odds, no sampling
+        ttk.Button(control_frame, text="Exact Odds", 
+                   command=self.run_exact_odds).pack(side=tk.RIGHT, padx=5)
+        
         # Add refresh button
         ttk.Button(control_frame, text="Refresh Lists", 
                    command=self.load_simulation_warriors).pack(side=tk.LEFT, padx=5)
         
+        # Round robin of the whole roster
+        ttk.Button(control_frame, text="Tournament", 
+                   command=self.run_tournament).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Swiss", 
+                   command=self.run_swiss).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Ratings", 
+                   command=self.show_ratings).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Best Item", 
+                   command=self.run_best_items).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Best Team", 
+                   command=self.run_team_builder).pack(side=tk.LEFT, padx=5)
+        ttk.Label(control_frame, text="Reps:").pack(side=tk.LEFT)
+        self.tournament_reps = tk.StringVar(value="10")
+        ttk.Entry(control_frame, textvariable=self.tournament_reps, width=5).pack(side=tk.LEFT)
+        
+        # Progress of the running simulation and a way to stop it
+        progress_frame = ttk.Frame(self.simulation_tab)
+        progress_frame.pack(side=tk.BOTTOM, fill='x', padx=10)
+        
+        self.cancel_button = ttk.Button(progress_frame, text="Cancel", 
+                                        command=self.cancel_simulation, state="disabled")
+        self.cancel_button.pack(side=tk.RIGHT, padx=5)
+        self.progress_bar = ttk.Progressbar(progress_frame, mode="determinate", maximum=1)
+        self.progress_bar.pack(side=tk.RIGHT, fill='x', expand=True, padx=5)
+        self.status_var = tk.StringVar(value="Ready")
+        ttk.Label(progress_frame, textvariable=self.status_var).pack(side=tk.LEFT)
+        
+        # Background simulation state
+        self.worker = None
+        self.worker_messages = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.pending_lines = []
+        
         # Results display - increase height
         self.result_text = tk.Text(self.simulation_tab, height=20, width=80)
         self.result_text.pack(pady=10, padx=10, fill='both', expand=True)
@@ -380,7 +742,8 @@ class BattleArenaApp:
 
     def update_battle_mode(self):
         mode = self.battle_type.get()
-        required_warriors = 3 if mode == "3v3" else 1
+        # NvN squads are drawn at random, so no dropdowns are shown
+        required_warriors = {"1v1": 1, "3v3": 3}.get(mode, 0)
         
         # Show/hide dropdowns based on battle mode
         for i in range(3):
@@ -421,36 +784,66 @@ class BattleArenaApp:
         
         # Update available warriors for all dropdowns
         self.update_available_warriors()
+        self.update_preview()
+
+    def preview_teams(self):
+        # Both teams when every slot names a known warrior, otherwise None
+        level = self.get_level(quiet=True)
+        if self.battle_type.get() == "NvN" or level is None:
+            return None
+        required = 3 if self.battle_type.get() == "3v3" else 1
+        teams = []
+        for team_vars, item_vars in [(self.team1_vars, self.team1_item_vars),
+                                     (self.team2_vars, self.team2_item_vars)]:
+            team = []
+            for var, item_var in zip(team_vars[:required], item_vars):
+                warrior = self.warriors.get(var.get().split(" (")[0].strip())
+                if warrior is None:
+                    return None
+                item = self.items.get(item_var.get().strip())
+                team.append(self.profile_cache.get({'warrior': warrior, 'item': item, 'level': level}))
+            teams.append(team)
+        return teams
+
+    def update_preview(self):
+        # Closed-form estimate, shown before any battle is simulated
+        teams = self.preview_teams()
+        if teams is None:
+            self.preview_var.set("")
+        else:
+            self.preview_var.set(battle_analysis.describe(battle_analysis.predict(*teams)))
 
     def update_available_warriors(self):
-        # Get all warriors
-        all_warriors = [f"{w['name']} ({w['type']})" for w in self.warriors]
-        
-        # Get currently selected warriors for both teams
-        team1_selected = [var.get() for var in self.team1_vars if var.get()]
-        team2_selected = [var.get() for var in self.team2_vars if var.get()]
-        
-        # Update dropdowns for both teams
-        for i in range(3):
-            # Available warriors are those not selected in any dropdown except current one
-            current_selection1 = self.team1_vars[i].get()
-            current_selection2 = self.team2_vars[i].get()
-            
-            # Filter out warriors that are already selected, except for current dropdown
-            available1 = [''] + [w for w in all_warriors if w not in team1_selected + team2_selected or w == current_selection1]
-            available2 = [''] + [w for w in all_warriors if w not in team1_selected + team2_selected or w == current_selection2]
-            
-            # Update dropdown values
-            self.team1_dropdowns[i]['values'] = available1
-            self.team2_dropdowns[i]['values'] = available2
+        # Warriors picked in any dropdown; each dropdown hides the others' picks
+        self.taken_warriors = {
+            var.get().split(" (")[0] for var in self.team1_vars + self.team2_vars if var.get()
+        }
+
+    def fill_warrior_choices(self, dropdown, var):
+        # List the warriors starting with what was typed, when the dropdown opens
+        text = var.get()
+        prefix = "" if " (" in text else text.strip()
+        taken = self.taken_warriors - {text.split(" (")[0]}
+        names = self.warriors.names_with_prefix(prefix, CHOICE_LIMIT + len(taken))
+        names = [name for name in names if name not in taken][:CHOICE_LIMIT]
+        dropdown['values'] = [''] + [self.warriors.get(name).label for name in names]
+
+    def fill_item_choices(self, dropdown, var):
+        # List the items starting with what was typed, when the dropdown opens
+        text = var.get().strip()
+        prefix = "" if text in self.items else text
+        dropdown['values'] = [''] + self.items.names_with_prefix(prefix, CHOICE_LIMIT)
 
     def load_simulation_warriors(self):
         # Clear battle logs
         self.result_text.delete(1.0, tk.END)
         
         # Reload warriors and items from file
-        self.warriors = self.read_csv(os.path.join(self.config_dir, "warriors.csv"))
-        self.items = self.read_csv(os.path.join(self.config_dir, "items.csv"))
+        self.warriors = self.warrior_table.load()
+        self.items = self.item_table.load()
+        self.profile_cache.clear()
+        self.load_warrior_list()
+        self.load_item_list()
         
         # Reset selections
         self.team1_selections = []
@@ -462,17 +855,51 @@ class BattleArenaApp:
         for var in self.team1_item_vars + self.team2_item_vars:
             var.set('')
         
-        # Update available warriors
+        # Update available warriors; dropdown values are filled when opened
         self.update_available_warriors()
-        
-        # Update available items
-        item_list = [''] + [item['name'] for item in self.items]
-        for dropdown in self.team1_item_dropdowns + self.team2_item_dropdowns:
-            dropdown['values'] = item_list
 
-    def run_simulation(self):
-        # Clear previous results
-        self.result_text.delete(1.0, tk.END)
+    def get_level(self, quiet=False):
+        # Level from the spinbox, or None (with an error unless quiet) if it is not valid
+        try:
+            level = int(self.level.get())
+            if not 1 <= level <= battle_engine.MAX_LEVEL:
+                raise ValueError
+        except ValueError:
+            if not quiet:
+                messagebox.showerror("Error", f"Level must be a whole number from 1 to {battle_engine.MAX_LEVEL}!")
+            return None
+        return level
+
+    def get_random_squads(self):
+        # Two squads of the chosen size drawn from the roster, without items
+        level = self.get_level()
+        if level is None:
+            return None
+        try:
+            size = int(self.squad_size.get())
+            if not 1 <= size <= MAX_SQUAD_SIZE:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", f"Size must be a whole number from 1 to {MAX_SQUAD_SIZE}!")
+            return None
+        if not len(self.warriors):
+            messagebox.showerror("Error", "The roster has no warriors!")
+            return None
+        
+        # Warriors may appear more than once when the roster is smaller than the squads
+        teams = []
+        for _ in range(2):
+            positions = random.choices(range(len(self.warriors)), k=size)
+            entries = [{'warrior': self.warriors[position], 'item': None, 'level': level} for position in positions]
+            teams.append([self.profile_cache.get(entry) for entry in entries])
+        return tuple(teams)
+
+    def get_selected_teams(self):
+        if self.battle_type.get() == "NvN":
+            return self.get_random_squads()
+        level = self.get_level()
+        if level is None:
+            return None
         
         # Get required number of warriors based on battle type
         required_warriors = 3 if self.battle_type.get() == "3v3" else 1
@@ -484,234 +911,360 @@ class BattleArenaApp:
         if len(team1_selected) != required_warriors or len(team2_selected) != required_warriors:
             messagebox.showerror("Error", 
                 f"Please select exactly {required_warriors} warrior(s) for each team!")
-            return
+            return None
+        
+        # Names may be typed, so check them against the rosters
+        names = [selection.split(" (")[0].strip() for selection in team1_selected + team2_selected]
+        if len(set(names)) != len(names):
+            messagebox.showerror("Error", "A warrior can only be picked once per battle!")
+            return None
         
         # Get warrior and item data
         team1 = []
         team2 = []
         
-        for i, selection in enumerate(team1_selected):
-            name = selection.split(" (")[0]
-            warrior = next((w for w in self.warriors if w['name'] == name), None)
-            if warrior:
-                item_name = self.team1_item_vars[i].get()
-                item = next((item for item in self.items if item['name'] == item_name), None)
-                team1.append({'warrior': warrior, 'item': item})
-        
-        for i, selection in enumerate(team2_selected):
-            name = selection.split(" (")[0]
-            warrior = next((w for w in self.warriors if w['name'] == name), None)
-            if warrior:
-                item_name = self.team2_item_vars[i].get()
-                item = next((item for item in self.items if item['name'] == item_name), None)
-                team2.append({'warrior': warrior, 'item': item})
-        
-        # Simulate battle
-        result = self.simulate_battle(team1, team2)
-        
-        # Display results
-        self.result_text.insert(tk.END, result)
-
-    def init_warrior_state(self, warrior_data):
-        warrior = warrior_data['warrior']
-        item = warrior_data['item']
-        
-        # Define numeric fields
-        numeric_fields = [
-            'tough', 'inctough', 'dex', 'incdex', 'smart', 
-            'incsmart', 'min_dmg', 'max_dmg', 'attack_time'
-        ]
-        
-        # Convert only numeric stats to float
-        stats = {
-            k: float(v) if k in numeric_fields else v 
-            for k, v in warrior.items()
-        }
+        for team, selected, item_vars in [(team1, team1_selected, self.team1_item_vars),
+                                          (team2, team2_selected, self.team2_item_vars)]:
+            for i, selection in enumerate(selected):
+                name = selection.split(" (")[0].strip()
+                warrior = self.warriors.get(name)
+                if warrior is None:
+                    messagebox.showerror("Error", f"No warrior named {name}!")
+                    return None
+                item_name = item_vars[i].get().strip()
+                item = self.items.get(item_name)
+                if item_name and item is None:
+                    messagebox.showerror("Error", f"No item named {item_name}!")
+                    return None
+                team.append(self.profile_cache.get({'warrior': warrior, 'item': item, 'level': level}))
+        
+        return team1, team2
+
+    def run_simulation(self):
+        teams = self.get_selected_teams()
+        if teams is None:
+            return
+        targeting = tuple(var.get() for var in self.targeting_vars)
+        level = self.get_level(quiet=True)
         
-        # Apply item bonuses if an item is equipped
-        if item:
-            stats['tough'] += float(item['add_tough'])
-            stats['dex'] += float(item['add_dex'])
-            stats['smart'] += float(item['add_smart'])
-        
-        # Calculate derived stats
-        base_hp = 150
-        hp = base_hp + stats['tough'] * 20
-        hp_regen = 0.25 + stats['tough'] * 0.05
-        defense = stats['dex'] * 2
-        attack_speed = stats['dex']
-        
-        # Apply additional item bonuses
-        if item:
-            hp += float(item['add_hp'])
-            hp_regen += float(item['add_hp_regen'])
-            defense += float(item['add_defense'])
-            attack_speed += float(item['add_attack_speed'])
-        
-        # Calculate actual damage range
-        min_dmg = stats['min_dmg'] + stats['smart'] * 3
-        max_dmg = stats['max_dmg'] + stats['smart'] * 3
-        
-        if item:
-            min_dmg += float(item['add_dmg'])
-            max_dmg += float(item['add_dmg'])
-        
-        # Calculate attack cooldown
-        base_cooldown = float(stats['attack_time'])
-        actual_cooldown = base_cooldown / (1 + attack_speed/100)
-        
-        state = {
-            'name': warrior['name'],
-            'type': warrior['type'],
-            'hp': hp,
-            'max_hp': hp,
-            'hp_regen': hp_regen,
-            'defense': defense,
-            'min_dmg': min_dmg,
-            'max_dmg': max_dmg,
-            'cooldown': actual_cooldown,
-            'next_attack': actual_cooldown,
-            'stun_end': 0,
-            'stun_immune': 0,
-            'stun_diminish': 1.0
-        }
+        def job(cancel, progress):
+            # Simulate battle and render its report off the Tk thread
+            replay, result = battle_replay.record(*teams, targeting=targeting)
+            battle_replay.write(self.replay_path, replay)
+            self.rate_battles(teams, result.winner == 1, result.winner == 2, result.winner == 0, level)
+            return result.report
         
-        return state
-
-    def simulate_battle(self, team1, team2):
-        result_text = "=== Battle Report ===\n\n"
-        
-        # Initialize battle states
-        team1_states = [self.init_warrior_state(w) for w in team1]
-        team2_states = [self.init_warrior_state(w) for w in team2]
-        
-        # Print initial stats
-        result_text += "Initial Stats:\n"
-        for team_name, team_states in [("Team 1", team1_states), ("Team 2", team2_states)]:
-            result_text += f"\n{team_name}:\n"
-            for state in team_states:
-                result_text += (
-                    f"{state['name']} ({state['type']}):\n"
-                    f"  HP: {state['hp']:.1f}\n"
-                    f"  HP Regen: {state['hp_regen']:.2f}/s\n"
-                    f"  Defense: {state['defense']:.1f}\n"
-                    f"  Damage: {state['min_dmg']:.1f}-{state['max_dmg']:.1f}\n"
-                    f"  Attack Speed: {1/state['cooldown']:.2f}/s\n"
-                )
-        
-        result_text += "\nBattle Begin!\n"
-        
-        # Battle simulation loop
-        time = 0
-        max_time = 300  # 5 minute time limit
-        events = []
-        
-        while time < max_time:
-            current_events = []
-            
-            # Process HP regeneration every second
-            if time % 1 == 0:
-                for warrior in team1_states + team2_states:
-                    if warrior['hp'] > 0 and warrior['hp'] < warrior['max_hp']:
-                        regen = min(warrior['hp_regen'], warrior['max_hp'] - warrior['hp'])
-                        warrior['hp'] += regen
-                        current_events.append(f"{warrior['name']} regenerates {regen:.1f} HP")
-            
-            # Process attacks
-            for attacker in team1_states + team2_states:
-                if attacker['hp'] <= 0:
-                    continue
-                    
-                # Skip if stunned
-                if time < attacker['stun_end']:
-                    continue
-                    
-                # Check if ready to attack
-                if time >= attacker['next_attack']:
-                    # Choose target from opposite team
-                    targets = team2_states if attacker in team1_states else team1_states
-                    alive_targets = [t for t in targets if t['hp'] > 0]
-                    
-                    if not alive_targets:
-                        continue
-                        
-                    target = random.choice(alive_targets)
-                    
-                    # Process type advantages
-                    miss = False
-                    bonus_dmg = 1.0
-                    stun = False
-                    
-                    if attacker['type'] == 'Smart' and target['type'] == 'Dexterous':
-                        if random.random() < 0.2:  # 20% chance to miss
-                            miss = True
-                            current_events.append(f"{attacker['name']}'s attack misses {target['name']}!")
-                    
-                    elif attacker['type'] == 'Smart' and target['type'] == 'Tough':
-                        if random.random() < 0.2:  # 20% chance for bonus damage
-                            bonus_dmg = 1.5
-                            current_events.append(f"{attacker['name']} finds a weak spot on {target['name']}!")
-                    
-                    elif attacker['type'] == 'Tough' and target['type'] == 'Dexterous':
-                        if random.random() < 0.2 and time >= target['stun_immune']:  # 20% chance to stun
-                            stun = True
-                            stun_duration = target['stun_diminish']
-                            target['stun_end'] = time + stun_duration
-                            target['stun_immune'] = time + stun_duration + 1
-                            target['stun_diminish'] *= 0.5
-                            current_events.append(f"{attacker['name']} stuns {target['name']} for {stun_duration:.1f}s!")
-                    
-                    if not miss:
-                        # Calculate damage
-                        base_damage = random.uniform(attacker['min_dmg'], attacker['max_dmg'])
-                        damage_reduction = (0.06 * target['defense']) / (1 + 0.06 * target['defense'])
-                        final_damage = max(1, base_damage * (1 - damage_reduction) * bonus_dmg)
-                        
-                        target['hp'] -= final_damage
-                        current_events.append(
-                            f"{attacker['name']} deals {final_damage:.1f} damage to {target['name']} "
-                            f"(reduced from {base_damage:.1f})"
-                        )
-                        
-                        if target['hp'] <= 0:
-                            current_events.append(f"{target['name']} has been defeated!")
-                    
-                    # Set next attack time
-                    attacker['next_attack'] = time + attacker['cooldown']
-            
-            # Add events to log if any occurred
-            if current_events:
-                events.append(f"\nTime {time:.1f}s:")
-                events.extend(current_events)
-            
-            # Check victory conditions
-            team1_alive = any(w['hp'] > 0 for w in team1_states)
-            team2_alive = any(w['hp'] > 0 for w in team2_states)
-            
-            if not team1_alive or not team2_alive:
-                break
-            
-            time += 0.1  # Advance time in 0.1 second increments
+        self.run_in_background(job, "Simulating battle...")
+
+    def check_replay(self):
+        if not os.path.exists(self.replay_path):
+            messagebox.showerror("Error", "No battle has been saved yet!")
+            return
         
-        # Format battle log
-        result_text += "\n".join(events)
+        def job(cancel, progress):
+            # Fight the saved battle again and compare every event
+            replay = battle_replay.read(self.replay_path)
+            matches, message = battle_replay.verify(replay)
+            return message + "\n\n" + replay.fight().report
         
-        # Add victory declaration
-        result_text += "\n\nBattle Results:\n"
-        if not team2_alive:
-            result_text += "Team 1 is victorious!\n"
-        elif not team1_alive:
-            result_text += "Team 2 is victorious!\n"
+        self.run_in_background(job, "Checking replay...")
+
+    def run_win_rates(self):
+        try:
+            battles = int(self.battle_count.get())
+            if battles < 1:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Battles must be a positive whole number!")
+            return
+        
+        teams = self.get_selected_teams()
+        if teams is None:
+            return
+        targeting = tuple(var.get() for var in self.targeting_vars)
+        level = self.get_level(quiet=True)
+        
+        def job(cancel, progress):
+            # Run the battles on every core
+            estimate = battle_batch.estimate_win_rates(*teams, battles=battles, targeting=targeting,
+                                                       progress=progress, cancel=cancel)
+            if estimate is None:
+                return None
+            self.rate_battles(teams, estimate.team1_wins, estimate.team2_wins, estimate.draws, level)
+            return estimate.summary()
+        
+        self.run_in_background(job, f"Fighting {battles} battles...")
+
+    def run_exact_odds(self):
+        if self.battle_type.get() != "1v1":
+            messagebox.showerror("Error", "Exact odds are only available for 1v1 battles!")
+            return
+        
+        teams = self.get_selected_teams()
+        if teams is None:
+            return
+        
+        def job(cancel, progress):
+            # Solve both warriors' HP chains off the Tk thread
+            return battle_exact.solve(teams[0][0], teams[1][0]).summary()
+        
+        self.run_in_background(job, "Computing exact odds...")
+
+    def get_tournament_entrants(self):
+        # Repetitions, compiled profiles of the whole roster and their level, or None
+        level = self.get_level()
+        if level is None:
+            return None
+        try:
+            repetitions = int(self.tournament_reps.get())
+            if repetitions < 1:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Reps must be a positive whole number!")
+            return None
+        
+        if len(self.warriors) < 2:
+            messagebox.showerror("Error", "A tournament needs at least 2 warriors!")
+            return None
+        profiles = [self.profile_cache.get({'warrior': warrior, 'item': None, 'level': level})
+                    for warrior in self.warriors]
+        return repetitions, profiles, level
+
+    def run_tournament(self):
+        entrants = self.get_tournament_entrants()
+        if entrants is None:
+            return
+        repetitions, profiles, level = entrants
+        ratings = self.ratings if level == 1 else None
+        matrix_path = os.path.join(self.config_dir, "tournament_matrix.csv")
+        standings_path = os.path.join(self.config_dir, "tournament_standings.csv")
+        
+        def job(cancel, progress):
+            # Every pair of warriors, on every core
+            result = battle_tournament.round_robin(profiles, repetitions, progress=progress, 
+                                                   cancel=cancel, ratings=ratings)
+            self.ratings.save()
+            if result is None:
+                return None
+            result.write_matrix(matrix_path)
+            result.write_standings(standings_path)
+            return result.summary() + f"\nWin rates saved to {matrix_path}\nStandings saved to {standings_path}\n"
+        
+        self.run_in_background(job, f"Round robin of {len(profiles)} warriors...")
+
+    def run_swiss(self):
+        entrants = self.get_tournament_entrants()
+        if entrants is None:
+            return
+        repetitions, profiles, level = entrants
+        ratings = self.ratings if level == 1 else None
+        checkpoint_path = os.path.join(self.config_dir, "swiss_checkpoint.json")
+        standings_path = os.path.join(self.config_dir, "swiss_standings.csv")
+        
+        def job(cancel, progress):
+            # Resumes an interrupted tournament of the same roster from its checkpoint
+            result = battle_tournament.swiss(profiles, repetitions=repetitions, checkpoint=checkpoint_path,
+                                             progress=progress, cancel=cancel, ratings=ratings)
+            self.ratings.save()
+            if result is None:
+                return None
+            result.write_standings(standings_path)
+            return result.summary() + f"\nStandings saved to {standings_path}\n"
+        
+        self.run_in_background(job, f"Swiss tournament of {len(profiles)} warriors...")
+
+    def get_field(self, exclude, level, size=FIELD_SIZE):
+        # Opponents for a search: up to size warriors of the roster at the level, without items
+        names = set(exclude)
+        positions = range(len(self.warriors))
+        if len(positions) > size + len(names):
+            positions = sorted(random.sample(positions, size + len(names)))
+        field = [self.warriors[position] for position in positions]
+        return [self.profile_cache.get({'warrior': warrior, 'item': None, 'level': level})
+                for warrior in field if warrior.name not in names][:size]
+
+    def run_best_items(self):
+        # Equip the first Team 1 warrior; against the first Team 2 warrior or the field
+        level = self.get_level()
+        if level is None:
+            return
+        name = self.team1_vars[0].get().split(" (")[0].strip()
+        warrior = self.warriors.get(name)
+        if warrior is None:
+            messagebox.showerror("Error", "Select the Team 1 warrior to equip!")
+            return
+        
+        opponent_name = self.team2_vars[0].get().split(" (")[0].strip()
+        if opponent_name:
+            opponent = self.warriors.get(opponent_name)
+            if opponent is None:
+                messagebox.showerror("Error", f"No warrior named {opponent_name}!")
+                return
+            item = self.items.get(self.team2_item_vars[0].get().strip())
+            opponents = [self.profile_cache.get({'warrior': opponent, 'item': item, 'level': level})]
+            against = opponent.name
         else:
-            result_text += "Battle ended in a draw (time limit reached)\n"
+            opponents = self.get_field([name], level)
+            against = f"{len(opponents)} warriors of the roster"
+        if not opponents:
+            messagebox.showerror("Error", "There are no opponents to fight!")
+            return
+        items = list(self.items)
+        
+        def job(cancel, progress):
+            result = battle_optimizer.best_items(warrior, items, opponents, level=level,
+                                                 progress=progress, cancel=cancel)
+            if result is None:
+                return None
+            return result.summary(f"Best Items for {warrior.name} against {against}")
         
-        return result_text
+        self.run_in_background(job, f"Trying {len(items) + 1} items for {warrior.name}...")
+
+    def run_team_builder(self):
+        # Best team for the current mode, against Team 2 or random teams of the roster
+        level = self.get_level()
+        if level is None:
+            return
+        size = 3 if self.battle_type.get() == "3v3" else 1
+        if len(self.warriors) < size:
+            messagebox.showerror("Error", f"The roster needs at least {size} warriors!")
+            return
+        
+        names = [var.get().split(" (")[0].strip() for var in self.team2_vars[:size]]
+        if all(names):
+            opponent = []
+            for name, item_var in zip(names, self.team2_item_vars):
+                warrior = self.warriors.get(name)
+                if warrior is None:
+                    messagebox.showerror("Error", f"No warrior named {name}!")
+                    return
+                item = self.items.get(item_var.get().strip())
+                opponent.append(self.profile_cache.get({'warrior': warrior, 'item': item, 'level': level}))
+            opponents = [opponent]
+            against = "Team 2"
+        else:
+            field = self.get_field([], level, FIELD_TEAMS * size)
+            opponents = [field[start:start + size] for start in range(0, len(field) - size + 1, size)]
+            against = f"{len(opponents)} random teams"
+        
+        warriors = list(self.warriors)
+        items = list(self.items)
+        builder = self.team_builders.setdefault(size, battle_optimizer.TeamBuilder(size))
+        
+        def job(cancel, progress):
+            result = builder.search(warriors, items, opponents, level=level, progress=progress, cancel=cancel)
+            if result is None:
+                return None
+            return result.summary(f"Best Teams against {against}")
+        
+        self.run_in_background(job, "Searching teams...")
+
+    def rate_battles(self, teams, team1_wins, team2_wins, draws, level=1):
+        # Update and save the Elo ratings of both teams; runs on the worker thread,
+        # the rating table locks itself. Ratings compare warriors at level 1 and
+        # teams of up to RATED_TEAM_SIZE distinct warriors.
+        if level != 1 or len(teams[0]) > RATED_TEAM_SIZE or len(teams[1]) > RATED_TEAM_SIZE:
+            return
+        team1_names = [profile.name for profile in teams[0]]
+        team2_names = [profile.name for profile in teams[1]]
+        if len(set(team1_names + team2_names)) != len(team1_names) + len(team2_names):
+            return  # Random squads can repeat a warrior, even across both sides
+        self.ratings.record_counts(team1_names, team2_names, int(team1_wins), int(team2_wins), int(draws))
+        self.ratings.save()
+
+    def show_ratings(self):
+        if self.worker is not None:
+            messagebox.showerror("Error", "A simulation is already running!")
+            return
+        self.result_text.delete(1.0, tk.END)
+        self.stream_text(self.ratings.summary(20))
+
+    # Background simulations
+    def run_in_background(self, job, status):
+        if self.worker is not None:
+            messagebox.showerror("Error", "A simulation is already running!")
+            return
+        
+        # Clear previous results
+        self.pending_lines = []
+        self.result_text.delete(1.0, tk.END)
+        
+        self.cancel_event = threading.Event()
+        self.worker_messages = queue.Queue()
+        cancel = self.cancel_event
+        messages = self.worker_messages
+        
+        def work():
+            # Runs on the worker thread: never touch widgets here
+            try:
+                result = job(cancel, lambda done, total: messages.put(("progress", done, total)))
+                messages.put(("done", result))
+            except Exception as error:
+                messages.put(("error", error))
+        
+        self.status_var.set(status)
+        self.progress_bar.configure(value=0, maximum=1)
+        self.cancel_button.configure(state="normal")
+        self.worker = threading.Thread(target=work, daemon=True)
+        self.worker.start()
+        self.root.after(POLL_INTERVAL_MS, self.poll_worker)
+
+    def poll_worker(self):
+        # Apply worker messages on the Tk thread
+        while True:
+            try:
+                message = self.worker_messages.get_nowait()
+            except queue.Empty:
+                break
+            
+            if message[0] == "progress":
+                _, done, total = message
+                self.progress_bar.configure(value=done, maximum=total)
+            elif message[0] == "error":
+                self.finish_background("Failed")
+                messagebox.showerror("Error", f"Simulation failed: {message[1]}")
+                return
+            else:
+                if self.cancel_event.is_set() or message[1] is None:
+                    self.finish_background("Cancelled")
+                else:
+                    self.finish_background("Done")
+                    self.stream_text(message[1])
+                return
+        
+        self.root.after(POLL_INTERVAL_MS, self.poll_worker)
+
+    def finish_background(self, status):
+        self.worker = None
+        self.status_var.set(status)
+        self.progress_bar.configure(value=self.progress_bar['maximum'])
+        self.cancel_button.configure(state="disabled")
+
+    def cancel_simulation(self):
+        # Stop the worker and any report still being displayed
+        self.cancel_event.set()
+        self.pending_lines = []
+        self.status_var.set("Cancelling...")
+
+    def stream_text(self, text):
+        # Display results a chunk at a time so the window keeps repainting
+        self.pending_lines = text.splitlines(keepends=True)
+        self.pending_lines.reverse()
+        self.root.after(0, self.insert_next_chunk)
+
+    def insert_next_chunk(self):
+        if not self.pending_lines:
+            return
+        chunk = [self.pending_lines.pop() for _ in range(min(STREAM_CHUNK_LINES, len(self.pending_lines)))]
+        self.result_text.insert(tk.END, "".join(chunk))
+        if self.pending_lines:
+            self.root.after(1, self.insert_next_chunk)
 
 class WarriorEditor:
     def __init__(self, parent, mode, warrior=None):
         self.parent = parent
         self.mode = mode
-        self.warrior = warrior or {}
+        self.warrior = warrior or Warrior(type="Tough")
         
         # Create new window
         self.editor = tk.Toplevel()
@@ -743,14 +1296,15 @@ class WarriorEditor:
             
             # Special handling for type field
             if field == "type":
-                type_var = tk.StringVar(value=self.warrior.get(field, self.warrior_types[0]))
+                type_var = tk.StringVar(value=self.warrior.type or self.warrior_types[0])
                 entry = ttk.Combobox(frame, textvariable=type_var, values=self.warrior_types, state="readonly")
                 entry.pack(side=tk.RIGHT, expand=True, fill="x")
                 self.fields[field] = type_var  # Store the StringVar instead of the Combobox
             else:
                 entry = ttk.Entry(frame)
                 entry.pack(side=tk.RIGHT, expand=True, fill="x")
-                entry.insert(0, self.warrior.get(field, ""))
+                if self.mode == "edit":
+                    entry.insert(0, getattr(self.warrior, field))
                 self.fields[field] = entry
 
         # Add type description
@@ -777,38 +1331,58 @@ class WarriorEditor:
 
     def save(self):
         # Validate numeric fields
-        numeric_fields = ["tough", "inctough", "dex", "incdex", "smart", 
-                         "incsmart", "min_dmg", "max_dmg", "attack_time"]
-        
-        new_warrior = {}
+        values = {}
         for field in self.parent.warrior_fieldnames:
             if field == "type":
                 value = self.fields[field].get()  # Get value from StringVar
             else:
                 value = self.fields[field].get().strip()
                 
-            if field in numeric_fields:
+            if field in Warrior.NUMERIC_FIELDS:
                 try:
-                    value = float(value) if value else 0
+                    value = float(value) if value else 0.0
                 except ValueError:
                     messagebox.showerror("Error", f"{field} must be a number!")
                     return
-            new_warrior[field] = str(value)  # Convert back to string for CSV storage
-            
+            values[field] = value
+        new_warrior = Warrior(**values)
+
+        # Ratings left under the new name, e.g. by a deleted warrior, are merged only if the user agrees
+        renamed = self.mode != "add" and new_warrior.name != self.warrior.name
+        if renamed and self.parent.ratings.rename_conflicts(self.warrior.name, new_warrior.name):
+            if not messagebox.askyesno("Ratings", f"Ratings already exist under the name {new_warrior.name}. "
+                                                  f"Merge them with those of {self.warrior.name}?"):
+                return
+
+        try:
+            if self.mode == "add":
+                index = self.parent.warrior_table.add(new_warrior)
+            else:  # Edit mode
+                index = self.parent.warriors.position(self.warrior.name)
+                self.parent.warrior_table.replace(index, new_warrior)
+                self.parent.profile_cache.invalidate_warrior(self.warrior.name)
+                if renamed:
+                    self.parent.ratings.rename(self.warrior.name, new_warrior.name, merge=True)
+                    self.parent.ratings.save()
+        except ValueError:
+            messagebox.showerror("Error", f"A warrior named {new_warrior.name} already exists!")
+            return
+        except KeyError:
+            # Renamed or deleted while the editor was open
+            messagebox.showerror("Error", f"No warrior named {self.warrior.name}!")
+            return
+        self.parent.profile_cache.invalidate_warrior(new_warrior.name)
         if self.mode == "add":
-            self.parent.warriors.append(new_warrior)
-        else:  # Edit mode
-            index = self.parent.warriors.index(self.warrior)
-            self.parent.warriors[index] = new_warrior
-        self.parent.write_csv(os.path.join(self.parent.config_dir, "warriors.csv"), self.parent.warriors, self.parent.warrior_fieldnames)
-        self.parent.load_warrior_list()
+            self.parent.warrior_view.row_added(index)
+        else:
+            self.parent.warrior_view.refresh_row(index)
         self.editor.destroy()
 
 class ItemEditor:
     def __init__(self, parent, mode, item=None):
         self.parent = parent
         self.mode = mode
-        self.item = item or {}
+        self.item = item or Item()
         
         # Create new window
         self.editor = tk.Toplevel()
@@ -839,7 +1413,8 @@ class ItemEditor:
             
             entry = ttk.Entry(frame)
             entry.pack(side=tk.RIGHT, expand=True, fill="x")
-            entry.insert(0, self.item.get(field, ""))
+            if self.mode == "edit":
+                entry.insert(0, getattr(self.item, field))
             self.fields[field] = entry
 
         # Add item effects description
@@ -867,31 +1442,55 @@ class ItemEditor:
 
     def save(self):
         # Validate numeric fields
-        numeric_fields = ["add_tough", "add_dex", "add_smart", "add_hp", 
-                         "add_hp_regen", "add_dmg", "add_defense", "add_attack_speed"]
-        
-        new_item = {}
+        values = {}
         for field in self.parent.item_fieldnames:
             value = self.fields[field].get().strip()
-            if field in numeric_fields:
+            if field in Item.NUMERIC_FIELDS:
                 try:
-                    value = float(value) if value else 0
+                    value = float(value) if value else 0.0
                 except ValueError:
                     messagebox.showerror("Error", f"{field} must be a number!")
                     return
-            new_item[field] = str(value)  # Convert back to string for CSV storage
+            values[field] = value
+        new_item = Item(**values)
             
+        try:
+            if self.mode == "add":
+                index = self.parent.item_table.add(new_item)
+            else:  # Edit mode
+                index = self.parent.items.position(self.item.name)
+                self.parent.item_table.replace(index, new_item)
+                self.parent.profile_cache.invalidate_item(self.item.name)
+        except ValueError:
+            messagebox.showerror("Error", f"An item named {new_item.name} already exists!")
+            return
+        except KeyError:
+            # Renamed or deleted while the editor was open
+            messagebox.showerror("Error", f"No item named {self.item.name}!")
+            return
+        self.parent.profile_cache.invalidate_item(new_item.name)
         if self.mode == "add":
-            self.parent.items.append(new_item)
-        else:  # Edit mode
-            index = self.parent.items.index(self.item)
-            self.parent.items[index] = new_item
-        self.parent.write_csv(os.path.join(self.parent.config_dir, "items.csv"), self.parent.items, self.parent.item_fieldnames)
-        self.parent.load_item_list()
+            self.parent.item_view.row_added(index)
+        else:
+            self.parent.item_view.refresh_row(index)
         self.editor.destroy()
 
 # Run the application
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = BattleArenaApp(root)
-    root.mainloop()
+    parser = argparse.ArgumentParser(description="Borders of Aeon: Battle Arena")
+    parser.add_argument("--db", help="keep warriors and items in this SQLite database")
+    parser.add_argument("--export-csv", action="store_true",
+                        help="write the database back to config/*.csv and exit")
+    args = parser.parse_args()
+    
+    if args.export_csv:
+        if not args.db:
+            parser.error("--export-csv needs --db")
+        for record_class, filename in [(Warrior, "warriors.csv"), (Item, "items.csv")]:
+            table = SQLiteTable(args.db, record_class)
+            table.export_csv(os.path.join("config", filename))
+            table.close()
+    else:
+        root = tk.Tk()
+        app = BattleArenaApp(root, database=args.db)
+        root.mainloop()
@@ -0,0 +1,38 @@
+"""Shared builders for the tests."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import battle_engine  # noqa: E402
+from battle_records import Item, Warrior  # noqa: E402
+
+
+def warrior(name, warrior_type="Tough", tough=5, dex=5, smart=5, min_dmg=10, max_dmg=14, attack_time=1.0,
+            inctough=0, incdex=0, incsmart=0):
+    # A warrior record with float stats, as read from CSV
+    return Warrior(name=name, type=warrior_type, tough=float(tough), dex=float(dex), smart=float(smart),
+                   min_dmg=float(min_dmg), max_dmg=float(max_dmg), attack_time=float(attack_time),
+                   inctough=float(inctough), incdex=float(incdex), incsmart=float(incsmart))
+
+
+def profile(name, warrior_type="Tough", **stats):
+    # Compiled combat profile of a warrior without an item
+    return battle_engine.compile_profile({'warrior': warrior(name, warrior_type, **stats), 'item': None})
+
+
+def item(name, **bonuses):
+    return Item(name=name, **{field: float(value) for field, value in bonuses.items()})
+
+
+def random_profile(rng, name, adversarial=False):
+    # A random profile; adversarial ones may have swapped damage ranges and negative stats
+    low, high = rng.uniform(1, 10), rng.uniform(10, 20)
+    if adversarial and rng.random() < 0.5:
+        low, high = high, low
+    return profile(name, rng.choice(['Tough', 'Dexterous', 'Smart']),
+                   tough=rng.randint(0, 9),
+                   dex=rng.randint(-40, 9) if adversarial else rng.randint(0, 9),
+                   smart=rng.randint(-3, 9) if adversarial else rng.randint(0, 9),
+                   min_dmg=low, max_dmg=high, attack_time=rng.uniform(0.5, 2.0))
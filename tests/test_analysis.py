@@ -0,0 +1,16 @@
+"""Closed-form estimates."""
+
+import pytest
+
+import battle_analysis
+
+
+@pytest.mark.parametrize("low, high, mean", [
+    (2.0, 4.0, 3.0),
+    (0.5, 0.8, 1.0),
+    (0.0, 2.0, 1.25),
+    (5.0, 0.5, (0.5 + (25 - 1) / 2) / 4.5),
+])
+def test_mean_hit_in_either_order(low, high, mean):
+    assert battle_analysis.mean_hit(low, high) == pytest.approx(mean)
+    assert battle_analysis.mean_hit(high, low) == pytest.approx(mean)
@@ -0,0 +1,58 @@
+"""Early endings never change a battle's outcome."""
+
+import random
+
+import pytest
+
+from helpers import profile, random_profile
+
+import battle_engine
+
+BATTLES = 400
+
+
+def fight(team1, team2, seed):
+    full = battle_engine.simulate_battle(team1, team2, seed=seed)
+    off = battle_engine.simulate_battle(team1, team2, seed=seed, log_level=battle_engine.LOG_OFF)
+    quick = battle_engine.simulate_battle(team1, team2, seed=seed, log_level=battle_engine.LOG_OFF,
+                                          outcome_only=True)
+    return full, off, quick
+
+
+@pytest.mark.parametrize("size", [1, 3])
+def test_adversarial_profiles_agree(size):
+    rng = random.Random(size)
+    for seed in range(BATTLES):
+        team1 = [random_profile(rng, f"A{i}", adversarial=True) for i in range(size)]
+        team2 = [random_profile(rng, f"B{i}", adversarial=True) for i in range(size)]
+        full, off, quick = fight(team1, team2, seed)
+        assert full.winner == off.winner == quick.winner, (seed, team1, team2)
+        assert full.ticks == off.ticks, (seed, team1, team2)
+
+
+def test_swapped_damage_range_bounds():
+    # The highest roll of a swapped range is its min_dmg
+    swapped = profile("S", "Tough", min_dmg=40, max_dmg=2)
+    target = profile("T", "Tough")
+    assert swapped.min_dmg > swapped.max_dmg
+    (bounds, _), _ = battle_engine.battle_bounds((swapped,), (target,))
+    assert bounds.min_hit_dealt == max(1, swapped.max_dmg * target.damage_taken)
+    (_, bounds), _ = battle_engine.battle_bounds((swapped,), (target,))
+    assert bounds.max_hit_taken == pytest.approx(swapped.min_dmg * target.damage_taken)
+
+
+def test_negative_damage_taken_disables_early_endings():
+    fragile = profile("F", "Dexterous", dex=-30)
+    assert fragile.damage_taken < 0
+    bounds, proof_ticks = battle_engine.battle_bounds((fragile,), (profile("T", "Tough"),))
+    assert bounds == ()
+    assert proof_ticks == (float("inf"), float("inf"))
+
+
+@pytest.mark.parametrize("team1_size, team2_size", [(1, 0), (0, 1), (0, 0)])
+def test_empty_teams_agree(team1_size, team2_size):
+    team1 = [profile(f"A{i}") for i in range(team1_size)]
+    team2 = [profile(f"B{i}") for i in range(team2_size)]
+    full, off, quick = fight(team1, team2, seed=1)
+    assert full.winner == off.winner == quick.winner
+    assert full.ticks == off.ticks == quick.ticks == 0
@@ -0,0 +1,65 @@
+"""Warriors drained to death by their own regeneration fall like any other."""
+
+import pytest
+
+from helpers import item, warrior
+
+import battle_engine
+
+DRAIN = item("Cursed", add_hp_regen=-1000)
+
+
+def fighter(name, drained=False, **stats):
+    return battle_engine.compile_profile({'warrior': warrior(name, **stats), 'item': DRAIN if drained else None})
+
+
+def defeats(result):
+    return [result.fighters[target][0] for tick, kind, attacker, target, value in result.events
+            if kind == battle_engine.EVENT_DEFEAT]
+
+
+@pytest.mark.parametrize("log_level", [battle_engine.LOG_OFF, battle_engine.LOG_FULL])
+def test_lethal_drain_1v1(log_level):
+    # The drained warrior falls at the first regeneration after its first hit
+    result = battle_engine.simulate_battle([fighter("A")], [fighter("B", drained=True)], seed=1,
+                                           log_level=log_level)
+    assert (result.winner, result.ticks) == (1, 2 * battle_engine.TICKS_PER_SECOND)
+
+    # Both drained on the same regeneration: Team 1 wins, as when both fall in one tick
+    result = battle_engine.simulate_battle([fighter("A", drained=True)], [fighter("B", drained=True)], seed=1,
+                                           log_level=log_level)
+    assert (result.winner, result.ticks) == (1, 2 * battle_engine.TICKS_PER_SECOND)
+
+
+def test_lethal_drain_nvn():
+    team2 = [fighter(f"B{i}", drained=True) for i in range(4)]
+    result = battle_engine.simulate_battle([fighter("A"), fighter("A2")], team2, seed=3)
+    assert result.winner == 1
+    fallen = defeats(result)
+    assert sorted(fallen) == sorted(profile.name for profile in team2)
+
+    # Nothing happens to or by a warrior after it falls
+    fallen_at = {}
+    for tick, kind, attacker, target, value in result.events:
+        for slot in (attacker, target):
+            assert slot not in fallen_at or (kind == battle_engine.EVENT_DEFEAT and fallen_at[slot] == tick)
+        if kind == battle_engine.EVENT_DEFEAT:
+            fallen_at[target] = tick
+
+    off = battle_engine.simulate_battle([fighter("A"), fighter("A2")], team2, seed=3,
+                                        log_level=battle_engine.LOG_OFF)
+    assert (off.winner, off.ticks) == (result.winner, result.ticks)
+
+
+def test_team_wiped_by_regeneration_with_random_targets():
+    # Attacks due on the tick a team is wiped out must not look for a random target
+    team1 = [fighter(f"A{i}", attack_time=0.5) for i in range(3)]
+    team2 = [fighter(f"B{i}", drained=True, attack_time=0.5) for i in range(3)]
+    for seed in range(50):
+        result = battle_engine.simulate_battle(team1, team2, seed=seed)
+        assert result.winner == 1
+        assert result.ticks % battle_engine.TICKS_PER_SECOND == 0
+        assert sorted(defeats(result)) == [profile.name for profile in team2]
+        # Each fell to its own regeneration, not to a hit on the fallen
+        assert all(attacker == target for _, kind, attacker, target, _ in result.events
+                   if kind == battle_engine.EVENT_DEFEAT)
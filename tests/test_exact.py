@@ -0,0 +1,52 @@
+"""Exact 1v1 odds against Monte Carlo."""
+
+import math
+
+import pytest
+
+from helpers import item, profile, warrior
+
+import battle_engine
+import battle_exact
+
+BATTLES = 4000
+
+MATCHUPS = {
+    "stun": (profile("T", "Tough"), profile("D", "Dexterous")),
+    "weak spot": (profile("S", "Smart", smart=3), profile("T", "Tough", tough=7)),
+    "miss": (profile("S", "Smart", smart=6), profile("D", "Dexterous", dex=8)),
+    "reversed range": (profile("R", "Smart", min_dmg=9, max_dmg=4), profile("T", "Tough")),
+    "draining regen": (battle_engine.compile_profile({'warrior': warrior("S", "Smart", smart=6),
+                                                      'item': item("Cursed", add_hp_regen=-4)}),
+                       profile("T", "Tough", tough=6)),
+}
+
+
+def monte_carlo(first, second):
+    wins = [0, 0, 0]
+    for seed in range(BATTLES):
+        wins[battle_engine.simulate_battle([first], [second], seed=seed,
+                                           log_level=battle_engine.LOG_OFF).winner] += 1
+    return wins[1] / BATTLES, wins[2] / BATTLES
+
+
+@pytest.mark.parametrize("name", MATCHUPS)
+@pytest.mark.parametrize("swapped", [False, True])
+def test_solve_matches_monte_carlo_on_both_sides(name, swapped):
+    first, second = MATCHUPS[name]
+    if swapped:
+        first, second = second, first
+    odds = battle_exact.solve(first, second)
+    for exact, sampled in zip((odds.team1_win, odds.team2_win), monte_carlo(first, second)):
+        sigma = math.sqrt(max(exact * (1 - exact), 1e-4) / BATTLES)
+        assert abs(exact - sampled) <= odds.error_bound + 4 * sigma
+
+
+def test_stun_on_team1_stops_team2_attack_on_the_same_tick():
+    # With identical stats, a Team 1 stun lands before the attack it delays
+    tough, dexterous = MATCHUPS["stun"]
+    assert battle_exact.solve(tough, dexterous).team1_win > 0.95
+
+
+def test_chain_cache_is_bounded():
+    assert battle_exact.fall_ticks.cache_info().maxsize == battle_exact.CHAIN_CACHE_SIZE
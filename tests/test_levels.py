@@ -0,0 +1,45 @@
+"""Per-level profiles and their invalidation."""
+
+from helpers import warrior
+
+import battle_engine
+from battle_engine import LevelTable, ProfileCache
+
+
+def compiled(record, level):
+    return battle_engine.compile_profile({'warrior': record, 'item': None, 'level': level})
+
+
+def test_rows_match_compile_profile():
+    record = warrior("A", "Smart", inctough=1, incdex=0.5, incsmart=2)
+    table = LevelTable()
+    for level in (1, 7, battle_engine.MAX_LEVEL, 7):
+        assert table.profile(record, level) == compiled(record, level)
+
+
+def test_only_requested_levels_are_compiled():
+    table = LevelTable()
+    table.profile(warrior("A"), 3)
+    table.profile(warrior("B"), 1)
+    assert sum(table.filled) == 2
+
+
+def test_reused_block_is_recompiled():
+    table = LevelTable()
+    table.profile(warrior("A", tough=5, inctough=1), 4)
+    table.discard("A")
+    stronger = warrior("B", tough=9, inctough=2)
+    assert table.profile(stronger, 4) == compiled(stronger, 4)
+
+
+def test_invalidated_warrior_is_recompiled():
+    cache = ProfileCache()
+    old = warrior("A", tough=5, inctough=1)
+    assert cache.get({'warrior': old, 'item': None, 'level': 5}) == compiled(old, 5)
+
+    new = warrior("A", tough=8, inctough=3)
+    # Still the cached profile until the caller invalidates the warrior
+    assert cache.get({'warrior': new, 'item': None, 'level': 5}) == compiled(old, 5)
+    cache.invalidate_warrior("A")
+    for level in (5, 2):
+        assert cache.get({'warrior': new, 'item': None, 'level': level}) == compiled(new, level)
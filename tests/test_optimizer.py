@@ -0,0 +1,17 @@
+"""Successive halving of the item search."""
+
+from helpers import item, profile, warrior
+
+import battle_optimizer
+
+
+def test_final_round_compares_two_items():
+    items = [item(f"Sword {bonus}", add_min_dmg=bonus, add_max_dmg=bonus) for bonus in range(4)]
+    result = battle_optimizer.best_items(warrior("A"), items, [profile("B", "Dexterous")],
+                                         initial_battles=8, seed=1, workers=1)
+    # Five candidates: rounds of 8, 16 and 32 battles for 5, 3 and 2 of them
+    assert result.battles == 5 * 8 + 3 * 16 + 2 * 32
+    finalists = [candidate for candidate in result.candidates if candidate.rounds == 3]
+    assert len(finalists) == 2
+    assert all(candidate.battles == 8 + 16 + 32 for candidate in finalists)
+    assert result.best in finalists
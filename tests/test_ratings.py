@@ -0,0 +1,93 @@
+"""Batched Elo updates and concurrent use of the rating table."""
+
+import threading
+
+import pytest
+
+import helpers  # noqa: F401  (puts the repo root on sys.path)
+
+import battle_ratings
+from battle_ratings import RatingTable, expected_score, rating_gap_after
+
+
+def stepped(gap, score, battles, k_factor=battle_ratings.K_FACTOR):
+    # One Elo update per battle
+    for _ in range(battles):
+        gap += 2 * k_factor * (score - expected_score(gap, 0))
+    return gap
+
+
+def test_single_battle_is_one_elo_step():
+    table = RatingTable()
+    table.record(["A"], ["B"], 1)
+    assert table.rating(["A"]) == pytest.approx(battle_ratings.INITIAL_RATING + 16)
+    assert table.rating(["B"]) == pytest.approx(battle_ratings.INITIAL_RATING - 16)
+
+
+@pytest.mark.parametrize("gap, score, battles", [
+    (0, 0.7, 10), (0, 0.7, 1000), (100, 1.0, 50), (0, 0.0, 5000), (-300, 0.5, 20), (50, 0.25, 3),
+])
+def test_batch_follows_stepped_updates(gap, score, battles):
+    assert rating_gap_after(gap, score, battles) == pytest.approx(stepped(gap, score, battles), abs=5)
+
+
+def test_huge_batch_settles():
+    assert rating_gap_after(0, 0.75, 10 ** 9) == pytest.approx(400 * 0.47712125472, abs=0.01)
+    assert 0 < rating_gap_after(0, 1.0, 10 ** 9) < 5000
+
+
+def test_concurrent_rating_and_renames():
+    table = RatingTable()
+    table.record(["A"], ["B"], 0)
+
+    def rate():
+        for _ in range(2000):
+            table.record_counts(["C"], ["D"], 3, 1, 1)
+
+    worker = threading.Thread(target=rate)
+    worker.start()
+    for index in range(2000):
+        table.rename("A" if index % 2 == 0 else "E", "E" if index % 2 == 0 else "A")
+    worker.join()
+    assert set(table.ratings) == {"A", "B", "C", "D"}
+    assert table.get(["C"]).games == 10000
+
+
+def test_rename_moves_team_ratings():
+    table = RatingTable()
+    table.record(["A", "B", "C"], ["D", "E", "F"], 1)
+    table.record(["A"], ["D"], 2)
+    table.rename("A", "Z")
+    assert set(table.ratings) == {"B + C + Z", "D + E + F", "Z", "D"}
+    assert table.get(["Z", "C", "B"]).wins == 1
+    assert table.get(["Z"]).losses == 1
+
+
+def test_rename_onto_existing_ratings_raises_unless_merged():
+    table = RatingTable()
+    table.record(["A"], ["B"], 1)
+    table.record(["E"], ["B"], 2)
+    with pytest.raises(ValueError):
+        table.rename("A", "E")
+    assert table.get(["A"]).wins == 1 and table.get(["E"]).losses == 1
+
+    assert table.rename_conflicts("A", "E") == ["E"]
+    rating = (table.rating(["A"]) + table.rating(["E"])) / 2
+    table.rename("A", "E", merge=True)
+    merged = table.get(["E"])
+    assert "A" not in table.ratings
+    assert (merged.games, merged.wins, merged.losses) == (2, 1, 1)
+    assert merged.rating == pytest.approx(rating)
+
+
+def test_plus_in_a_name_is_not_a_team():
+    table = RatingTable()
+    table.record(["A + B"], ["C"], 1)
+    table.record(["A", "B"], ["C", "D"], 2)
+    assert table.get(["A + B"]).wins == 1
+    assert table.get(["A", "B"]).losses == 1
+    assert battle_ratings.key_names(battle_ratings.team_key(["A+", "+ B", "C"])) == ["+ B", "A+", "C"]
+
+    table.rename("A + B", "A+B")
+    assert table.get(["A+B"]).wins == 1
+    assert table.get(["A", "B"]).losses == 1
@@ -0,0 +1,55 @@
+"""Roster lookups stay in step with a plain list through adds, edits and deletes."""
+
+import random
+
+import pytest
+
+from helpers import warrior
+
+import battle_records
+from battle_records import Roster
+
+
+@pytest.mark.parametrize("min_tombstones", [0, 4, 1000])
+def test_roster_matches_list(monkeypatch, min_tombstones):
+    monkeypatch.setattr(battle_records, "MIN_TOMBSTONES", min_tombstones)
+    rng = random.Random(min_tombstones)
+    roster = Roster(warrior(f"W{i}") for i in range(50))
+    expected = [f"W{i}" for i in range(50)]
+    serial = 50
+
+    for _ in range(600):
+        action = rng.random()
+        if action < 0.45 and expected:
+            position = rng.randrange(len(expected))
+            assert roster.pop(position).name == expected.pop(position)
+        elif action < 0.8:
+            assert roster.add(warrior(f"W{serial}")) == len(expected)
+            expected.append(f"W{serial}")
+            serial += 1
+        elif expected:
+            position = rng.randrange(len(expected))
+            roster.replace(position, warrior(f"W{serial}"))
+            expected[position] = f"W{serial}"
+            serial += 1
+
+        assert len(roster) == len(expected)
+        assert [record.name for record in roster] == expected
+        for position in rng.sample(range(len(expected)), min(5, len(expected))):
+            assert roster[position].name == expected[position]
+            assert roster.position(expected[position]) == position
+        offset = rng.randrange(len(expected) + 1)
+        assert [record.name for record in roster.page(offset, 7)] == expected[offset:offset + 7]
+
+
+def test_first_duplicate_wins_across_compaction(monkeypatch):
+    monkeypatch.setattr(battle_records, "MIN_TOMBSTONES", 0)
+    roster = Roster([warrior("X"), warrior("A", tough=1), warrior("B"), warrior("A", tough=2)])
+    roster.pop(0)
+    assert roster.get("A").tough == 1
+    roster.pop(roster.position("A"))
+    # The later duplicate stays listed but does not take over the name
+    assert "A" not in roster
+    assert [record.name for record in roster] == ["B", "A"]
+    with pytest.raises(IndexError):
+        roster[2]
@@ -0,0 +1,83 @@
+"""Replays survive a round trip through bytes and fight again bit for bit."""
+
+import random
+
+import pytest
+
+from helpers import random_profile
+
+import battle_batch
+import battle_engine
+import battle_replay
+import battle_targeting
+
+
+def teams(seed, size=3):
+    rng = random.Random(seed)
+    return ([random_profile(rng, f"A{i}") for i in range(size)],
+            [random_profile(rng, f"B{i}") for i in range(size)])
+
+
+@pytest.mark.parametrize("targeting", [None, "Lowest HP", ("Spread", "Type Advantage")])
+def test_round_trip(tmp_path, targeting):
+    team1, team2 = teams(1)
+    replay, result = battle_replay.record(team1, team2, seed=2 ** 70 + 5, targeting=targeting)
+    filename = str(tmp_path / "battle.replay")
+    battle_replay.write(filename, replay)
+    loaded = battle_replay.read(filename)
+
+    assert battle_replay.encode(loaded) == battle_replay.encode(replay)
+    assert (loaded.seed, loaded.winner, loaded.ticks) == (replay.seed, result.winner, result.ticks)
+    assert loaded.team1 == team1 and loaded.team2 == team2
+    assert loaded.events == replay.events
+    assert loaded.targeting == battle_targeting.resolve(targeting)
+    assert battle_replay.verify(loaded)[0]
+
+
+def test_batch_battle_is_replayed():
+    team1, team2 = teams(2, size=1)
+    seed = 12345
+    outcomes = battle_batch.run_chunk(team1, team2, 5, seed, 0)
+    for index, (winner, ticks) in enumerate(outcomes):
+        replay, result = battle_replay.record(team1, team2, battle_batch.battle_seed(seed, index))
+        assert (replay.winner, replay.ticks) == (winner, ticks)
+
+
+def test_tampered_replays_are_caught():
+    team1, team2 = teams(3)
+    replay, _ = battle_replay.record(team1, team2, seed=9)
+    data = bytearray(battle_replay.encode(replay))
+
+    with pytest.raises(ValueError):
+        battle_replay.decode(bytes(data[:-3]))
+    with pytest.raises(ValueError):
+        battle_replay.decode(b"XXXX" + bytes(data[4:]))
+
+    # A changed stat no longer matches the roster hash
+    name = battle_replay.pack_text(team1[0].name) + battle_replay.pack_text(team1[0].type)
+    stats = bytes(data).index(name) + len(name)
+    data[stats] ^= 0x01
+    with pytest.raises(ValueError):
+        battle_replay.decode(bytes(data))
+
+    # A changed event decodes, but the rerun does not match it
+    changed = battle_replay.decode(battle_replay.encode(replay))
+    tick, kind, attacker, target, value = changed.events[0]
+    changed.events[0] = (tick + 1, kind, attacker, target, value)
+    assert not battle_replay.verify(changed)[0]
+
+
+def test_version_1_is_read():
+    team1, team2 = teams(4, size=1)
+    replay, _ = battle_replay.record(team1, team2, seed=77)
+    data = battle_replay.encode(replay)
+    magic, version, seed_length = battle_replay.HEADER.unpack_from(data, 0)
+    targeting_start = battle_replay.HEADER.size + seed_length
+    targeting_length = 2 * len(battle_replay.pack_text("Random"))
+    old = (battle_replay.HEADER.pack(magic, 1, seed_length) + data[battle_replay.HEADER.size:targeting_start]
+           + data[targeting_start + targeting_length:])
+
+    loaded = battle_replay.decode(old)
+    assert loaded.targeting == (None, None)
+    assert loaded.events == replay.events
+    assert battle_replay.verify(loaded)[0]
@@ -0,0 +1,164 @@
+"""Journal replay after crashes and failed compactions, and the SQLite tables."""
+
+import os
+import shutil
+
+import pytest
+
+from helpers import warrior
+
+import battle_storage
+from battle_records import Roster, Warrior, read_records, write_records
+from battle_storage import JournaledTable, SQLiteTable
+
+
+def names(roster):
+    return [record.name for record in roster]
+
+
+def crash_after_fold(table):
+    # State left by a compaction that renamed its snapshot but died before dropping the journal
+    table.close_journal()
+    shutil.copy(table.journal_name, table.journal_name + ".saved")
+    table.compact()
+    os.replace(table.journal_name + ".saved", table.old_journal_name)
+
+
+def test_replay_skips_folded_renames(tmp_path):
+    filename = str(tmp_path / "warriors.csv")
+    table = JournaledTable(filename, Warrior)
+    table.load()
+    table.add(warrior("A"))
+    table.add(warrior("Z"))
+    table.compact()
+    table.replace(0, warrior("B"))
+    table.replace(0, warrior("C"))
+    crash_after_fold(table)
+
+    assert names(JournaledTable(filename, Warrior).load()) == ["C", "Z"]
+
+
+def test_replay_skips_folded_add_and_rename(tmp_path):
+    filename = str(tmp_path / "warriors.csv")
+    table = JournaledTable(filename, Warrior)
+    table.load()
+    table.add(warrior("A"))
+    table.add(warrior("X"))
+    table.replace(1, warrior("Y"))
+    table.pop(0)
+    crash_after_fold(table)
+
+    reloaded = JournaledTable(filename, Warrior)
+    assert names(reloaded.load()) == ["Y"]
+    # New lines continue the sequence
+    reloaded.add(warrior("W"))
+    reloaded.close_journal()
+    assert names(JournaledTable(filename, Warrior).load()) == ["Y", "W"]
+
+
+def test_crash_before_snapshot_rename(tmp_path):
+    filename = str(tmp_path / "warriors.csv")
+    table = JournaledTable(filename, Warrior)
+    table.load()
+    table.add(warrior("A"))
+    table.compact()
+    table.replace(0, warrior("B"))
+    table.add(warrior("C"))
+    table.close_journal()
+    os.replace(table.journal_name, table.old_journal_name)
+    # The state of the new snapshot was written, the snapshot itself never renamed
+    shutil.copy(filename, filename + ".saved")
+    table.save_snapshot(list(table.roster), table.seq)
+    os.replace(filename + ".saved", filename)
+
+    assert names(JournaledTable(filename, Warrior).load()) == ["B", "C"]
+
+
+def test_failed_compaction_keeps_journal(tmp_path):
+    filename = str(tmp_path / "warriors.csv")
+    table = JournaledTable(filename, Warrior, compact_after=2)
+    table.load()
+    save_snapshot = table.save_snapshot
+
+    def fail(records, seq):
+        raise OSError("disk full")
+
+    table.save_snapshot = fail
+    table.add(warrior("A"))
+    table.add(warrior("B"))
+    table.wait_for_compaction()
+    assert isinstance(table.compaction_error, OSError)
+    assert os.path.exists(table.old_journal_name)
+
+    # The next compaction appends to the journal left behind instead of replacing it
+    table.add(warrior("C"))
+    table.add(warrior("D"))
+    table.wait_for_compaction()
+    assert names(JournaledTable(filename, Warrior).load()) == ["A", "B", "C", "D"]
+
+    table.save_snapshot = save_snapshot
+    table.compact()
+    assert table.compaction_error is None
+    assert not os.path.exists(table.old_journal_name)
+    assert names(JournaledTable(filename, Warrior).load()) == ["A", "B", "C", "D"]
+
+
+def test_sqlite_import_keeps_first_duplicate(tmp_path):
+    csv_name = str(tmp_path / "warriors.csv")
+    write_records(csv_name, [warrior("A", tough=1), warrior("B"), warrior("A", tough=2)], Warrior)
+    assert Roster(read_records(csv_name, Warrior)).get("A").tough == 1
+
+    table = SQLiteTable(str(tmp_path / "arena.db"), Warrior)
+    table.import_csv(csv_name)
+    roster = table.load()
+    assert names(roster) == ["A", "B"]
+    assert roster.get("A").tough == 1
+    table.close()
+
+
+def test_sqlite_pages_follow_deletes(tmp_path, monkeypatch):
+    monkeypatch.setattr(battle_storage, "ANCHOR_ROWS", 4)
+    table = SQLiteTable(str(tmp_path / "arena.db"), Warrior)
+    table.add_many([warrior(f"W{i:02}") for i in range(30)])
+    expected = [f"W{i:02}" for i in range(30)]
+    roster = table.load()
+
+    for position in (25, 0, 9, 8, 13):
+        for offset in range(0, len(expected) + 3, 3):
+            assert names(roster.page(offset, 5)) == expected[offset:offset + 5]
+        table.pop(position)
+        del expected[position]
+    table.add(warrior("X"))
+    expected.append("X")
+    assert names(roster.page(20, 10)) == expected[20:30]
+    assert [roster[i].name for i in range(len(expected))] == expected
+    table.close()
+
+
+def test_sqlite_count_and_positions_follow_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(battle_storage, "ANCHOR_ROWS", 4)
+    table = SQLiteTable(str(tmp_path / "arena.db"), Warrior)
+    roster = table.load()
+    table.add_many([warrior(f"W{i:02}") for i in range(20)])
+    expected = [f"W{i:02}" for i in range(20)]
+
+    def check():
+        assert len(roster) == len(expected)
+        assert len(roster) == table.connection.execute("SELECT COUNT(*) FROM warriors").fetchone()[0]
+        for position, name in enumerate(expected):
+            assert roster.position(name) == position
+
+    check()
+    for position in (19, 0, 8, 4, 10):
+        table.pop(position)
+        del expected[position]
+        check()
+    assert table.add(warrior("X")) == len(expected)
+    expected.append("X")
+    table.add_many([warrior("W03"), warrior("Y")], skip_duplicates=True)
+    expected.append("Y")
+    check()
+    with pytest.raises(ValueError):
+        table.add(warrior("Y"))
+    check()
+    table.close()
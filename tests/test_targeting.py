@@ -0,0 +1,98 @@
+"""Targeting policies pick what a scan over every living enemy would."""
+
+import random
+
+import pytest
+
+from helpers import item, random_profile, warrior
+
+import battle_engine
+import battle_targeting
+
+
+def brute_force_key(policy, attacker, state):
+    # The key each policy ranks targets by, ties broken by roster order
+    if isinstance(policy, battle_targeting.LowestHP):
+        return state['hp'], state['slot']
+    if isinstance(policy, battle_targeting.HighestThreat):
+        return -(state['min_dmg'] + state['max_dmg']) / (2 * state['cooldown_ticks']), state['slot']
+    if isinstance(policy, battle_targeting.Spread):
+        return policy.attacks[state['slot']], state['slot']
+    return battle_targeting.advantage(attacker['type'], state['type']), state['hp'], state['slot']
+
+
+def checked(policy_class):
+    # The policy, asserting every pick against a full scan of the enemy team
+    class Checked(policy_class):
+        def __init__(self, enemies):
+            super().__init__(enemies)
+            self.enemies = list(enemies)
+            self.picks = 0
+
+        def pick(self, attacker):
+            living = [state for state in self.enemies if state['hp'] > 0]
+            expected = min(living, key=lambda state: brute_force_key(self, attacker, state))
+            target = super().pick(attacker)
+            assert target is expected
+            self.picks += 1
+            return target
+
+    return Checked
+
+
+@pytest.mark.parametrize("policy_class", [battle_targeting.LowestHP, battle_targeting.HighestThreat,
+                                          battle_targeting.Spread, battle_targeting.TypeAdvantage])
+@pytest.mark.parametrize("adversarial", [False, True])
+def test_policies_match_brute_force(policy_class, adversarial):
+    rng = random.Random(policy_class.name)
+    policy = checked(policy_class)
+    for seed in range(40):
+        size = rng.randint(2, 8)
+        team1 = [random_profile(rng, f"A{i}", adversarial) for i in range(size)]
+        team2 = [random_profile(rng, f"B{i}", adversarial) for i in range(rng.randint(2, 8))]
+        result = battle_engine.simulate_battle(team1, team2, seed=seed, targeting=(policy, None),
+                                               log_level=battle_engine.LOG_OFF)
+        assert result.winner in (0, 1, 2)
+
+
+@pytest.mark.parametrize("policy_class", [battle_targeting.LowestHP, battle_targeting.TypeAdvantage])
+def test_policies_follow_draining_regeneration(policy_class):
+    # Regeneration below zero lowers HP between hits
+    cursed = item("Cursed", add_hp_regen=-6)
+    rng = random.Random(3)
+    policy = checked(policy_class)
+    for seed in range(40):
+        team1 = [random_profile(rng, f"A{i}") for i in range(3)]
+        team2 = [battle_engine.compile_profile({'warrior': warrior(f"B{i}", rng.choice(['Tough', 'Dexterous']),
+                                                                   tough=rng.randint(0, 9)),
+                                                'item': cursed if i % 2 else None}) for i in range(4)]
+        assert any(profile.hp_regen < 0 for profile in team2)
+        battle_engine.simulate_battle(team1, team2, seed=seed, targeting=(policy, None),
+                                      log_level=battle_engine.LOG_OFF)
+
+
+@pytest.mark.parametrize("policy_name", [name for name in battle_targeting.POLICIES if name != "Random"])
+def test_enemy_team_drained_to_death(policy_name):
+    # Every enemy falls to its own regeneration, never leaving a policy without targets
+    cursed = item("Cursed", add_hp_regen=-1000)
+    policy = checked(battle_targeting.POLICIES[policy_name])
+    team1 = [battle_engine.compile_profile({'warrior': warrior(f"A{i}"), 'item': None}) for i in range(3)]
+    team2 = [battle_engine.compile_profile({'warrior': warrior(f"B{i}", warrior_type), 'item': cursed})
+             for i, warrior_type in enumerate(['Tough', 'Dexterous', 'Smart', 'Tough', 'Dexterous'])]
+    for seed in range(10):
+        result = battle_engine.simulate_battle(team1, team2, seed=seed, targeting=(policy, policy))
+        assert result.winner == 1
+        fallen = [target for _, kind, _, target, _ in result.events if kind == battle_engine.EVENT_DEFEAT]
+        assert sorted(slot for slot in fallen if slot >= len(team1)) == list(range(len(team1), len(team1) + len(team2)))
+
+
+def test_heap_is_compacted():
+    states = [battle_engine.init_warrior_state(random_profile(random.Random(i), f"W{i}")) for i in range(5)]
+    for slot, state in enumerate(states):
+        state['slot'] = slot
+    policy = battle_targeting.LowestHP(states)
+    for _ in range(100):
+        states[2]['hp'] -= 0.5
+        policy.damaged(states[2])
+        assert len(policy.heap) <= battle_targeting.COMPACT_FACTOR * len(states) + 1
+    assert policy.pick(states[0]) is states[2]
@@ -0,0 +1,72 @@
+"""Tournaments are reproducible across worker counts and resumes."""
+
+import random
+import threading
+
+import pytest
+
+from helpers import random_profile
+
+import battle_tournament
+from battle_ratings import RatingTable
+
+SEED = 7
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # One pair per chunk at three battles per pair, so every round has many chunks
+    monkeypatch.setattr(battle_tournament, "CHUNK_BATTLES", 3)
+
+
+def roster(count):
+    rng = random.Random(count)
+    return [random_profile(rng, f"W{i}") for i in range(count)]
+
+
+def ratings_of(table):
+    return {key: (round(rating.rating, 9), rating.games) for key, rating in table.ratings.items()}
+
+
+def test_round_robin_same_for_any_worker_count(small_chunks):
+    warriors = roster(6)
+    results = []
+    for workers in (1, 2):
+        ratings = RatingTable()
+        result = battle_tournament.round_robin(warriors, 3, seed=SEED, workers=workers, ratings=ratings)
+        results.append((result.wins, result.draws, ratings_of(ratings)))
+    assert results[0] == results[1]
+
+
+def test_swiss_same_for_any_worker_count(small_chunks):
+    warriors = roster(9)
+    results = []
+    for workers in (1, 2):
+        ratings = RatingTable()
+        result = battle_tournament.swiss(warriors, rounds=3, seed=SEED, workers=workers, ratings=ratings)
+        results.append((result.standings(), ratings_of(ratings)))
+    assert results[0] == results[1]
+
+
+def test_resumed_swiss_rates_every_match_once(small_chunks, tmp_path):
+    warriors = roster(8)
+    checkpoint = str(tmp_path / "swiss.json")
+    expected_ratings = RatingTable()
+    expected = battle_tournament.swiss(warriors, rounds=3, seed=SEED, workers=1, ratings=expected_ratings)
+
+    # Cancel halfway through the second round, then resume from the checkpoint
+    ratings = RatingTable()
+    cancel = threading.Event()
+
+    def progress(done, battles):
+        if done >= 18:
+            cancel.set()
+
+    assert battle_tournament.swiss(warriors, rounds=3, seed=SEED, workers=1, checkpoint=checkpoint,
+                                   progress=progress, cancel=cancel, ratings=ratings) is None
+    assert sum(rating.games for rating in ratings.ratings.values()) == 2 * 4 * 3
+    result = battle_tournament.swiss(warriors, rounds=3, seed=SEED, workers=1, checkpoint=checkpoint,
+                                     ratings=ratings)
+
+    assert result.standings() == expected.standings()
+    assert ratings_of(ratings) == ratings_of(expected_ratings)
@@ -0,0 +1,34 @@
+"""The NumPy lockstep simulator follows battle_engine on draining regeneration."""
+
+import pytest
+
+from helpers import item, warrior
+
+import battle_engine
+
+np = pytest.importorskip("numpy")
+import battle_vector  # noqa: E402
+
+DRAIN = item("Cursed", add_hp_regen=-1000)
+
+
+@pytest.mark.parametrize("drained", [(False, True), (True, True), (True, False)])
+def test_lethal_drain_matches_engine(drained):
+    first = {'warrior': warrior("A"), 'item': DRAIN if drained[0] else None}
+    second = {'warrior': warrior("B"), 'item': DRAIN if drained[1] else None}
+    winners, ticks = battle_vector.simulate_1v1_batch(first, second, 200, seed=1)
+    expected = [battle_engine.simulate_battle([first], [second], seed=seed, log_level=battle_engine.LOG_OFF)
+                for seed in range(200)]
+    # Tough against Tough: both hit at 1.0s, so the drained fall at the 2.0s regeneration
+    assert set(winners.tolist()) == {result.winner for result in expected}
+    assert set(ticks.tolist()) == {result.ticks for result in expected} == {2 * battle_engine.TICKS_PER_SECOND}
+
+
+def test_full_hp_warriors_do_not_drain():
+    # A slow draining warrior keeps its full HP until the first hit lands
+    first = {'warrior': warrior("A", attack_time=100), 'item': item("Leech", add_hp_regen=-3)}
+    second = {'warrior': warrior("B", attack_time=100), 'item': None}
+    winners, ticks = battle_vector.simulate_1v1_batch(first, second, 10, seed=1)
+    expected = battle_engine.simulate_battle([first], [second], seed=1, log_level=battle_engine.LOG_OFF)
+    assert set(winners.tolist()) == {expected.winner}
+    assert abs(ticks.mean() - expected.ticks) < 3 * battle_engine.TICKS_PER_SECOND